@@ -0,0 +1,318 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''A module that builds a Rez package and its requirements, in parallel where possible.
+
+Each package's "package.py" file is read to find its requirements. The
+requirements are sorted into "levels" where every package in a level only
+depends on packages from earlier levels. Packages within a level don't
+depend on each other so they are built concurrently.
+
+Every package is built on its own (its requirements are already built by then)
+in a separate Python process, which runs this module as a script. This keeps
+each build's environment and Rez's global state apart, and works the same on
+every platform - the calling process (e.g. tk-desktop) is never forked.
+
+Package builds are coordinated through the install repository, so that when
+many launches (from one or more machines) need the same package at once, only
+the first one builds it and the others wait for that build to finish.
+
+'''
+
+# IMPORT STANDARD LIBRARIES
+from multiprocessing import pool as multiprocessing_pool
+import multiprocessing
+import collections
+import subprocess
+import argparse
+import logging
+import imp
+import sys
+import os
+
+
+_CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+LOGGER = logging.getLogger('rezzurect.rez_builder')
+WAIT_TIMEOUT = 60 * 60  # Builds of large packages, like Houdini, can take a while
+Node = collections.namedtuple('Node', 'name version source_path')
+
+
+def _get_package_module(source_path):
+    '''module or NoneType: Import the package.py file in `source_path`, if it exists.'''
+    path = os.path.join(source_path, 'package.py')
+
+    if not os.path.isfile(path):
+        return None
+
+    name = 'rez_{name}_build_definition'.format(name=os.path.basename(os.path.dirname(source_path)))
+
+    return imp.load_source(name, path)
+
+
+def _get_version_path(root, name, version):
+    '''str: Get the absolute path to the folder of `name`/`version` under `root`.'''
+    return os.path.join(root, name, version)
+
+
+def is_installed(install_root, name, version):
+    '''bool: Check if the `name`/`version` package was already built into `install_root`.'''
+    return os.path.isfile(os.path.join(_get_version_path(install_root, name, version), 'package.py'))
+
+
+def get_source_path(source_root, requirement):
+    '''Find the latest package source folder that satisfies a requirement.
+
+    Args:
+        source_root (str):
+            The absolute path to where all Rez package definitions can be found.
+        requirement (str):
+            A Rez requirement, such as "python-2.7+<3" or "openexr".
+
+    Returns:
+        `Node` or NoneType:
+            The found package. If the requirement is a weak or conflict
+            requirement or no source folder matches, return nothing.
+
+    '''
+    from rez.vendor.version.requirement import Requirement
+    from rez.vendor.version.version import Version, VersionError
+
+    requirement = Requirement(requirement)
+
+    if requirement.conflict or requirement.weak:
+        return None
+
+    family_path = os.path.join(source_root, requirement.name)
+
+    if not os.path.isdir(family_path):
+        return None
+
+    versions = []
+
+    for name in os.listdir(family_path):
+        if not os.path.isfile(os.path.join(family_path, name, 'package.py')):
+            continue
+
+        try:
+            version = Version(name)
+        except VersionError:
+            continue
+
+        if version in requirement.range:
+            versions.append(version)
+
+    if not versions:
+        return None
+
+    version = str(max(versions))
+
+    return Node(requirement.name, version, os.path.join(family_path, version))
+
+
+def get_dependency_graph(node, source_root, install_root):
+    '''Find every package that must be built in order to build `node`.
+
+    Requirements that are already installed (and their requirements) are skipped.
+
+    Args:
+        node (`Node`):
+            The package to build.
+        source_root (str):
+            The absolute path to where all Rez package definitions can be found.
+        install_root (str):
+            The absolute path to where Rez packages are built to.
+
+    Returns:
+        dict[`Node`, set[`Node`]]: Every package that needs to be built and its requirements.
+
+    '''
+    graph = dict()
+    unvisited = [node]
+
+    while unvisited:
+        current = unvisited.pop()
+
+        if current in graph:
+            continue
+
+        graph[current] = set()
+        module = _get_package_module(current.source_path)
+
+        for requirement in getattr(module, 'requires', None) or []:
+            dependency = get_source_path(source_root, str(requirement))
+
+            if not dependency or is_installed(install_root, dependency.name, dependency.version):
+                continue
+
+            graph[current].add(dependency)
+            unvisited.append(dependency)
+
+    return graph
+
+
+def get_build_order(graph):
+    '''Sort the packages of a dependency graph into groups that can be built together.
+
+    Args:
+        graph (dict[`Node`, set[`Node`]]): Every package and its requirements.
+
+    Raises:
+        ValueError: If `graph` contains a cyclic dependency.
+
+    Returns:
+        list[list[`Node`]]:
+            Every group of packages. Each group only depends on groups that come before it.
+
+    '''
+    remaining = dict((node, set(dependencies)) for node, dependencies in graph.items())
+    levels = []
+
+    while remaining:
+        level = sorted(node for node, dependencies in remaining.items() if not dependencies)
+
+        if not level:
+            raise ValueError('Packages "{nodes}" have a cyclic dependency.'.format(
+                nodes=sorted('{node.name}-{node.version}'.format(node=node) for node in remaining)))
+
+        for node in level:
+            del remaining[node]
+
+        for dependencies in remaining.values():
+            dependencies.difference_update(level)
+
+        levels.append(level)
+
+    return levels
+
+
+def _build(arguments):
+    '''Build one package in a new Python process. See :func:`main`.
+
+    This function runs in a worker thread so it must never raise. Any error is returned, instead.
+
+    Args:
+        arguments (tuple[`Node`, str, str]):
+            The package to build, the root folder of every package source
+            and the root folder that packages are built into.
+
+    Returns:
+        tuple[`Node`, str]: The built package and the build error, if there was one.
+
+    '''
+    node, source_root, install_root = arguments
+
+    command = [
+        sys.executable,
+        os.path.join(_CURRENT_DIR, '__rez_builder.py'),
+        node.name,
+        node.version,
+        node.source_path,
+        source_root,
+        install_root,
+    ]
+
+    try:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output, _ = process.communicate()
+    except OSError as error:
+        return (node, str(error))
+
+    if process.returncode:
+        return (node, output or 'Exit code "{code}".'.format(code=process.returncode))
+
+    return (node, '')
+
+
+def build(node, source_root, install_root, processes=None, callback=None):
+    '''Build a package and every requirement that it needs.
+
+    Args:
+        node (`Node`):
+            The package to build.
+        source_root (str):
+            The absolute path to where all Rez package definitions can be found.
+        install_root (str):
+            The absolute path to where Rez packages are built to.
+        processes (int, optional):
+            The most packages to build at once. If no value is given,
+            the number of CPUs is used.
+        callback (callable[`Node`, int, int], optional):
+            A function that is called after each package is built with
+            the package, the number of built packages and the total
+            number of packages to build.
+
+    Raises:
+        RuntimeError: If any package fails to build.
+
+    '''
+    levels = get_build_order(get_dependency_graph(node, source_root, install_root))
+    total = sum(len(level) for level in levels)
+    finished = 0
+
+    LOGGER.info('Building "%s" packages in "%s" stage(s).', total, len(levels))
+
+    # Each thread only waits on the process that builds its package
+    pool = multiprocessing_pool.ThreadPool(processes=processes or multiprocessing.cpu_count())
+
+    try:
+        for level in levels:
+            errors = []
+            items = [(node_, source_root, install_root) for node_ in level]
+
+            for built, error in pool.imap_unordered(_build, items):
+                finished += 1
+
+                if error:
+                    LOGGER.error('Package "%s-%s" failed to build.\n%s', built.name, built.version, error)
+                    errors.append(built)
+                elif callback:
+                    callback(built, finished, total)
+
+            if errors:
+                raise RuntimeError('Packages "{packages}" could not be built.'.format(
+                    packages=['{node.name}-{node.version}'.format(node=node_) for node_ in errors]))
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _load_module(name):
+    '''module: Import one of the private "__rez_*.py" modules next to this module.'''
+    return imp.load_source(name, os.path.join(_CURRENT_DIR, '__{name}.py'.format(name=name)))
+
+
+def main(args=None):
+    '''Build one package, unless another process is already building it.
+
+    This is run in a new process, by :func:`build`. The package's requirements must be built already.
+
+    Args:
+        args (list[str], optional): The command-line arguments. Default: `sys.argv`.
+
+    '''
+    parser = argparse.ArgumentParser(description='Build and install one Rez package.')
+    parser.add_argument('name', help='The name of the package to build.')
+    parser.add_argument('version', help='The version of the package to build.')
+    parser.add_argument('source_path', help='The folder that contains the package\'s package.py.')
+    parser.add_argument('source_root', help='The folder that contains every package source.')
+    parser.add_argument('install_root', help='The folder that packages are built into.')
+    options = parser.parse_args(args)
+
+    _load_module('rez_config').init_config()
+    rez_launcher = _load_module('rez_launcher')
+
+    from rez.package_repository import package_repository_manager
+
+    def _build_package():
+        rez_launcher.build_package(options.name, options.version, options.source_root, options.source_path)
+
+    repository = package_repository_manager.get_repository(options.install_root)
+
+    # If someone else is building the package, this waits for them to finish
+    if not repository.install_package(options.name, options.version, _build_package, timeout=WAIT_TIMEOUT):
+        LOGGER.debug('Package "%s-%s" was built by another process.', options.name, options.version)
+
+
+if __name__ == '__main__':
+    logging.basicConfig()
+    main()
@@ -4,23 +4,42 @@
 '''A module that helps bootstrap Rez onto Shotgun's Pipeline Configuration.'''
 
 # IMPORT STANDARD LIBRARIES
-import tempfile
 import sys
 import os
 
-# IMPORT THIRD-PARTY LIBRARIES
+
 _CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
 _SHOTGUN_CONFIG_ROOT = os.path.dirname(_CURRENT_DIR)
 _VENDORS_PATH = os.path.join(_SHOTGUN_CONFIG_ROOT, 'vendors')
-# This sys.path.append adds `rezzurect` and any other third-party library that we need
-sys.path.append(_VENDORS_PATH)
-sys.path.append(os.path.join(_VENDORS_PATH, 'rez-2.23.1-py2.7'))
+_PYTHON_PATH_INITIALIZED = False
+
+ENGINES_TO_PACKAGE = {
+    'tk-houdini': 'houdini',
+    'tk-maya': 'maya',
+    'tk-nuke': 'nuke',
+}
+
+
+def _init_python_path():
+    '''Make `rezzurect`, Rez and any other third-party library that we need importable.
+
+    This is deferred until a Rez launch actually needs it, so that other
+    launches don't pay the cost of importing these libraries.
 
-from rezzurect.utils import config_helper
-import yaml
+    '''
+    global _PYTHON_PATH_INITIALIZED  # pylint: disable=global-statement
+
+    if _PYTHON_PATH_INITIALIZED:
+        return
 
+    for path in [_VENDORS_PATH, os.path.join(_VENDORS_PATH, 'rez-2.23.1-py2.7')]:
+        if path not in sys.path:
+            sys.path.append(path)
 
-config_helper.init_custom_pythonpath()
+    from rezzurect.utils import config_helper
+
+    config_helper.init_custom_pythonpath()
+    _PYTHON_PATH_INITIALIZED = True
 
 
 def _get_config_root_directory():
@@ -39,6 +58,8 @@ def init_config():
         Make changes to this function only if you know what you're doing.
 
     '''
+    _init_python_path()
+
     config_file = os.getenv('REZ_CONFIG_FILE')
 
     if config_file:
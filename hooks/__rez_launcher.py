@@ -13,7 +13,10 @@ recursively build the package's requirements.
 '''
 
 # IMPORT STANDARD LIBRARIES
+import tempfile
 import logging
+import json
+import time
 import imp
 import sys
 import os
@@ -30,6 +33,10 @@ _CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
 _SHOTGUN_CONFIG_ROOT = os.path.dirname(_CURRENT_DIR)
 LOGGER = logging.getLogger('rezzurect.rez_launcher')
 
+BAKED_FOLDER_NAME = '.baked'
+BAKED_ENVIRON_FILE_NAME = 'environ.json'
+BAKED_LAUNCH_ENVIRONMENT_VARIABLE = 'REZZURECT_BAKED_LAUNCH'
+
 
 def _get_context(packages):
     '''Get a Rez environment that satisfies the given packages, if possible.
@@ -76,6 +83,216 @@ def add_rez_to_sys_path_if_needed(runner):
         sys.path.append(rez_path)
 
 
+def _get_version_path(package, version):
+    '''str: Get the absolute path to where `package`/`version` is installed locally.'''
+    from rez import config
+
+    # TODO : Using `config_package_root` may not work for deployment.
+    #        Double-check this! TD117
+    #
+    config_package_root = config.config.get('local_packages_path')
+
+    return os.path.join(config_package_root, package, version)
+
+
+def _rebase_environ(environ, baked_parent_environ, parent_environ):
+    '''Re-apply a baked environment on top of a different parent environment.
+
+    Rez packages almost always append or prepend to the variables that
+    they're given (PATH, PYTHONPATH, etc). When the environment was baked,
+    the parent's value was used so, to carry the package's changes onto
+    the current parent environment, every baked value that contains the
+    old parent's paths gets them swapped for the current parent's paths.
+
+    Args:
+        environ (dict[str, str]):
+            The environment that was computed when the context was baked.
+        baked_parent_environ (dict[str, str]):
+            The parent environment that `environ` was computed from.
+        parent_environ (dict[str, str]):
+            The environment to apply the baked changes onto.
+
+    Returns:
+        dict[str, str]: The new environment.
+
+    '''
+    output = dict(parent_environ)
+
+    for key in baked_parent_environ:
+        if key not in environ:
+            # The context unset this variable
+            output.pop(key, None)
+
+    for key, value in environ.items():
+        old_parent_value = baked_parent_environ.get(key)
+
+        if old_parent_value == value:
+            # The context never changed this variable so leave it alone
+            continue
+
+        if old_parent_value:
+            value = _rebase_paths(value, old_parent_value, parent_environ.get(key))
+
+        output[key] = value
+
+    return output
+
+
+def _rebase_paths(value, old_parent_value, parent_value):
+    '''Replace the old parent's paths in a variable with the current parent's paths.
+
+    Args:
+        value (str): The baked value of the variable, e.g. "/foo/bin:/usr/bin:/bin".
+        old_parent_value (str): The variable's value when it was baked, e.g. "/usr/bin:/bin".
+        parent_value (str or NoneType): The variable's current value, if it is set.
+
+    Returns:
+        str: The rebased value. If `value` doesn't contain every path
+             of `old_parent_value`, in order, it is returned unchanged.
+
+    '''
+    paths = value.split(os.pathsep)
+    old_parent_paths = old_parent_value.split(os.pathsep)
+    count = len(old_parent_paths)
+
+    for index in range(len(paths) - count + 1):
+        if paths[index:index + count] == old_parent_paths:
+            paths[index:index + count] = parent_value.split(os.pathsep) if parent_value else []
+
+            return os.pathsep.join(paths)
+
+    return value
+
+
+def _get_release_times(families, paths):
+    '''dict[str, int]: Get the last time that each package family was released.'''
+    from rez.packages_ import get_last_release_time
+
+    return dict((family, get_last_release_time(family, paths)) for family in families)
+
+
+def is_baked_launch_enabled():
+    '''bool: Check if launches should read from / write to baked context files.'''
+    return os.getenv(BAKED_LAUNCH_ENVIRONMENT_VARIABLE, '1') != '0'
+
+
+def get_baked_folder(package, version):
+    '''str: Get the folder where the baked context of `package`/`version` is stored.'''
+    return os.path.join(_get_version_path(package, version), BAKED_FOLDER_NAME)
+
+
+def bake_context(context, package, version, source_path):
+    '''Save the context's interpreted environment, next to the installed package.
+
+    Baked files let later launches skip resolving and interpreting the
+    context entirely. See :func:`get_baked_environ`.
+
+    The baked environment is invalidated when `package`'s package.py changes
+    or when a new version of any resolved package is released. If the
+    release time of a resolved package can't be found, nothing is baked.
+
+    Args:
+        context (`rez.resolved_context.ResolvedContext`):
+            The resolved context to bake.
+        package (str):
+            The name of the Rez package that `context` was resolved for.
+        version (str):
+            The specific release of `package`.
+        source_path (str):
+            The absolute path to where the package.py of `package` exists.
+            Its modification time is used to invalidate the baked files.
+
+    Returns:
+        str or NoneType: The folder that the baked files were written to, if any.
+
+    '''
+    release_times = _get_release_times(
+        set(variant.name for variant in context.resolved_packages),
+        context.package_paths,
+    )
+
+    if not all(release_times.values()):
+        LOGGER.debug('Context of "%s-%s" can\'t be baked because some release times are unknown.',
+                     package, version)
+        return None
+
+    folder = get_baked_folder(package, version)
+
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+
+    parent_environ = dict(os.environ)
+
+    data = {
+        'created': time.time(),
+        'environ': context.get_environ(parent_environ=parent_environ),
+        'package_paths': context.package_paths,
+        'parent_environ': parent_environ,
+        'release_times': release_times,
+        'source_mtime': os.path.getmtime(os.path.join(source_path, 'package.py')),
+    }
+
+    # Write to a temporary file first so that another artist's launch never
+    # reads a half-written file
+    #
+    handle, temporary_path = tempfile.mkstemp(dir=folder, suffix='.json')
+
+    with os.fdopen(handle, 'w') as file_:
+        json.dump(data, file_)
+
+    os.rename(temporary_path, os.path.join(folder, BAKED_ENVIRON_FILE_NAME))
+
+    return folder
+
+
+def get_baked_environ(package, version, source_path):
+    '''Get the baked environment of `package`/`version`, if it is still valid.
+
+    Args:
+        package (str):
+            The name of the Rez package to get the environment of.
+        version (str):
+            The specific release of `package`.
+        source_path (str):
+            The absolute path to where the package.py of `package` exists.
+            If it was modified after the environment was baked, or any
+            of the resolved packages had a new release since, the
+            baked environment is ignored.
+
+    Returns:
+        dict[str, str] or NoneType:
+            The environment to run `package` in, rebased onto the
+            current environment. If there is no valid baked
+            environment, return nothing.
+
+    '''
+    path = os.path.join(get_baked_folder(package, version), BAKED_ENVIRON_FILE_NAME)
+
+    try:
+        with open(path, 'r') as file_:
+            data = json.load(file_)
+    except (IOError, OSError, ValueError):
+        return None
+
+    try:
+        source_mtime = os.path.getmtime(os.path.join(source_path, 'package.py'))
+    except OSError:
+        return None
+
+    if source_mtime != data.get('source_mtime'):
+        LOGGER.debug('Baked context "%s" is out of date and will be ignored.', path)
+        return None
+
+    release_times = data.get('release_times')
+
+    if not release_times or \
+            _get_release_times(release_times, data['package_paths']) != release_times:
+        LOGGER.debug('Baked context "%s" has newer package releases and will be ignored.', path)
+        return None
+
+    return _rebase_environ(data['environ'], data['parent_environ'], dict(os.environ))
+
+
 def get_package_module(source_path, name):
     '''Import the package.py file as a Python module and return it.
 
@@ -124,12 +341,11 @@ def get_context(packages):
             'an administrator to fix this.'.format(packages=packages))
 
 
-def build_context_from_scratch(package, version, root, source_path=''):
-    '''Build the given `package` recursively.
+def build_package(package, version, root, source_path=''):
+    '''Build and install the given `package`, without its requirements.
 
-    Note:
-        This function assumes that `package` has not been built before.
-        "Partial" building is not supported and old files will be overwritten.
+    This is the same as running "rez-build --install" for the package. Its
+    requirements must be installed already. See :func:`build_context`.
 
     Args:
         package (str):
@@ -148,7 +364,9 @@ def build_context_from_scratch(package, version, root, source_path=''):
 
     '''
     from rezzurect.utils import config_helper
-    from rezzurect import manager
+    from rez.build_process_ import create_build_process
+    from rez.build_system import create_build_system
+    from rez.packages_ import get_developer_package
     from rez import config
 
     if not source_path:
@@ -157,51 +375,76 @@ def build_context_from_scratch(package, version, root, source_path=''):
         if not os.path.isfile(os.path.join(source_path, 'package.py')):
             raise ValueError('source_path could not be found.')
 
-    # TODO : Using `config_package_root` may not work for deployment.
-    #        Double-check this! TD117
-    #
-    config_package_root = config.config.get('local_packages_path')
-
-    version_path = os.path.join(
-        config_package_root,
-        package,
-        version,
-    )
-
-    install_path = os.path.join(version_path, config_helper.INSTALL_FOLDER_NAME)
+    install_path = os.path.join(_get_version_path(package, version), config_helper.INSTALL_FOLDER_NAME)
 
-    # TODO : Running makedirs here is not be necessary for every package.
-    #        Consider removing.
-    #
     if not os.path.isdir(install_path):
         os.makedirs(install_path)
 
     environment.init(source_path, install_path)
-    manager.install(package, root, config_package_root, version=version)
 
+    developer_package = get_developer_package(source_path)
+    build_system = create_build_system(source_path, package=developer_package)
+    builder = create_build_process(
+        'local', source_path, build_system, package=developer_package)
+
+    builder.build(install_path=config.config.get('local_packages_path'), clean=True, install=True)
 
-def run_with_rez(package_name, version, runner, app_args):
-    '''Execute a repository package's main command.
+
+def build_context(package, version, root, source_path='', callback=None):
+    '''Build the given `package` and its requirements, building independent requirements in parallel.
 
     Args:
-        package_name (str):
-            The name of the installed rez package. This is the "name"
-            variable defined in `package_name`/`version`/package.py file.
+        package (str):
+            The name of the Rez package to build.
         version (str):
-            The specific install of the installed rez package. This is the "version"
-            variable defined in `package_name`/`version`/package.py file.
-        runner (`BaseAdapter`):
-            The class used to actually run the command in the user's Rez package.
-        app_args (str):
-            Any arguments the application may require
+            The specific release of `package` to build.
+        root (str):
+            The absolute path to where all Rez packages can be found.
+        source_path (str, optional):
+            The absolute path to where the package.py file exists.
+            If no path is given, assume that the source_path can be found
+            under `root`. Default: "".
+        callback (callable[str, str, int, int], optional):
+            A function which is called after each package is built with the name,
+            version, number of built packages and total number of packages to build.
 
     Raises:
-        EnvironmentError: If the Rez installation could not be found.
-        RuntimeError: If the package could not be built or installed.
+        RuntimeError: If any package could not be built.
 
     '''
-    add_rez_to_sys_path_if_needed(runner)
+    from rez import config
+
+    if not source_path:
+        source_path = os.path.join(root, package, version)
+
+    rez_builder = imp.load_source('rez_builder', os.path.join(_CURRENT_DIR, '__rez_builder.py'))
+
+    def _report(node, finished, total):
+        if callback:
+            callback(node.name, node.version, finished, total)
+
+    rez_builder.build(
+        rez_builder.Node(package, version, source_path),
+        root,
+        config.config.get('local_packages_path'),
+        callback=_report,
+    )
+
+
+def _get_package_source(package_name, version):
+    '''Find the package definition of a package.
+
+    Args:
+        package_name (str): The name of the Rez package.
+        version (str): The specific release of `package_name`, if any.
+
+    Raises:
+        RuntimeError: If the package's folder or package.py file does not exist.
+
+    Returns:
+        tuple[str, module]: The absolute path to the package's folder and its imported package.py.
 
+    '''
     source_path = os.path.join(
         config.REZ_PACKAGE_ROOT,
         package_name,
@@ -219,25 +462,195 @@ def run_with_rez(package_name, version, runner, app_args):
         raise RuntimeError('source_path "{source_path}" has no package.py file.'.format(
             source_path=source_path))
 
+    return (source_path, package_module)
+
+
+def _resolve(package_module, version, source_path, auto_install, progress_callback=None):
+    '''Resolve (and, if allowed, build) a package and then bake its context.
+
+    Args:
+        package_module (module): The imported package.py of the package to resolve.
+        version (str): The specific release of the package to resolve.
+        source_path (str): The absolute path to the package's folder.
+        auto_install (bool): If True, build the package if it can't be resolved.
+        progress_callback (callable[str, str, int, int], optional):
+            If the package needs to be built, this function is called
+            after each package is built. See :func:`build_context`.
+
+    Raises:
+        `rezzurect_exceptions.ContextNotFound`:
+            If the package can't be resolved and `auto_install` is False.
+        RuntimeError: If the package could not be built or installed.
+
+    Returns:
+        `rez.resolved_context.ResolvedContext`: The resolved context.
+
+    '''
     packages = ['{package_module.name}-{version}'.format(
         package_module=package_module, version=version)]
 
     context = get_context(packages)
 
-    if not context and not config.AUTO_INSTALLS:
+    if not context and not auto_install:
         raise rezzurect_exceptions.ContextNotFound('No existing package could be found')
 
     if not context:
         LOGGER.info('Package "%s" was not found. Attempting to build from scratch now.', packages)
-        build_context_from_scratch(
+        build_context(
             package_module.name,
             version,
             config.REZ_PACKAGE_ROOT,
             source_path,
+            callback=progress_callback,
         )
         context = get_context(packages)
 
     if not context:
         raise RuntimeError('The package(s) "{packages}" could not be found or built.'.format(packages=packages))
 
+    LOGGER.debug('Resolved "%s" in %.02f seconds (from cache: %s).',
+                 packages, context.solve_time, context.from_cache)
+
+    if is_baked_launch_enabled() and version:
+        try:
+            bake_context(context, package_module.name, version, source_path)
+        except (IOError, OSError):
+            # Baking is only an optimization. It must never stop the launch
+            LOGGER.exception('Context for "%s" could not be baked.', packages)
+
+    return context
+
+
+def prewarm(package_name, version, runner, auto_install=False):
+    '''Resolve a package ahead of time so that launching it later is fast.
+
+    The resolve is stored in the local resolve cache and, if baked launches
+    are enabled, baked next to the installed package.
+
+    Args:
+        package_name (str):
+            The name of the installed rez package.
+        version (str):
+            The specific install of the installed rez package.
+        runner (`BaseAdapter`):
+            The class used to find Rez, if it isn't importable.
+        auto_install (bool, optional):
+            If True, build the package if it can't be resolved. Default: False.
+
+    Raises:
+        `rezzurect_exceptions.ContextNotFound`:
+            If the package can't be resolved and `auto_install` is False.
+
+    '''
+    add_rez_to_sys_path_if_needed(runner)
+    source_path, package_module = _get_package_source(package_name, version)
+
+    if is_baked_launch_enabled() and version and \
+            get_baked_environ(package_module.name, version, source_path) is not None:
+        return
+
+    _resolve(package_module, version, source_path, auto_install)
+
+
+def _resolve_and_profile(package_module, version, source_path, auto_install, progress_callback=None):
+    '''Resolve a package and, if Rez's resolve profiling is enabled, log its trace.
+
+    When the Rez "resolve_profile_path" setting is set, the whole resolve,
+    including any packages that have to be built first, is profiled and the
+    path of the written trace is logged, so that it can be attached to
+    reports of slow launches.
+
+    Args:
+        package_module (module): The imported package.py of the package to resolve.
+        version (str): The specific release of the package to resolve.
+        source_path (str): The absolute path to the package's folder.
+        auto_install (bool): If True, build the package if it can't be resolved.
+        progress_callback (callable[str, str, int, int], optional):
+            If the package needs to be built, this function is called
+            after each package is built. See :func:`build_context`.
+
+    Returns:
+        `rez.resolved_context.ResolvedContext`: The resolved context.
+
+    '''
+    from rez.config import config as rez_config
+    from rez.utils import profiling
+
+    if not rez_config.resolve_profile_path:
+        return _resolve(
+            package_module,
+            version,
+            source_path,
+            auto_install,
+            progress_callback=progress_callback,
+        )
+
+    name = '{}-{}'.format(package_module.name, version)
+
+    with profiling.profiled(name=name) as profiler:
+        context = _resolve(
+            package_module,
+            version,
+            source_path,
+            auto_install,
+            progress_callback=progress_callback,
+        )
+
+    # The profile is only for reports so failing to write it must not fail the launch
+    try:
+        trace_path = profiling.write_trace(profiler, prefix=package_module.name)
+    except (IOError, OSError):
+        LOGGER.warning('The resolve profile of "%s" could not be written.', name, exc_info=True)
+    else:
+        LOGGER.info('Wrote the resolve profile of "%s" to "%s".', name, trace_path)
+
+    return context
+
+
+def run_with_rez(package_name, version, runner, app_args, progress_callback=None):
+    '''Execute a repository package's main command.
+
+    If the package was launched before, its resolved context and environment
+    are "baked" next to the installed package and re-used, which avoids
+    resolving the package again. Set the `REZZURECT_BAKED_LAUNCH`
+    environment variable to "0" to disable this.
+
+    Args:
+        package_name (str):
+            The name of the installed rez package. This is the "name"
+            variable defined in `package_name`/`version`/package.py file.
+        version (str):
+            The specific install of the installed rez package. This is the "version"
+            variable defined in `package_name`/`version`/package.py file.
+        runner (`BaseAdapter`):
+            The class used to actually run the command in the user's Rez package.
+        app_args (str):
+            Any arguments the application may require
+        progress_callback (callable[str, str, int, int], optional):
+            If the package needs to be built, this function is called
+            after each package is built. See :func:`build_context`.
+
+    Raises:
+        EnvironmentError: If the Rez installation could not be found.
+        RuntimeError: If the package could not be built or installed.
+
+    '''
+    add_rez_to_sys_path_if_needed(runner)
+    source_path, package_module = _get_package_source(package_name, version)
+
+    if is_baked_launch_enabled() and version:
+        environ = get_baked_environ(package_module.name, version, source_path)
+
+        if environ is not None:
+            LOGGER.debug('Launching "%s-%s" from its baked context.', package_module.name, version)
+            return runner.execute_environ(package_name, version, environ, app_args)
+
+    context = _resolve_and_profile(
+        package_module,
+        version,
+        source_path,
+        config.AUTO_INSTALLS,
+        progress_callback=progress_callback,
+    )
+
     return runner.execute(package_name, version, context, app_args)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+'''A module that resolves Rez packages in the background, before the user launches them.
+
+Resolving a package the first time can take seconds. tk-multi-launchapp
+knows about every software version long before the user clicks on one so
+this module resolves each of them ahead of time, in background threads.
+Each resolve is stored in the local resolve cache (and baked, if baked
+launches are enabled) so the user's first launch is as fast as every
+launch after it.
+
+Rez is configured (which changes `os.environ` and `sys.path`) on the calling
+thread, before any background thread starts.
+
+'''
+
+# IMPORT STANDARD LIBRARIES
+import threading
+import platform
+import logging
+import Queue
+import imp
+import sys
+import os
+
+
+_CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
+LOGGER = logging.getLogger('rezzurect.rez_prewarm')
+
+PREWARM_ENVIRONMENT_VARIABLE = 'REZZURECT_PREWARM'
+PREWARM_BUILD_ENVIRONMENT_VARIABLE = 'REZZURECT_PREWARM_BUILD'
+PREWARM_WORKERS_ENVIRONMENT_VARIABLE = 'REZZURECT_PREWARM_WORKERS'
+
+_SERVICE = None
+_SERVICE_LOCK = threading.Lock()
+
+
+def _load_module(name):
+    '''Import one of the private "__rez_*.py" modules in this folder, only once.
+
+    Modules are cached in `sys.modules`, which is shared with the app_launch hook.
+
+    Args:
+        name (str): The name of the module to load. e.g. "rez_config".
+
+    Returns:
+        module: The loaded module.
+
+    '''
+    try:
+        return sys.modules[name]
+    except KeyError:
+        return imp.load_source(name, os.path.join(_CURRENT_DIR, '__{name}.py'.format(name=name)))
+
+
+class PrewarmService(object):
+
+    '''A pool of background threads which resolve Rez packages.'''
+
+    def __init__(self, workers=1, auto_install=False):
+        '''Create the service. No threads are started until a package is added.
+
+        Args:
+            workers (int, optional):
+                The number of packages to resolve at once. Default: 1.
+            auto_install (bool, optional):
+                If True, build any package that can't be resolved. Default: False.
+
+        '''
+        super(PrewarmService, self).__init__()
+
+        self.auto_install = auto_install
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._queue = Queue.Queue()
+        self._requested = set()
+        self._threads = []
+        self._launcher = None
+        self._runner = None
+
+    def add(self, package, version):
+        '''Resolve the given package in the background.
+
+        Packages which were already added are ignored.
+
+        Args:
+            package (str): The name of the Rez package to resolve.
+            version (str): The specific release of `package` to resolve.
+
+        '''
+        with self._lock:
+            if (package, version) in self._requested:
+                return
+
+            self._requested.add((package, version))
+            self._start()
+
+        self._queue.put((package, version))
+
+    def wait(self):
+        '''Block until every added package is resolved.'''
+        self._queue.join()
+
+    def _start(self):
+        '''Configure Rez and start the background threads, if they aren't running already.'''
+        if self._threads:
+            return
+
+        # Configuring Rez changes global state, so it must not happen while
+        # another thread may be resolving
+        #
+        _load_module('rez_config').init_config()
+        self._launcher = _load_module('rez_launcher')
+        self._runner = _load_module('rez_runner').get_runner(platform.system())
+
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._run, name='rezzurect-prewarm')
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        '''Resolve packages until the process exits.'''
+        while True:
+            package, version = self._queue.get()
+
+            try:
+                self._launcher.prewarm(package, version, self._runner, auto_install=self.auto_install)
+                LOGGER.debug('Prewarmed "%s-%s".', package, version)
+            except Exception:  # pylint: disable=broad-except
+                # Prewarming is only an optimization. Launching the package will report the real error
+                LOGGER.debug('Package "%s-%s" could not be prewarmed.', package, version, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+
+def is_enabled():
+    '''bool: Check if packages should be resolved in the background.'''
+    return os.getenv(PREWARM_ENVIRONMENT_VARIABLE, '1') != '0'
+
+
+def get_service():
+    '''`PrewarmService`: Get the prewarm service that is shared by this process.'''
+    global _SERVICE  # pylint: disable=global-statement
+
+    with _SERVICE_LOCK:
+        if _SERVICE is None:
+            _SERVICE = PrewarmService(
+                workers=int(os.getenv(PREWARM_WORKERS_ENVIRONMENT_VARIABLE, '1')),
+                auto_install=os.getenv(PREWARM_BUILD_ENVIRONMENT_VARIABLE, '0') == '1',
+            )
+
+    return _SERVICE
+
+
+def prewarm_engine(engine_name, version):
+    '''Resolve the Rez package of an engine in the background, if it has one.
+
+    Args:
+        engine_name (str): The name of the engine that launches the package. e.g. "tk-nuke".
+        version (str): The specific release of the package to resolve. e.g. "11.2v3".
+
+    Returns:
+        bool: If the package will be resolved.
+
+    '''
+    if not is_enabled():
+        return False
+
+    package = _load_module('rez_config').ENGINES_TO_PACKAGE.get(engine_name)
+
+    if not package:
+        return False
+
+    get_service().add(package, version)
+
+    return True
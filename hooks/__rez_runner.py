@@ -6,10 +6,266 @@
 
 # IMPORT STANDARD LIBRARIES
 import subprocess
+import threading
 import platform
+import tempfile
+import logging
+import json
+import time
+import os
 
-# IMPORT THIRD-PARTY LIBRARIES
-from rezzurect import chooser
+
+LOGGER = logging.getLogger('rezzurect.rez_runner')
+LAUNCH_RECORDS_ENVIRONMENT_VARIABLE = 'REZZURECT_LAUNCH_RECORDS'
+_POLL_INTERVAL = 5.0  # seconds
+
+_SUPERVISOR = None
+_SUPERVISOR_LOCK = threading.Lock()
+
+
+def _read_rss(pid):
+    '''int: Get the resident memory of a process, in kilobytes. Return 0 if it isn't known.'''
+    try:
+        with open('/proc/{pid}/status'.format(pid=pid), 'r') as file_:
+            for line in file_:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+
+    return 0
+
+
+def _get_child_pids():
+    '''dict[int, list[int]]: Find the child processes of every running process, using /proc.'''
+    children = dict()
+
+    try:
+        names = os.listdir('/proc')
+    except OSError:
+        return children
+
+    for name in names:
+        if not name.isdigit():
+            continue
+
+        try:
+            with open('/proc/{name}/stat'.format(name=name), 'r') as file_:
+                # The process name is wrapped in "()" and may contain spaces so split after it
+                parent = int(file_.read().rsplit(')', 1)[1].split()[1])
+        except (IOError, OSError, ValueError, IndexError):
+            continue
+
+        children.setdefault(parent, []).append(int(name))
+
+    return children
+
+
+def get_tree_rss(pid, children=None):
+    '''Get the resident memory of a process and all of its child processes.
+
+    The DCC usually runs as a child of the Rez shell process, so just
+    reading the memory of `pid` isn't enough.
+
+    Args:
+        pid (int):
+            The ID of the top-most process.
+        children (dict[int, list[int]], optional):
+            The child processes of every running process. If nothing is
+            given, /proc is scanned to find them. See :func:`_get_child_pids`.
+
+    Returns:
+        int: The memory, in kilobytes. On systems without /proc, this is always 0.
+
+    '''
+    if not os.path.isdir('/proc'):
+        return 0
+
+    if children is None:
+        children = _get_child_pids()
+
+    unvisited = [pid]
+    total = 0
+
+    while unvisited:
+        current = unvisited.pop()
+        total += _read_rss(current)
+        unvisited.extend(children.get(current, []))
+
+    return total
+
+
+def get_launch_records_directory():
+    '''str: Get the folder where a record of every launch is written to.'''
+    return os.path.expanduser(
+        os.getenv(LAUNCH_RECORDS_ENVIRONMENT_VARIABLE, os.path.join('~', '.rez', 'launches')))
+
+
+class _Launch(object):
+
+    '''A process that was launched and the statistics that were gathered about it.'''
+
+    def __init__(self, process, command, package, version, packages=None):
+        '''Start tracking a launched process.
+
+        Args:
+            process (`subprocess.Popen`): The launched process.
+            command (str): The command that launched `process`.
+            package (str): The name of the launched Rez package.
+            version (str): The specific release of `package`.
+            packages (list[str], optional): Every resolved package of the launch, if known.
+
+        '''
+        super(_Launch, self).__init__()
+
+        self.process = process
+        self.command = command
+        self.package = package
+        self.version = version
+        self.packages = packages or []
+        self.start = time.time()
+        self.end = None
+        self.return_code = None
+        self.peak_rss = 0
+
+        name = '{start}-{package}-{pid}.json'.format(
+            start=int(self.start), package=package, pid=process.pid)
+        self.path = os.path.join(get_launch_records_directory(), name)
+
+    def get_record(self):
+        '''dict[str, object]: Summarize this launch so it can be written to disk.'''
+        end = self.end or time.time()
+
+        return {
+            'command': self.command,
+            'duration': end - self.start,
+            'end': self.end,
+            'package': self.package,
+            'packages': self.packages,
+            'peak_rss_kb': self.peak_rss,
+            'pid': self.process.pid,
+            'return_code': self.return_code,
+            'start': self.start,
+            'status': 'running' if self.end is None else 'finished',
+            'version': self.version,
+        }
+
+    def write(self):
+        '''Write this launch's record to disk. Errors are logged, never raised.'''
+        directory = os.path.dirname(self.path)
+
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+
+            handle, temporary_path = tempfile.mkstemp(dir=directory, suffix='.json')
+
+            with os.fdopen(handle, 'w') as file_:
+                json.dump(self.get_record(), file_, indent=4, sort_keys=True)
+
+            os.rename(temporary_path, self.path)
+        except (IOError, OSError):
+            LOGGER.exception('Launch record "%s" could not be written.', self.path)
+
+
+class ProcessSupervisor(object):
+
+    '''Track launched processes in the background.
+
+    There is one supervisor thread that polls all launched processes.
+
+    While a process runs, its peak memory is sampled. Once it exits, its exit code
+    and runtime are written to a per-launch record. See :func:`get_launch_records_directory`.
+
+    '''
+
+    def __init__(self, interval=_POLL_INTERVAL):
+        '''Create the supervisor. Its thread is only started once a process is added.
+
+        Args:
+            interval (float, optional):
+                The number of seconds to wait between checking each process.
+
+        '''
+        super(ProcessSupervisor, self).__init__()
+
+        self.interval = interval
+        self._launches = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, process, command, package, version, packages=None):
+        '''Start tracking a process.
+
+        Args:
+            process (`subprocess.Popen`): The launched process.
+            command (str): The command that launched `process`.
+            package (str): The name of the launched Rez package.
+            version (str): The specific release of `package`.
+            packages (list[str], optional): Every resolved package of the launch, if known.
+
+        '''
+        launch = _Launch(process, command, package, version, packages=packages)
+        launch.write()
+
+        with self._lock:
+            self._launches.append(launch)
+
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='rezzurect-supervisor')
+                self._thread.daemon = True
+                self._thread.start()
+
+    def poll(self):
+        '''Update every tracked process and write the records of any process that has exited.'''
+        with self._lock:
+            launches = list(self._launches)
+
+        if not launches:
+            return
+
+        # Scan /proc once per poll, no matter how many processes are tracked
+        children = _get_child_pids() if os.path.isdir('/proc') else dict()
+
+        for launch in launches:
+            launch.peak_rss = max(
+                launch.peak_rss, get_tree_rss(launch.process.pid, children=children))
+            return_code = launch.process.poll()
+
+            if return_code is None:
+                continue
+
+            launch.end = time.time()
+            launch.return_code = return_code
+            launch.write()
+
+            if return_code:
+                LOGGER.warning('Package "%s-%s" exited with code "%s".',
+                               launch.package, launch.version, return_code)
+
+            with self._lock:
+                self._launches.remove(launch)
+
+    def _run(self):
+        '''Poll every tracked process until the process exits.'''
+        while True:
+            try:
+                self.poll()
+            except Exception:  # pylint: disable=broad-except
+                LOGGER.exception('Launched processes could not be polled.')
+
+            time.sleep(self.interval)
+
+
+def get_supervisor():
+    '''`ProcessSupervisor`: Get the supervisor that is shared by this process.'''
+    global _SUPERVISOR  # pylint: disable=global-statement
+
+    with _SUPERVISOR_LOCK:
+        if _SUPERVISOR is None:
+            _SUPERVISOR = ProcessSupervisor()
+
+    return _SUPERVISOR
 
 
 class BaseAdapter(object):
@@ -54,10 +310,56 @@ class BaseAdapter(object):
 
         return ''
 
+    @staticmethod
+    def _get_executable_command(package, version, args):
+        '''Get the command that runs a package's main executable with the given `args`.
+
+        Launched processes are already tracked in the background so the
+        command is never sent to the background by the shell. Otherwise,
+        the shell would exit immediately and its exit code, not the
+        executable's, would be recorded.
+
+        Args:
+            package (str): The name of the installed Rez package to run.
+            version (str): The specific instance of `package` to run.
+            args (str): Additional arguments to add to the generated command.
+
+        Returns:
+            str: The generated command.
+
+        '''
+        from rezzurect import chooser
+
+        setting_adapter = chooser.get_setting_adapter(package, version, platform.system())
+        command = setting_adapter.get_executable_command().rstrip()
+
+        if command.endswith('&'):
+            command = command[:-1].rstrip()
+
+        if args:
+            command += ' {args}'.format(args=args)
+
+        return command
+
+    @staticmethod
+    def _get_result(process, command):
+        '''dict[str, str or int]: Summarize a process that was just launched.
+
+        Its return code is 0 unless the process has already exited.
+
+        '''
+        return {
+            'command': command,
+            'return_code': process.poll() or 0,
+        }
+
     @classmethod
     def execute(cls, package, version, context, args):
         '''Run the context's main command with the given `args`.
 
+        This function returns as soon as the command starts. The process
+        is tracked in the background. See :class:`ProcessSupervisor`.
+
         Example:
             For the "nuke-11.2v3" package, the main command to run is "Nuke11.2".
 
@@ -71,11 +373,7 @@ class BaseAdapter(object):
             dict[str, str or int]: The results of the command's execution.
 
         '''
-        setting_adapter = chooser.get_setting_adapter(package, version, platform.system())
-        command = setting_adapter.get_executable_command()
-
-        if args:
-            command += ' {args}'.format(args=args)
+        command = cls._get_executable_command(package, version, args)
 
         process = context.execute_shell(
             command=command,
@@ -83,13 +381,36 @@ class BaseAdapter(object):
             block=False,
         )
 
-        return_code = process.wait()
-        context.print_info(verbosity=True)
+        packages = [variant.qualified_package_name for variant in context.resolved_packages or []]
+        get_supervisor().add(process, command, package, version, packages=packages)
 
-        return {
-            'command': command,
-            'return_code': return_code,
-        }
+        return cls._get_result(process, command)
+
+    @classmethod
+    def execute_environ(cls, package, version, environ, args):
+        '''Run a package's main command, using an already-resolved environment.
+
+        This function returns as soon as the command starts. The process
+        is tracked in the background. See :class:`ProcessSupervisor`.
+
+        Args:
+            package (str): The name of the installed Rez package to run.
+            version (str): The specific instance of `package` to run.
+            environ (dict[str, str]): The environment variables to run the command with.
+            args (str): Additional arguments to add to the generated command.
+
+        Returns:
+            dict[str, str or int]: The results of the command's execution.
+
+        '''
+        command = cls._get_executable_command(package, version, args)
+        process = subprocess.Popen(command, env=environ, shell=True)
+
+        # Rez writes every resolved package of a context into its environment
+        packages = environ.get('REZ_USED_RESOLVE', '').split()
+        get_supervisor().add(process, command, package, version, packages=packages)
+
+        return cls._get_result(process, command)
 
 
 class LinuxAdapter(BaseAdapter):
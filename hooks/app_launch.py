@@ -15,8 +15,11 @@ This hook is executed to launch the applications.
 """
 
 # IMPORT STANDARD LIBRARIES
+import collections
 import platform
+import time
 import imp
+import sys
 import os
 
 # IMPORT THIRD-PARTY LIBRARIES
@@ -24,16 +27,59 @@ import tank
 
 
 __CURRENT_DIR = os.path.dirname(os.path.realpath(__file__))
-rez_config = imp.load_source('rez_config', os.path.join(__CURRENT_DIR, '__rez_config.py'))
-rez_launcher = imp.load_source('rez_launcher', os.path.join(__CURRENT_DIR, '__rez_launcher.py'))
-rez_runner = imp.load_source('rez_runner', os.path.join(__CURRENT_DIR, '__rez_runner.py'))
+_MODULES = dict()
+_IMPORT_TIMES = collections.OrderedDict()
 
 
-ENGINES_TO_PACKAGE = {
-    'tk-houdini': 'houdini',
-    'tk-maya': 'maya',
-    'tk-nuke': 'nuke',
-}
+def _load_module(name):
+    '''Import one of the private "__rez_*.py" modules next to this hook, only once.
+
+    The time that it takes to import each module is recorded so it can be
+    reported, later. See :func:`get_import_timings`. Modules that were
+    already imported elsewhere (e.g. by the prewarm hook) are found in
+    `sys.modules` and re-used.
+
+    Args:
+        name (str): The name of the module to load. e.g. "rez_config".
+
+    Returns:
+        module: The loaded module.
+
+    '''
+    try:
+        return _MODULES[name]
+    except KeyError:
+        pass
+
+    if name in sys.modules:
+        _MODULES[name] = sys.modules[name]
+
+        return _MODULES[name]
+
+    start = time.time()
+    module = imp.load_source(name, os.path.join(__CURRENT_DIR, '__{name}.py'.format(name=name)))
+    _IMPORT_TIMES[name] = time.time() - start
+    _MODULES[name] = module
+
+    return module
+
+
+def get_import_timings():
+    '''list[tuple[str, float]]: Get the modules this hook imported and their import time, in seconds.'''
+    return list(_IMPORT_TIMES.items())
+
+
+def get_startup_report():
+    '''str: Summarize how long each module that this hook needed took to import.'''
+    timings = get_import_timings()
+
+    if not timings:
+        return 'No modules were imported.'
+
+    lines = ['{name}: {seconds:.4f}s'.format(name=name, seconds=seconds) for name, seconds in timings]
+    lines.append('total: {seconds:.4f}s'.format(seconds=sum(seconds for _, seconds in timings)))
+
+    return ', '.join(lines)
 
 
 class AppLaunch(tank.Hook):
@@ -54,17 +100,24 @@ class AppLaunch(tank.Hook):
 
         :returns: (dict) The two valid keys are 'command' (str) and 'return_code' (int).
         """
-        rez_config.init_config()
-
-        package = ENGINES_TO_PACKAGE.get(engine_name)
-
-        runner = rez_runner.get_runner(platform.system())
+        rez_config = _load_module('rez_config')
+        runner = _load_module('rez_runner').get_runner(platform.system())
+        package = rez_config.ENGINES_TO_PACKAGE.get(engine_name)
 
         if not package:
             self.logger.debug('No rez package was found. The default boot, instead.')
+            self.logger.debug('Launch hook startup timings: %s', get_startup_report())
             return run_with_os(runner, app_path, app_args)
 
-        return rez_launcher.run_with_rez(package, version, runner, app_args)
+        rez_config.init_config()
+        rez_launcher = _load_module('rez_launcher')
+        self.logger.debug('Launch hook startup timings: %s', get_startup_report())
+
+        def _report_progress(name, version_, finished, total):
+            self.logger.info('Built "%s-%s" (%s/%s).', name, version_, finished, total)
+
+        return rez_launcher.run_with_rez(
+            package, version, runner, app_args, progress_callback=_report_progress)
 
 
 def run_with_os(runner, app_path, app_args):
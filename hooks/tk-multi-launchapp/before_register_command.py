@@ -8,9 +8,14 @@
 # agreement to the Shotgun Pipeline Toolkit Source Code License. All rights 
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
+import imp
+import os
+import sys
+
 import sgtk
 
 HookBaseClass = sgtk.get_hook_baseclass()
+_HOOKS_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 
 class BeforeRegisterCommand(HookBaseClass):
     """
@@ -41,5 +46,31 @@ class BeforeRegisterCommand(HookBaseClass):
         if software_version.product == "NukeStudio":
             engine_instance_name = "tk-nukestudio"
 
+        self._prewarm(software_version, engine_instance_name)
+
         return engine_instance_name
 
+    def _prewarm(self, software_version, engine_instance_name):
+        """
+        Start resolving the rez package of the software version in the
+        background so that the first launch doesn't have to wait for it.
+
+        :param software_version: The software version that is about to be registered.
+        :type: :class:`sgtk.platform.SoftwareVersion`
+        :param str engine_instance_name: The name of the engine instance that will
+            be used when SGTK is bootstrapped during launch.
+        """
+        try:
+            rez_prewarm = sys.modules.get("rez_prewarm") or imp.load_source(
+                "rez_prewarm", os.path.join(_HOOKS_DIR, "__rez_prewarm.py"))
+
+            if rez_prewarm.prewarm_engine(engine_instance_name, software_version.version):
+                self.logger.debug(
+                    "Prewarming %s %s in the background.",
+                    engine_instance_name,
+                    software_version.version,
+                )
+        except Exception:
+            # Prewarming is only an optimization. It must never stop a command from registering
+            self.logger.debug("Could not start prewarming.", exc_info=True)
+
@@ -0,0 +1,339 @@
+"""
+Solver benchmarking, using synthetic in-memory package repositories.
+
+A synthetic repository is generated from a handful of parameters (number of
+families, versions per family, variant fan-out, requirements per package and
+conflict density) and a random seed, so the same parameters always produce
+the same repository. A set of representative requests is then resolved
+against it, and the `Solver.solve_stats` of each resolve are gathered into a
+plain dict that can be written out as JSON, and compared against a baseline.
+"""
+from rez.package_repository import package_repository_manager
+from rez.vendor.version.requirement import Requirement
+from rez.solver import Solver, SolverStatus
+import random
+import time
+
+
+# bump this if the format of benchmark results changes
+benchmark_format_version = 1
+
+
+default_params = {
+    "num_families": 50,
+    "versions_per_family": 10,
+    "variant_fanout": 1,
+    "requires_per_package": 3,
+    "conflict_density": 0.1,
+    "seed": 0
+}
+
+
+# the family that variants are split over, eg like "python-2.7"/"python-3.6"
+variant_family = "bench_base"
+
+
+def _family_name(index):
+    return "bench_%04d" % index
+
+
+def create_synthetic_repository_data(num_families=50, versions_per_family=10,
+                                     variant_fanout=1, requires_per_package=3,
+                                     conflict_density=0.1, seed=0):
+    """Generate the data for a synthetic memory package repository.
+
+    Families only ever require families with a higher index, so the generated
+    packages never contain cyclic dependencies. Most requirements are open
+    ranges (eg "bench_0012-3+<7"). A `conflict_density` proportion of them are
+    instead pinned to a single version, or are conflict requirements (eg
+    "!bench_0040-2"), which forces the solver to backtrack.
+
+    Args:
+        num_families (int): Number of package families.
+        versions_per_family (int): Number of versions of each family.
+        variant_fanout (int): Number of variants of each package. Each variant
+            requires a different version of a common base family. If 1 or
+            less, packages have no variants.
+        requires_per_package (int): Maximum number of requirements of each
+            package.
+        conflict_density (float): Proportion (0-1) of requirements that are
+            pinned or conflicting.
+        seed (int): Random seed.
+
+    Returns:
+        dict: Repository data, as expected by `MemoryPackageRepository`.
+    """
+    rand = random.Random(seed)
+    data = {}
+    versions = [str(i + 1) for i in range(versions_per_family)]
+
+    if variant_fanout > 1:
+        data[variant_family] = dict(
+            (str(i), {"name": variant_family, "version": str(i)})
+            for i in range(variant_fanout))
+
+    for index in range(num_families):
+        name = _family_name(index)
+        family = {}
+        dependencies = range(index + 1, num_families)
+
+        for version in versions:
+            requires = []
+            num_requires = min(rand.randint(0, requires_per_package),
+                               len(dependencies))
+
+            for dep_index in rand.sample(dependencies, num_requires):
+                dep_name = _family_name(dep_index)
+
+                if rand.random() < conflict_density:
+                    dep_version = rand.choice(versions)
+                    if rand.random() < 0.5:
+                        requires.append("%s-%s" % (dep_name, dep_version))
+                    else:
+                        requires.append("!%s-%s" % (dep_name, dep_version))
+                else:
+                    lower = rand.randint(1, versions_per_family)
+                    upper = rand.randint(lower, versions_per_family) + 1
+                    requires.append("%s-%d+<%d" % (dep_name, lower, upper))
+
+            package = {
+                "name": name,
+                "version": version,
+                "requires": requires
+            }
+
+            if variant_fanout > 1:
+                package["variants"] = [["%s-%d" % (variant_family, i)]
+                                       for i in range(variant_fanout)]
+
+            family[version] = package
+
+        data[name] = family
+
+    return data
+
+
+def create_synthetic_requests(num_families=50, num_requests=10,
+                              max_request_size=3, seed=0):
+    """Generate a set of requests to resolve against a synthetic repository.
+
+    Requests favour the lowest indexed families, since they have the deepest
+    dependency trees.
+
+    Args:
+        num_families (int): Number of families in the repository.
+        num_requests (int): Number of requests to generate.
+        max_request_size (int): Maximum number of packages in each request.
+        seed (int): Random seed.
+
+    Returns:
+        List of list of str: The requests.
+    """
+    rand = random.Random(seed)
+    candidates = range(max(1, num_families / 4))
+    requests = []
+
+    for _ in range(num_requests):
+        size = min(rand.randint(1, max_request_size), len(candidates))
+        indexes = sorted(rand.sample(candidates, size))
+        requests.append([_family_name(i) for i in indexes])
+
+    return requests
+
+
+def register_synthetic_repository(data, name=None):
+    """Make a synthetic repository visible to the solver.
+
+    Args:
+        data (dict): Repository data, see `create_synthetic_repository_data`.
+        name (str): Repository location. Defaults to a name that is unique to
+            `data`.
+
+    Returns:
+        str: The package path to give to the solver, eg "memory@bench_1234".
+    """
+    name = name or ("bench_%x" % id(data))
+    path = "memory@%s" % name
+    repo = package_repository_manager.get_repository(path)
+    repo.data = data
+    return path
+
+
+def run_benchmark(requests, package_paths, repetitions=1, cold=True,
+                  optimised=True):
+    """Resolve each request and gather the solver stats.
+
+    Args:
+        requests (list of list of str): Requests to resolve.
+        package_paths (list of str): Package search path.
+        repetitions (int): Number of times to resolve each request.
+        cold (bool): If True, package repository caches are cleared before
+            each resolve, so that package loading is included in the timings.
+        optimised (bool): Run the solver in optimised mode.
+
+    Returns:
+        dict: Benchmark results, of the form:
+
+            {
+                "resolves": [
+                    {
+                        "request": ["foo", "bah-1"],
+                        "status": "solved",
+                        "resolve": ["foo-1.0[]", "bah-1.2[0]"],
+                        "solve_stats": [<Solver.solve_stats>, ...]
+                    },
+                    ...
+                ],
+                "summary": {<totals of every solve_stats>}
+            }
+    """
+    resolves = []
+    summary = {}
+
+    for request in requests:
+        package_requests = [Requirement(x) for x in request]
+        entry = {
+            "request": list(request),
+            "solve_stats": []
+        }
+
+        for _ in range(repetitions):
+            if cold:
+                for path in package_paths:
+                    package_repository_manager.get_repository(path).clear_caches()
+
+            solver = Solver(package_requests,
+                            package_paths=package_paths,
+                            optimised=optimised)
+
+            t = time.time()
+            solver.solve()
+            wall_time = time.time() - t
+
+            stats = solver.solve_stats
+            stats["global"]["wall_time"] = wall_time
+            entry["solve_stats"].append(stats)
+            _accumulate(summary, stats)
+
+        entry["status"] = solver.status.name
+        if solver.status == SolverStatus.solved:
+            entry["resolve"] = [str(x) for x in solver.resolved_packages]
+        else:
+            entry["resolve"] = None
+
+        resolves.append(entry)
+
+    summary.setdefault("global", {})["num_resolves"] = \
+        len(requests) * repetitions
+    summary["global"]["num_failed_resolves"] = len(
+        [x for x in resolves if x["status"] != SolverStatus.solved.name]) \
+        * repetitions
+
+    return {
+        "resolves": resolves,
+        "summary": summary
+    }
+
+
+def run_synthetic_benchmark(num_requests=10, max_request_size=3,
+                            repetitions=1, cold=True, **params):
+    """Generate a synthetic repository, and benchmark resolves against it.
+
+    Args:
+        num_requests (int): Number of requests to resolve.
+        max_request_size (int): Maximum number of packages in each request.
+        repetitions (int): Number of times to resolve each request.
+        cold (bool): See `run_benchmark`.
+        params: Repository parameters, see `create_synthetic_repository_data`.
+            Defaults are taken from `default_params`.
+
+    Returns:
+        dict: Results, as returned by `run_benchmark`, with the additional
+        keys "format_version" and "params".
+    """
+    params_ = default_params.copy()
+    params_.update(params)
+
+    data = create_synthetic_repository_data(**params_)
+    requests = create_synthetic_requests(
+        num_families=params_["num_families"],
+        num_requests=num_requests,
+        max_request_size=max_request_size,
+        seed=params_["seed"])
+
+    name = "bench_%s" % '_'.join(
+        "%s%s" % (k, v) for k, v in sorted(params_.iteritems()))
+    path = register_synthetic_repository(data, name=name)
+
+    results = run_benchmark(requests,
+                            package_paths=[path],
+                            repetitions=repetitions,
+                            cold=cold)
+
+    params_.update(num_requests=num_requests,
+                   max_request_size=max_request_size,
+                   repetitions=repetitions,
+                   cold=cold)
+
+    results["format_version"] = benchmark_format_version
+    results["params"] = params_
+    return results
+
+
+def compare_results(baseline, results):
+    """Compare the summary of benchmark results against a baseline.
+
+    Args:
+        baseline (dict): Results of a previous benchmark.
+        results (dict): Results of the current benchmark.
+
+    Returns:
+        dict: For each summary stat in both results, a dict containing
+        "baseline", "current" and "ratio" (current / baseline) values.
+    """
+    comparison = {}
+
+    for section, stats in results["summary"].iteritems():
+        baseline_stats = baseline.get("summary", {}).get(section, {})
+
+        for key, value in stats.iteritems():
+            baseline_value = baseline_stats.get(key)
+            if baseline_value is None:
+                continue
+
+            if baseline_value:
+                ratio = float(value) / baseline_value
+            else:
+                ratio = None
+
+            comparison.setdefault(section, {})[key] = {
+                "baseline": baseline_value,
+                "current": value,
+                "ratio": ratio
+            }
+
+    return comparison
+
+
+def _accumulate(summary, stats):
+    for section, values in stats.iteritems():
+        totals = summary.setdefault(section, {})
+        for key, value in values.iteritems():
+            if isinstance(value, (int, long, float)):
+                totals[key] = totals.get(key, 0) + value
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
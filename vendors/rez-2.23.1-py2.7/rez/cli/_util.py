@@ -15,6 +15,7 @@ from rez.vendor.argparse import _SubParsersAction, ArgumentParser, SUPPRESS, \
 # * missing: Native python argparse behavior.
 #
 subcommands = {
+    "benchmark": {},
     "bind": {},
     "build": {
         "arg_mode": "grouped"
@@ -37,6 +38,7 @@ subcommands = {
     "help": {},
     "interpret": {},
     "memcache": {},
+    "payloads": {},
     "pip": {},
     "plugins": {},
     "python": {
@@ -49,6 +51,7 @@ subcommands = {
     "selftest": {},
     "status": {},
     "suite": {},
+    "sync": {},
     "test": {},
     "view": {},
     "yaml2py": {},
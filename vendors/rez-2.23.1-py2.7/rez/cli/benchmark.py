@@ -0,0 +1,97 @@
+"""
+Benchmark the solver against a synthetic package repository.
+"""
+
+
+def setup_parser(parser, completions=False):
+    from rez.benchmark import default_params
+
+    parser.add_argument(
+        "--families", type=int, metavar="N",
+        default=default_params["num_families"],
+        help="number of package families (default: %(default)s)")
+    parser.add_argument(
+        "--versions", type=int, metavar="N",
+        default=default_params["versions_per_family"],
+        help="number of versions per family (default: %(default)s)")
+    parser.add_argument(
+        "--variants", type=int, metavar="N",
+        default=default_params["variant_fanout"],
+        help="number of variants per package (default: %(default)s)")
+    parser.add_argument(
+        "--requires", type=int, metavar="N",
+        default=default_params["requires_per_package"],
+        help="maximum number of requirements per package "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--conflict-density", type=float, metavar="RATIO",
+        default=default_params["conflict_density"],
+        help="proportion of requirements that are pinned or conflicting "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--seed", type=int, default=default_params["seed"],
+        help="random seed (default: %(default)s)")
+    parser.add_argument(
+        "-n", "--requests", type=int, default=10, metavar="N",
+        help="number of requests to resolve (default: %(default)s)")
+    parser.add_argument(
+        "--request-size", type=int, default=3, metavar="N",
+        help="maximum number of packages per request (default: %(default)s)")
+    parser.add_argument(
+        "-r", "--repetitions", type=int, default=1, metavar="N",
+        help="number of times to resolve each request (default: %(default)s)")
+    parser.add_argument(
+        "--warm", action="store_true",
+        help="don't clear package caches between resolves")
+    parser.add_argument(
+        "-o", "--output", type=str, metavar="FILE",
+        help="write results to FILE as json, rather than to stdout")
+    parser.add_argument(
+        "-b", "--baseline", type=str, metavar="FILE",
+        help="compare results against those in FILE, and print the "
+        "comparison as json")
+
+
+def command(opts, parser, extra_arg_groups=None):
+    from rez.benchmark import run_synthetic_benchmark, compare_results
+    from rez.utils import json
+
+    results = run_synthetic_benchmark(
+        num_requests=opts.requests,
+        max_request_size=opts.request_size,
+        repetitions=opts.repetitions,
+        cold=(not opts.warm),
+        num_families=opts.families,
+        versions_per_family=opts.versions,
+        variant_fanout=opts.variants,
+        requires_per_package=opts.requires,
+        conflict_density=opts.conflict_density,
+        seed=opts.seed)
+
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            f.write(json.dumps(results, indent=2, sort_keys=True))
+
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            baseline = json.loads(f.read())
+        print json.dumps(compare_results(baseline, results),
+                         indent=2, sort_keys=True)
+    elif not opts.output:
+        print json.dumps(results, indent=2, sort_keys=True)
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -0,0 +1,83 @@
+"""
+Manage the package payload store.
+"""
+
+
+def setup_parser(parser, completions=False):
+    parser.add_argument(
+        "--path", type=str, metavar="PATH",
+        help="payload store path (default: the 'payload_store_path' setting)")
+    parser.add_argument(
+        "--add", type=str, metavar="DIR", nargs='+',
+        help="deduplicate the files under the given directories, such as "
+        "installed payloads, into the store")
+    parser.add_argument(
+        "--gc", action="store_true",
+        help="remove files from the store that no payload uses any more")
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="with --gc, only report what would be removed")
+
+
+def _format_size(num_bytes):
+    size = float(num_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return "%.1f %s" % (size, unit)
+        size /= 1024
+    return "%.1f TB" % size
+
+
+def command(opts, parser, extra_arg_groups=None):
+    from rez.payload_store import PayloadStore
+
+    try:
+        store = PayloadStore(opts.path)
+    except ValueError as e:
+        parser.error(str(e))
+
+    for path in (opts.add or []):
+        if not store.can_link(path):
+            print ("%s: skipped, files cannot be hardlinked into the store "
+                   "(it may be on a different filesystem)" % path)
+            continue
+
+        stats = store.add_tree(path)
+        print ("%s: %d files, %d linked (%s), %d added, %d failed"
+               % (path, stats["num_files"], stats["num_linked"],
+                  _format_size(stats["bytes_linked"]), stats["num_added"],
+                  stats["num_failed"]))
+
+    if opts.gc:
+        num_removed, bytes_freed = store.gc(dry_run=opts.dry_run)
+        verb = "would remove" if opts.dry_run else "removed"
+        print "gc %s %d files (%s)" % (verb, num_removed,
+                                       _format_size(bytes_freed))
+
+    report = store.report()
+    rows = [("store", store.path),
+            ("files in store", report["num_blobs"]),
+            ("unused files", report["num_unused_blobs"]),
+            ("payload links", report["num_links"]),
+            ("store size", _format_size(report["store_bytes"])),
+            ("payload size", _format_size(report["payload_bytes"])),
+            ("saved", _format_size(report["bytes_saved"]))]
+
+    for name, value in rows:
+        print "%-16s%s" % (name + ':', value)
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
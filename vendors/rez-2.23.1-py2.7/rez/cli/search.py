@@ -35,6 +35,9 @@ def setup_parser(parser, completions=False):
         "-l", "--latest", action="store_true",
         help="when searching packages, only show the latest version of each "
         "package")
+    parser.add_argument(
+        "--tool", type=str,
+        help="only show packages that provide the given tool")
     parser.add_argument(
         "-e", "--errors", action="store_true",
         help="only print packages containing errors (implies --validate)")
@@ -95,7 +98,8 @@ def command(opts, parser, extra_arg_groups=None):
         latest=opts.latest,
         after_time=after_time,
         before_time=before_time,
-        validate=(opts.validate or opts.errors)
+        validate=(opts.validate or opts.errors),
+        tool=opts.tool
     )
 
     resource_type, search_results = searcher.search(opts.PKG)
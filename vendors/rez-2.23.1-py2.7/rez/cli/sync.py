@@ -0,0 +1,49 @@
+"""
+Mirror a package repository into a sqlite package repository.
+"""
+
+
+def setup_parser(parser, completions=False):
+    parser.add_argument(
+        "-n", "--name", type=str, default='*', metavar="PATTERN",
+        help="only sync package families matching this glob-style pattern "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--delete", action="store_true",
+        help="remove package families that are not in the source repository")
+    parser.add_argument(
+        "SOURCE", type=str,
+        help="repository to sync from, eg a filesystem package repository path")
+    parser.add_argument(
+        "DEST", type=str,
+        help="sqlite database file to sync into, eg /local/packages.db")
+
+
+def command(opts, parser, extra_arg_groups=None):
+    from rez.package_repository import package_repository_manager
+    import os.path
+
+    dest = opts.DEST
+    if not dest.startswith("sqlite@"):
+        dest = "sqlite@" + os.path.abspath(dest)
+
+    repo = package_repository_manager.get_repository(dest)
+    num_synced = repo.sync(opts.SOURCE, name_pattern=opts.name,
+                           delete=opts.delete)
+    print "%d package families synced into %s" % (num_synced, repo.location)
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -231,6 +231,13 @@ class RezToolsVisibility_(Str):
         return Or(*(x.name for x in RezToolsVisibility))
 
 
+class ResolveProfileFormat_(Str):
+    @cached_class_property
+    def schema(cls):
+        from rez.utils.profiling import trace_formats
+        return Or(*trace_formats)
+
+
 class BuildThreadCount_(Setting):
     # may be a positive int, or the values "physical" or "logical"
 
@@ -289,6 +296,12 @@ config_schema = Schema({
     "package_definition_python_path":               OptionalStr,
     "tmpdir":                                       OptionalStr,
     "context_tmpdir":                               OptionalStr,
+    "resolve_cache_path":                           OptionalStr,
+    "context_interpretation_cache_path":            OptionalStr,
+    "listdir_cache_path":                           OptionalStr,
+    "package_search_cache_path":                    OptionalStr,
+    "resolve_profile_path":                         OptionalStr,
+    "payload_store_path":                           OptionalStr,
     "default_shell":                                OptionalStr,
     "terminal_emulator_command":                    OptionalStr,
     "editor":                                       OptionalStr,
@@ -323,10 +336,13 @@ config_schema = Schema({
     "memcached_context_file_min_compress_len":      Int,
     "memcached_listdir_min_compress_len":           Int,
     "memcached_resolve_min_compress_len":           Int,
+    "memcached_local_store_max_size":               Int,
     "allow_unversioned_packages":                   Bool,
     "rxt_as_yaml":                                  Bool,
+    "rxt_compact":                                  Bool,
     "color_enabled":                                ForceOrBool,
     "resolve_caching":                              Bool,
+    "context_interpretation_caching":               Bool,
     "cache_package_files":                          Bool,
     "cache_listdir":                                Bool,
     "prune_failed_graph":                           Bool,
@@ -362,6 +378,7 @@ config_schema = Schema({
     "rez_1_cmake_variables":                        Bool,
     "disable_rez_1_compatibility":                  Bool,
     "env_var_separators":                           Dict,
+    "resolve_profile_format":                       ResolveProfileFormat_,
     "variant_select_mode":                          VariantSelectMode_,
     "package_filter":                               OptionalDictOrDictList,
     "new_session_popen_args":                       OptionalDict,
@@ -0,0 +1,384 @@
+"""
+A local, queryable catalog of the packages in a package search path.
+
+Searching packages normally means walking every repository and loading every
+package that might match. The catalog instead stores, in a sqlite database,
+the attributes that searches filter on - family, version, release timestamp,
+variants, requirements and tools - so that most queries are answered with
+indexed lookups.
+
+The catalog is updated incrementally. Each family is stored along with its
+last release time (see `PackageRepository.get_last_release_time`), and only
+families released since they were catalogued are loaded again. Note that this
+means a package definition that is edited in place, rather than released, is
+not picked up until its family is next released.
+"""
+from rez.package_repository import package_repository_manager
+from rez.packages_ import Package
+from rez.exceptions import ResourceError
+from rez.utils.filesystem import safe_makedirs
+from rez.utils import json
+from rez.vendor.version.version import Version, VersionRange
+from rez.config import config
+from hashlib import md5
+import fnmatch
+import sqlite3
+import os.path
+
+
+class PackageCatalogEntry(object):
+    """A catalogued package.
+
+    Attributes:
+        path (str): The package repository the package is in.
+        name (str): Package name.
+        version (`Version`): Package version.
+        timestamp (int): Release epoch time, or zero if unknown.
+        requires (list of str): Package requirements.
+        variants (list of list of str): Variant requirements.
+        tools (list of str): Tools the package provides.
+        error (str): Error raised when loading the package, if any. This is
+            set for packages whose definitions are invalid.
+    """
+    def __init__(self, path, name, version, timestamp=0, requires=None,
+                 variants=None, tools=None, error=None):
+        self.path = path
+        self.name = name
+        self.version = version
+        self.timestamp = timestamp
+        self.requires = requires or []
+        self.variants = variants or []
+        self.tools = tools or []
+        self.error = error
+
+    @property
+    def qualified_name(self):
+        if self.version:
+            return "%s-%s" % (self.name, str(self.version))
+        else:
+            return self.name
+
+    def __repr__(self):
+        return "%s(%r, %r)" % (self.__class__.__name__, self.path,
+                               self.qualified_name)
+
+
+class PackageCatalog(object):
+    """A catalog of the packages in a package search path.
+
+    Example:
+
+        >>> catalog = PackageCatalog()
+        >>> catalog.update("maya*")
+        >>> [x.qualified_name for x in catalog.iter_packages("maya*", latest=True)]
+        ['maya-2017.0.1', 'maya_tools-1.4.0']
+        >>> [x.qualified_name for x in catalog.find_tool("mayapy")]
+        ['maya-2016.5', 'maya-2017.0.1']
+    """
+    schema_version = 1
+
+    def __init__(self, paths=None, filepath=None):
+        """Create a package catalog.
+
+        Args:
+            paths (list of str): Package search path, defaults to
+                `config.packages_path`.
+            filepath (str): Path of the catalog database. Defaults to a file
+                in `config.package_search_cache_path` that is specific to
+                `paths`, or to an in-memory database if that is not set.
+        """
+        self.paths = list(config.packages_path if paths is None else paths)
+
+        if filepath is None:
+            cache_path = config.package_search_cache_path
+            if cache_path:
+                key = md5(json.dumps(self.paths)).hexdigest()
+                filepath = os.path.join(cache_path, "catalog_%s.db" % key)
+            else:
+                filepath = ":memory:"
+
+        self.filepath = filepath
+        self._conn = None
+
+    @property
+    def connection(self):
+        if self._conn is None:
+            if self.filepath != ":memory:":
+                safe_makedirs(os.path.dirname(self.filepath))
+
+            conn = sqlite3.connect(self.filepath, timeout=30)
+            self._create_schema(conn)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        """Close the catalog database."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def update(self, name_pattern='*'):
+        """Bring the catalog up to date with the package repositories.
+
+        Args:
+            name_pattern (str): Only update the families matching this
+                glob-style pattern.
+
+        Returns:
+            int: Number of families that were (re)loaded.
+        """
+        num_loaded = 0
+
+        with self.connection as conn:
+            for path in self.paths:
+                num_loaded += self._update_path(conn, path, name_pattern)
+
+        return num_loaded
+
+    def iter_family_names(self, name_pattern='*'):
+        """Iterate over the names of catalogued package families.
+
+        Args:
+            name_pattern (str): Glob-style pattern to match family names
+                against.
+
+        Returns:
+            Iterator of str, in alphabetical order.
+        """
+        where, args = self._name_clause(name_pattern)
+        rows = self.connection.execute(
+            "SELECT DISTINCT name FROM families WHERE %s ORDER BY name"
+            % where, args)
+
+        for (name,) in rows:
+            if fnmatch.fnmatch(name, name_pattern):
+                yield name
+
+    def iter_packages(self, name_pattern='*', range_=None, latest=False,
+                      tool=None):
+        """Iterate over catalogued packages.
+
+        As with `rez.packages_.iter_packages`, a package earlier in the search
+        path hides a package of the same name and version later in the path.
+
+        Args:
+            name_pattern (str): Glob-style pattern to match family names
+                against.
+            range_ (`VersionRange` or str): Only return packages in this
+                version range.
+            latest (bool): Only return the latest matching package in each
+                family.
+            tool (str): Only return packages that provide this tool.
+
+        Returns:
+            Iterator of `PackageCatalogEntry`, ordered by name, then version
+            ascending.
+        """
+        if isinstance(range_, basestring):
+            range_ = VersionRange(range_)
+
+        where, args = self._name_clause(name_pattern)
+
+        if tool is not None:
+            # a package may be hidden by one earlier in the search path that
+            # does not provide the tool, so the tool index only selects the
+            # families to look at, and packages are filtered afterwards
+            where += (" AND name IN (SELECT DISTINCT name FROM tools "
+                      "WHERE tool = ?)")
+            args += (tool,)
+
+        rows = self.connection.execute(
+            "SELECT path, name, version, timestamp, requires, variants, tools, "
+            "error FROM packages WHERE %s" % where, args)
+
+        path_order = dict((path, i) for i, path in enumerate(self.paths))
+        families = {}
+
+        for row in rows:
+            name = row[1]
+            if not fnmatch.fnmatch(name, name_pattern):
+                continue
+
+            entry = self._entry(row)
+            if range_ is not None and entry.version not in range_:
+                continue
+
+            family = families.setdefault(name, {})
+            existing = family.get(entry.version)
+            if existing is None \
+                    or path_order[entry.path] < path_order[existing.path]:
+                family[entry.version] = entry
+
+        if tool is not None:
+            for family in families.itervalues():
+                for version, entry in family.items():
+                    if tool not in entry.tools:
+                        del family[version]
+
+        for name in sorted(families):
+            entries = sorted(families[name].itervalues(),
+                             key=lambda x: x.version)
+            if latest:
+                entries = entries[-1:]
+
+            for entry in entries:
+                yield entry
+
+    def find_tool(self, tool, latest=False):
+        """Find the packages that provide a tool.
+
+        Args:
+            tool (str): Name of the tool, eg "mayapy".
+            latest (bool): Only return the latest such package in each family.
+
+        Returns:
+            List of `PackageCatalogEntry`.
+        """
+        return list(self.iter_packages(tool=tool, latest=latest))
+
+    @classmethod
+    def _create_schema(cls, conn):
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta "
+                         "(key TEXT PRIMARY KEY, value TEXT)")
+
+            row = conn.execute("SELECT value FROM meta WHERE key = ?",
+                               ("schema_version",)).fetchone()
+            if row and row[0] == str(cls.schema_version):
+                return
+
+            # the catalog can always be rebuilt, so an incompatible one is
+            # simply discarded
+            for table in ("families", "packages", "tools"):
+                conn.execute("DROP TABLE IF EXISTS %s" % table)
+
+            conn.execute(
+                "CREATE TABLE families (path TEXT, name TEXT, "
+                "release_time REAL, PRIMARY KEY (path, name))")
+            conn.execute(
+                "CREATE TABLE packages (path TEXT, name TEXT, version TEXT, "
+                "timestamp INTEGER, requires TEXT, variants TEXT, tools TEXT, "
+                "error TEXT, PRIMARY KEY (path, name, version))")
+            conn.execute(
+                "CREATE TABLE tools (path TEXT, name TEXT, version TEXT, "
+                "tool TEXT)")
+            conn.execute("CREATE INDEX families_name ON families (name)")
+            conn.execute("CREATE INDEX packages_name ON packages (name)")
+            conn.execute("CREATE INDEX tools_tool ON tools (tool)")
+            conn.execute("CREATE INDEX tools_package ON tools "
+                         "(path, name, version)")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                         ("schema_version", str(cls.schema_version)))
+
+    def _update_path(self, conn, path, name_pattern):
+        repo = package_repository_manager.get_repository(path)
+        family_resources = dict(
+            (x.name, x) for x in repo.iter_package_families()
+            if fnmatch.fnmatch(x.name, name_pattern))
+
+        release_times = dict(conn.execute(
+            "SELECT name, release_time FROM families WHERE path = ?", (path,)))
+
+        # remove families that no longer exist
+        for name in release_times:
+            if name not in family_resources \
+                    and fnmatch.fnmatch(name, name_pattern):
+                self._delete_family(conn, path, name)
+
+        num_loaded = 0
+
+        for name, family_resource in family_resources.iteritems():
+            release_time = repo.get_last_release_time(family_resource)
+
+            # a zero release time means it cannot be determined, so the family
+            # is always loaded again
+            if release_time and release_times.get(name) == release_time:
+                continue
+
+            self._delete_family(conn, path, name)
+            self._load_family(conn, path, repo, family_resource)
+            conn.execute("INSERT INTO families VALUES (?, ?, ?)",
+                         (path, name, release_time))
+            num_loaded += 1
+
+        return num_loaded
+
+    @classmethod
+    def _load_family(cls, conn, path, repo, family_resource):
+        for package_resource in repo.iter_packages(family_resource):
+            package = Package(package_resource)
+            name = package.name
+            version = str(package.version)
+            error = None
+            timestamp = 0
+            requires = []
+            variants = []
+            tools = []
+
+            try:
+                timestamp = package.timestamp or 0
+                requires = [str(x) for x in (package.requires or [])]
+                variants = [[str(x) for x in variant]
+                            for variant in (package.variants or [])]
+                tools = list(package.tools or [])
+            except ResourceError as e:
+                error = str(e)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO packages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, name, version, timestamp, json.dumps(requires),
+                 json.dumps(variants), json.dumps(tools), error))
+
+            for tool in set(tools):
+                conn.execute("INSERT INTO tools VALUES (?, ?, ?, ?)",
+                             (path, name, version, tool))
+
+    @classmethod
+    def _delete_family(cls, conn, path, name):
+        for table in ("families", "packages", "tools"):
+            conn.execute("DELETE FROM %s WHERE path = ? AND name = ?" % table,
+                         (path, name))
+
+    @classmethod
+    def _name_clause(cls, name_pattern):
+        # sqlite's GLOB matches like fnmatch, except for character classes.
+        # Matches are re-checked with fnmatch, so GLOB only needs to narrow
+        # down the rows, using the name index where it can.
+        if '[' in name_pattern:
+            return "1", ()
+
+        # fnmatch is case-insensitive on some platforms (windows), but GLOB
+        # never is
+        if os.path.normcase('A') != 'A':
+            return "lower(name) GLOB ?", (name_pattern.lower(),)
+
+        return "name GLOB ?", (name_pattern,)
+
+    @classmethod
+    def _entry(cls, row):
+        path, name, version, timestamp, requires, variants, tools, error = row
+        return PackageCatalogEntry(
+            path=path,
+            name=name,
+            version=Version(version),
+            timestamp=timestamp,
+            requires=json.loads(requires),
+            variants=json.loads(variants),
+            tools=json.loads(tools),
+            error=error)
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -87,34 +87,23 @@ class PackageFilter(PackageFilterBase):
     def __init__(self):
         self._excludes = {}
         self._includes = {}
+        self._compiled = None
+        self._verdicts = {}
 
     def excludes(self, package):
         if not self._excludes:
             return None  # quick out
 
-        def _match(rules):
-            if rules:
-                for rule in rules:
-                    if rule.match(package):
-                        return rule
-            return None
-
-        excludes = self._excludes.get(package.name)
-        excl = _match(excludes)
-        if not excl:
-            excludes = self._excludes.get(None)
-            excl = _match(excludes)
-
-        if excl:
-            includes = self._includes.get(package.name)
-            incl = _match(includes)
-            if incl:
-                excl = None
-            else:
-                includes = self._includes.get(None)
-                if _match(includes):
-                    excl = None
+        # verdicts are memoized, since the same packages are tested by every
+        # resolve that uses this filter
+        key = package.handle
+        try:
+            return self._verdicts[key]
+        except KeyError:
+            pass
 
+        excl = self._excludes_package(package)
+        self._verdicts[key] = excl
         return excl
 
     def add_exclusion(self, rule):
@@ -131,15 +120,19 @@ class PackageFilter(PackageFilterBase):
         other = PackageFilter.__new__(PackageFilter)
         other._excludes = self._excludes.copy()
         other._includes = self._includes.copy()
+        other._compiled = None
+        other._verdicts = {}
         return other
 
     def __and__(self, other):
         """Combine two filters."""
         result = self.copy()
-        for rule in other._excludes.itervalues():
-            result.add_exclusion(rule)
-        for rule in other._includes.itervalues():
-            result.add_inclusion(rule)
+        for rules in other._excludes.itervalues():
+            for rule in rules:
+                result.add_exclusion(rule)
+        for rules in other._includes.itervalues():
+            for rule in rules:
+                result.add_inclusion(rule)
         return result
 
     def __nonzero__(self):
@@ -187,10 +180,38 @@ class PackageFilter(PackageFilterBase):
                 data[namespace] = rules
         return data
 
+    def _excludes_package(self, package):
+        excludes, includes = self._get_compiled()
+
+        def _match(rules):
+            if rules:
+                return rules.match(package)
+            return None
+
+        excl = (_match(excludes.get(package.name))
+                or _match(excludes.get(None)))
+
+        if excl:
+            if (_match(includes.get(package.name))
+                    or _match(includes.get(None))):
+                excl = None
+
+        return excl
+
+    def _get_compiled(self):
+        if self._compiled is None:
+            self._compiled = tuple(
+                dict((family, _CompiledRules(rules))
+                     for family, rules in dict_.iteritems())
+                for dict_ in (self._excludes, self._includes))
+        return self._compiled
+
     def _add_rule(self, rules_dict, rule):
         family = rule.family()
         rules_ = rules_dict.get(family, [])
         rules_dict[family] = sorted(rules_ + [rule], key=lambda x: x.cost())
+        self._compiled = None
+        self._verdicts = {}
         cached_property.uncache(self, "cost")
 
     def __str__(self):
@@ -281,6 +302,87 @@ class PackageFilterList(PackageFilterBase):
 no_filter = PackageFilterList()
 
 
+class _CompiledRules(object):
+    """A list of rules, compiled for fast matching.
+
+    Regex and glob rules are merged into as few regexes as possible, range
+    rules are reduced to their version range, and timestamp rules to the
+    latest 'before' and earliest 'after' timestamps. Only once it is known that
+    some rule matches are the rules tested in order, so that the matching rule
+    that is returned is the same as if the rules were tested one by one.
+    """
+    def __init__(self, rules):
+        self.rules = rules
+        self.regexes = []
+        self.ranges = []
+        self.before = None
+        self.after = None
+        self.other_rules = []
+
+        patterns = {}
+
+        for rule in rules:
+            if isinstance(rule, RegexRuleBase):
+                # regexes containing groups can't be merged, as their group
+                # references would change
+                if rule.regex.groups:
+                    self.regexes.append(rule.regex)
+                else:
+                    patterns.setdefault(rule.regex.flags, []).append(
+                        rule.regex.pattern)
+            elif isinstance(rule, RangeRule):
+                requirement = rule._requirement
+                self.ranges.append((requirement.range, requirement.conflict))
+            elif isinstance(rule, TimestampRule):
+                if rule.reverse:
+                    if self.after is None or rule.timestamp < self.after:
+                        self.after = rule.timestamp
+                elif self.before is None or rule.timestamp > self.before:
+                    self.before = rule.timestamp
+            else:
+                self.other_rules.append(rule)
+
+        for flags, patterns_ in patterns.iteritems():
+            if len(patterns_) == 1:
+                pattern = patterns_[0]
+            else:
+                pattern = '|'.join("(?:%s)" % x for x in patterns_)
+            self.regexes.append(re.compile(pattern, flags))
+
+    def match(self, package):
+        """Returns the first rule that matches the package, or None."""
+        if self._matches(package):
+            for rule in self.rules:
+                if rule.match(package):
+                    return rule
+        return None
+
+    def _matches(self, package):
+        if self.regexes:
+            qualified_name = package.qualified_name
+            for regex in self.regexes:
+                if regex.match(qualified_name):
+                    return True
+
+        for range_, conflict in self.ranges:
+            if range_ is None or ((package.version in range_) != conflict):
+                return True
+
+        for rule in self.other_rules:
+            if rule.match(package):
+                return True
+
+        # checked last, since getting the timestamp causes a package load
+        if self.before is not None or self.after is not None:
+            timestamp = package.timestamp
+            if self.before is not None and timestamp <= self.before:
+                return True
+            if self.after is not None and timestamp > self.after:
+                return True
+
+        return False
+
+
 class Rule(object):
     name = None
 
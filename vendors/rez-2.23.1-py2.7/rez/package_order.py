@@ -291,6 +291,14 @@ class TimestampPackageOrder(PackageOrder):
     """
     name = "soft_timestamp"
 
+    # Reorderings are memoized, since the solver reorders the same families
+    # for every resolve. The cache is shared by all instances, as orderers are
+    # recreated for each context. Entries are keyed by family name, last
+    # release time (as of the last time the repository caches were cleared),
+    # orderer sha1 and the versions being ordered.
+    max_reorder_cache_size = 1000
+    _reorder_cache = {}
+
     def __init__(self, timestamp, rank=0):
         """Create a reorderer.
 
@@ -304,9 +312,66 @@ class TimestampPackageOrder(PackageOrder):
         self.rank = rank
 
     def reorder(self, iterable, key=None):
-        reordered = []
-        first_after = None
         key = key or (lambda x: x)
+        items = list(iterable)
+        cache_key = self._get_reorder_cache_key(items, key)
+
+        if cache_key is None:
+            return self._reorder(items, key)
+
+        try:
+            versions = self._reorder_cache[cache_key]
+        except KeyError:
+            pass
+        else:
+            if versions is None:
+                return None
+            items_ = dict((key(x).version, x) for x in items)
+            return [items_[x] for x in versions]
+
+        reordered = self._reorder(items, key)
+        if reordered is None:
+            versions = None
+        else:
+            versions = tuple(key(x).version for x in reordered)
+
+        cache = TimestampPackageOrder._reorder_cache
+        if len(cache) >= self.max_reorder_cache_size:
+            cache.clear()
+        cache[cache_key] = versions
+        return reordered
+
+    def _get_reorder_cache_key(self, items, key):
+        if not items:
+            return None
+
+        packages = [key(x) for x in items]
+        versions = frozenset(x.version for x in packages)
+        if len(versions) != len(packages):
+            return None  # eg, the same version from different repositories
+
+        # a release may change package timestamps, so the repository state is
+        # part of the key. The memoized release time is used so that a cache
+        # hit doesn't have to query the repository (eg, stat a dir on NFS)
+        last_release_time = 0
+        repository_uids = set()
+
+        for package in packages:
+            repo = package.resource._repository
+            if repo.uid in repository_uids:
+                continue
+
+            repository_uids.add(repo.uid)
+            family_resource = repo.get_parent_package_family(package.resource)
+            time_ = repo.get_cached_last_release_time(family_resource)
+            if not time_:
+                return None  # release time can't be determined
+            last_release_time = max(last_release_time, time_)
+
+        return (packages[0].name, last_release_time, self.sha1, versions)
+
+    def _reorder(self, iterable, key):
+        first_after = None
 
         # sort by version descending
         descending = sorted(iterable, key=lambda x: key(x).version, reverse=True)
@@ -85,6 +85,7 @@ class PackageRepository(object):
     def clear_caches(self):
         """Clear any cached resources in the pool."""
         self.pool.clear_caches()
+        self.get_cached_last_release_time.cache_clear()
 
     @cached_property
     def uid(self):
@@ -141,6 +142,24 @@ class PackageRepository(object):
         """
         raise NotImplementedError
 
+    def prefetch_packages(self, package_resources):
+        """Load the data of several packages, ahead of it being used.
+
+        Repositories on high-latency storage can implement this to read
+        package definitions concurrently. Loading a definition runs package
+        code, which is not thread-safe, so only the reading should be
+        concurrent. Loaded data is kept on each resource, and resources are
+        cached in the resource pool, so later use of the packages does not load
+        them again. Load errors should be ignored here - they are raised again
+        when the package is used.
+
+        The default implementation does nothing.
+
+        Args:
+            package_resources (list of `PackageResource`): Packages to load.
+        """
+        pass
+
     def pre_variant_install(self, variant_resource):
         """Called before a variant is installed.
 
@@ -222,6 +241,19 @@ class PackageRepository(object):
         """
         return 0
 
+    @lru_cache(maxsize=None)
+    def get_cached_last_release_time(self, package_family_resource):
+        """Get the last release time of a package family, memoized.
+
+        Unlike `get_last_release_time`, the repository is only queried once
+        per family until `clear_caches` is called, so the result is only as
+        current as the repository's other cached resources.
+
+        Returns:
+            int: See `get_last_release_time`.
+        """
+        return self.get_last_release_time(package_family_resource)
+
     def make_resource_handle(self, resource_key, **variables):
         """Create a `ResourceHandle`
 
@@ -8,23 +8,206 @@ that do not provide an implementation.
 
 import fnmatch
 from collections import defaultdict
+from hashlib import md5
+import tempfile
+import sqlite3
+import os.path
 import sys
+import os
 
-from rez.packages_ import iter_package_families, iter_packages, get_latest_package
+from rez.packages_ import iter_package_families, iter_packages, \
+    get_latest_package, get_last_release_time
+from rez.package_catalog import PackageCatalog
 from rez.exceptions import PackageFamilyNotFoundError, ResourceContentError
 from rez.util import ProgressBar
 from rez.utils.colorize import critical, info, error, Printer
 from rez.vendor.pygraph.classes.digraph import digraph
 from rez.utils.formatting import expand_abbreviations
+from rez.utils.filesystem import safe_makedirs
+from rez.utils.logging_ import print_debug
+from rez.utils import json
 
 from rez.config import config
 
 from rez.vendor.version.requirement import Requirement
 
 
+class ReverseDependencyIndex(object):
+    """An index of the requirements of the latest package in each family.
+
+    Finding the packages that depend on a package means loading the latest
+    version of every package family. This index stores the requirements that
+    were found, per family, along with the family's last release time. On
+    subsequent lookups only families released since are loaded again.
+
+    If `config.package_search_cache_path` is set, the index is stored there and
+    shared between processes, with one index file per package search path.
+    Otherwise the index is only kept for the lifetime of this object.
+    """
+    index_version = 1
+
+    def __init__(self, paths=None, cache_path=None):
+        """Create the index.
+
+        Args:
+            paths (list of str): Package search path, defaults to
+                `config.packages_path`.
+            cache_path (str): Directory to store the index in, defaults to
+                `config.package_search_cache_path`.
+        """
+        self.paths = config.packages_path if paths is None else paths
+        self.entries = None
+        self.dirty = False
+
+        cache_path = cache_path or config.package_search_cache_path
+        if cache_path:
+            key = md5(json.dumps(list(self.paths))).hexdigest()
+            filename = "reverse_dependencies_%s.json" % key
+            self.filepath = os.path.join(cache_path, filename)
+        else:
+            self.filepath = None
+
+    def update(self, progress=True):
+        """Bring the index up to date with the package repositories.
+
+        Args:
+            progress (bool): If True, show a progress bar while loading
+                families that have changed.
+        """
+        if self.entries is None:
+            self.entries = self._read()
+
+        it = iter_package_families(self.paths)
+        package_names = set(x.name for x in it)
+
+        for name in set(self.entries) - package_names:
+            del self.entries[name]
+            self.dirty = True
+
+        stale = {}
+        for name in package_names:
+            release_time = get_last_release_time(name, paths=self.paths)
+            entry = self.entries.get(name)
+
+            # a zero release time means it cannot be determined, so the family
+            # is always loaded again
+            if not entry or not release_time \
+                    or entry["release_time"] != release_time:
+                stale[name] = release_time
+
+        if stale:
+            bar = ProgressBar("Searching", len(stale)) if progress else None
+
+            for name, release_time in stale.iteritems():
+                self.entries[name] = self._load_family(name, release_time)
+                if bar:
+                    bar.next()
+
+            if bar:
+                bar.finish()
+            self.dirty = True
+
+        if self.dirty:
+            self._write()
+
+    def get_lookup(self, build_requires=False, private_build_requires=False):
+        """Get the reverse dependency lookup.
+
+        Args:
+            build_requires (bool): If True, include build requirements.
+            private_build_requires (bool): If True, include private build
+                requirements.
+
+        Returns:
+            dict: Package family name to set of names of the families whose
+            latest package depends on it.
+        """
+        if self.entries is None:
+            self.update()
+
+        keys = ["requires"]
+        if build_requires:
+            keys.append("build_requires")
+        if private_build_requires:
+            keys.append("private_build_requires")
+
+        lookup = defaultdict(set)
+        for name, entry in self.entries.iteritems():
+            for key in keys:
+                for req_name in entry[key]:
+                    lookup[req_name].add(name)
+
+        return lookup
+
+    def _load_family(self, name, release_time):
+        entry = {
+            "release_time": release_time,
+            "requires": set(),
+            "build_requires": set(),
+            "private_build_requires": set()
+        }
+
+        packages = list(iter_packages(name=name, paths=self.paths))
+        if packages:
+            pkg = max(packages, key=lambda x: x.version)
+
+            for variant in pkg.iter_variants():
+                for key in ("requires", "build_requires",
+                            "private_build_requires"):
+                    for req in (getattr(variant, key) or []):
+                        if not req.conflict:
+                            entry[key].add(req.name)
+
+        for key in ("requires", "build_requires", "private_build_requires"):
+            entry[key] = sorted(entry[key])
+        return entry
+
+    def _read(self):
+        if not self.filepath:
+            return {}
+
+        try:
+            with open(self.filepath) as f:
+                content = json.loads(f.read())
+        except (IOError, OSError, ValueError):
+            return {}
+
+        if content.get("index_version") != self.index_version:
+            return {}
+        return content.get("families", {})
+
+    def _write(self):
+        self.dirty = False
+        if not self.filepath:
+            return
+
+        content = {
+            "index_version": self.index_version,
+            "paths": list(self.paths),
+            "families": self.entries
+        }
+
+        # failing to write the index is not an error, it is an optimisation
+        dirpath = os.path.dirname(self.filepath)
+        try:
+            safe_makedirs(dirpath)
+            fd, tmp_filepath = tempfile.mkstemp(dir=dirpath, prefix=".tmp-")
+        except (IOError, OSError):
+            return
+
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(content))
+            os.rename(tmp_filepath, self.filepath)
+        except (IOError, OSError):
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
+
+
 def get_reverse_dependency_tree(package_name, depth=None, paths=None,
                                 build_requires=False,
-                                private_build_requires=False):
+                                private_build_requires=False,
+                                progress=True):
     """Find packages that depend on the given package.
 
     This is a reverse dependency lookup. A tree is constructed, showing what
@@ -32,11 +215,15 @@ def get_reverse_dependency_tree(package_name, depth=None, paths=None,
     resolve does not occur. Only the latest version of each package is used,
     and requirements from all variants of that package are used.
 
+    The requirements of each family are read from a `ReverseDependencyIndex`,
+    so only families released since the last lookup are loaded.
+
     Args:
         package_name (str): Name of the package depended on.
         depth (int): Tree depth limit, unlimited if None.
         paths (list of str): paths to search for packages, defaults to
             `config.packages_path`.
+        progress (bool): If True, show a progress bar while loading families.
 
     Returns:
         A 2-tuple:
@@ -58,28 +245,9 @@ def get_reverse_dependency_tree(package_name, depth=None, paths=None,
     if depth == 0:
         return pkgs_list, g
 
-    bar = ProgressBar("Searching", len(package_names))
-    lookup = defaultdict(set)
-
-    for i, package_name_ in enumerate(package_names):
-        it = iter_packages(name=package_name_, paths=paths)
-        packages = list(it)
-        if not packages:
-            continue
-
-        pkg = max(packages, key=lambda x: x.version)
-        requires = []
-
-        for variant in pkg.iter_variants():
-            requires += variant.get_requires(build_requires, private_build_requires)
-
-        for req in requires:
-            if not req.conflict:
-                lookup[req.name].add(package_name_)
-
-        bar.next()
-
-    bar.finish()
+    index = ReverseDependencyIndex(paths)
+    index.update(progress=progress)
+    lookup = index.get_lookup(build_requires, private_build_requires)
 
     # perform traversal
     n = 0
@@ -164,7 +332,8 @@ class ResourceSearcher(object):
     """Search for resources (packages, variants or package families).
     """
     def __init__(self, package_paths=None, resource_type=None, no_local=False,
-                 latest=False, after_time=None, before_time=None, validate=False):
+                 latest=False, after_time=None, before_time=None, validate=False,
+                 tool=None, use_catalog=None):
         """Create resource search.
 
         Args:
@@ -181,6 +350,12 @@ class ResourceSearcher(object):
                 epoch time
             validate (bool): Validate each resource that is found. If False,
                 results are not validated (ie, `validation_error` is None).
+            tool (str): Only return packages (or variants) that provide this
+                tool.
+            use_catalog (bool): Search a `PackageCatalog` rather than the
+                package repositories. Defaults to True if
+                `config.package_search_cache_path` is set. The catalog is not
+                used when validating, since that loads every package anyway.
 
         Returns:
             List of `ResourceSearchResult` objects
@@ -191,6 +366,11 @@ class ResourceSearcher(object):
         self.after_time = after_time
         self.before_time = before_time
         self.validate = validate
+        self.tool = tool
+
+        if use_catalog is None:
+            use_catalog = bool(config.package_search_cache_path)
+        self.use_catalog = use_catalog and not validate
 
         if package_paths:
             self.package_paths = package_paths
@@ -214,23 +394,30 @@ class ResourceSearcher(object):
               packages or variants.
         """
 
-        # Find matching package families
         name_pattern, version_range = self._parse_request(resources_request)
 
+        if self.use_catalog:
+            catalog = PackageCatalog(self.package_paths)
+            try:
+                catalog.update(name_pattern)
+                return self._search_catalog(catalog, name_pattern,
+                                            version_range)
+            except (sqlite3.Error, IOError, OSError) as e:
+                # the catalog is only an optimisation, so search the
+                # repositories instead
+                print_debug("Package catalog %s could not be used: %s"
+                            % (catalog.filepath, e))
+            finally:
+                catalog.close()
+
+        # Find matching package families
         family_names = set(
             x.name for x in iter_package_families(paths=self.package_paths)
             if fnmatch.fnmatch(x.name, name_pattern)
         )
 
         family_names = sorted(family_names)
-
-        # determine what type of resource we're searching for
-        if self.resource_type:
-            resource_type = self.resource_type
-        elif version_range or len(family_names) == 1:
-            resource_type = "package"
-        else:
-            resource_type = "family"
+        resource_type = self._get_resource_type(family_names, version_range)
 
         if not family_names:
             return resource_type, []
@@ -247,55 +434,120 @@ class ResourceSearcher(object):
             it = iter_packages(name, version_range, paths=self.package_paths)
             packages = sorted(it, key=lambda x: x.version)
 
+            if self.tool is not None:
+                packages = [x for x in packages
+                            if self.tool in self._get_tools(x)]
+
             if self.latest and packages:
                 packages = [packages[-1]]
 
             for package in packages:
-                # validate and check time (accessing timestamp may cause
-                # validation fail)
-                try:
-                    if package.timestamp:
-                        if self.after_time and package.timestamp < self.after_time:
-                            continue
-                        if self.before_time and package.timestamp >= self.before_time:
-                            continue
+                self._add_package_results(results, resource_type, package)
 
-                    if self.validate:
-                        package.validate_data()
+        return resource_type, results
 
-                except ResourceContentError as e:
-                    if resource_type == "package":
-                        result = ResourceSearchResult(package, "package", str(e))
-                        results.append(result)
+    def _search_catalog(self, catalog, name_pattern, version_range):
+        family_names = list(catalog.iter_family_names(name_pattern))
+        resource_type = self._get_resource_type(family_names, version_range)
 
-                    continue
+        if not family_names:
+            return resource_type, []
 
-                if resource_type == "package":
-                    result = ResourceSearchResult(package, "package")
-                    results.append(result)
-                    continue
+        if resource_type == "family":
+            results = [ResourceSearchResult(x, "family") for x in family_names]
+            return "family", results
 
-                # iterate variants
-                try:
-                    for variant in package.iter_variants():
-                        if self.validate:
-                            try:
-                                variant.validate_data()
-                            except ResourceContentError as e:
-                                result = ResourceSearchResult(
-                                    variant, "variant", str(e))
-                                results.append(result)
-                                continue
-
-                        result = ResourceSearchResult(variant, "variant")
-                        results.append(result)
+        entries = defaultdict(list)
+        for entry in catalog.iter_packages(name_pattern,
+                                           range_=version_range,
+                                           latest=self.latest,
+                                           tool=self.tool):
+            entries[entry.name].append(entry)
+
+        results = []
 
-                except ResourceContentError:
-                    # this may happen if 'variants' in package is malformed
-                    continue
+        # Package objects are only created for the matching families. This
+        # does not load the packages, unless their variants are needed
+        for name in sorted(entries):
+            packages = dict(
+                (x.version, x)
+                for x in iter_packages(name, paths=self.package_paths))
+
+            for entry in entries[name]:
+                package = packages.get(entry.version)
+                if package is not None:
+                    self._add_package_results(results, resource_type,
+                                              package, entry)
 
         return resource_type, results
 
+    def _get_resource_type(self, family_names, version_range):
+        if self.resource_type:
+            return self.resource_type
+        elif version_range or self.tool is not None or len(family_names) == 1:
+            return "package"
+        else:
+            return "family"
+
+    def _add_package_results(self, results, resource_type, package,
+                             catalog_entry=None):
+        # validate and check time (accessing timestamp may cause
+        # validation fail)
+        try:
+            if catalog_entry is None:
+                timestamp = package.timestamp
+            elif catalog_entry.error:
+                raise ResourceContentError(catalog_entry.error)
+            else:
+                timestamp = catalog_entry.timestamp
+
+            if timestamp:
+                if self.after_time and timestamp < self.after_time:
+                    return
+                if self.before_time and timestamp >= self.before_time:
+                    return
+
+            if self.validate:
+                package.validate_data()
+
+        except ResourceContentError as e:
+            if resource_type == "package":
+                result = ResourceSearchResult(package, "package", str(e))
+                results.append(result)
+
+            return
+
+        if resource_type == "package":
+            result = ResourceSearchResult(package, "package")
+            results.append(result)
+            return
+
+        # iterate variants
+        try:
+            for variant in package.iter_variants():
+                if self.validate:
+                    try:
+                        variant.validate_data()
+                    except ResourceContentError as e:
+                        result = ResourceSearchResult(
+                            variant, "variant", str(e))
+                        results.append(result)
+                        continue
+
+                result = ResourceSearchResult(variant, "variant")
+                results.append(result)
+
+        except ResourceContentError:
+            # this may happen if 'variants' in package is malformed
+            pass
+
+    @classmethod
+    def _get_tools(cls, package):
+        try:
+            return package.tools or []
+        except ResourceContentError:
+            return []
+
     @classmethod
     def _parse_request(cls, resources_request):
         name_pattern = resources_request or '*'
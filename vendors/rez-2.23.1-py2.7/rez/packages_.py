@@ -483,6 +483,24 @@ def iter_packages(name, range_=None, paths=None):
             yield Package(package_resource)
 
 
+def prefetch_packages(packages):
+    """Load the definitions of several packages, ahead of them being used.
+
+    Packages are grouped by repository, and each repository loads its own
+    packages, possibly concurrently - see `PackageRepository.prefetch_packages`.
+
+    Args:
+        packages (list of `Package`): Packages to load.
+    """
+    resources = {}
+    for package in packages:
+        resource = package.resource
+        resources.setdefault(resource._repository, []).append(resource)
+
+    for repo, package_resources in resources.iteritems():
+        repo.prefetch_packages(package_resources)
+
+
 def get_package(name, version, paths=None):
     """Get an exact version of a package.
 
@@ -0,0 +1,298 @@
+"""
+A content-addressed store that package payloads are deduplicated into.
+
+Each distinct file content (and permissions mode, since hardlinks share it) is
+stored once, as a 'blob' named after its sha1 checksum. Payload files are then
+replaced with hardlinks to their blob. Because the blob is itself just another
+link to the same inode, adding a payload to the store copies nothing - the
+first payload to contain some file provides its blob, and later payloads
+containing the same file are linked to it.
+
+A blob whose link count has dropped to one is no longer used by any payload,
+and is removed by `PayloadStore.gc`.
+
+Payloads can only be deduplicated if hardlinks are supported (Python 2 only has
+`os.link` on unix), and if the store is on the same device as the payload. If
+not, `PayloadStore.add_tree` does nothing.
+
+Payloads are not deduplicated as they are installed - installs copy files as
+usual, and payloads are only added to the store afterwards by `rez-payloads
+--add` (typically run as a scheduled task).
+
+Example:
+
+    >>> store = PayloadStore("/local/payload_store")
+    >>> store.add_tree("/local/packages/nuke/11.2v4/payload")
+    {'num_files': 3120, 'num_linked': 3067, 'bytes_linked': 1183512034, ...}
+"""
+from rez.utils.filesystem import safe_makedirs
+from rez.config import config
+import hashlib
+import errno
+import stat
+import os
+import os.path
+
+
+class PayloadStore(object):
+    """A content-addressed store of package payload files."""
+    chunk_size = 1024 * 1024
+
+    def __init__(self, path=None):
+        """Create a payload store.
+
+        Args:
+            path (str): Directory of the store, defaults to
+                `config.payload_store_path`.
+        """
+        path = path or config.payload_store_path
+        if not path:
+            raise ValueError("No payload store path given, and "
+                             "'payload_store_path' is not set")
+
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.blobs_path = os.path.join(self.path, "blobs")
+
+    def add_tree(self, path):
+        """Deduplicate the files under a directory into the store.
+
+        Each regular file is either hardlinked to the existing blob of the
+        same content, or becomes that blob. Symlinks and empty files are
+        skipped.
+
+        Args:
+            path (str): Directory to deduplicate, eg a variant's payload.
+
+        Returns:
+            dict: Stats, containing:
+            - num_files: Number of files visited;
+            - num_linked: Number of files replaced with a link to an existing
+              blob;
+            - num_added: Number of files that were added as new blobs;
+            - bytes_linked: Bytes of disk space freed by linking files;
+            - num_failed: Number of files that could not be added.
+
+            If files under `path` cannot be linked into the store (see
+            `can_link`), no files are visited.
+        """
+        stats = dict(num_files=0, num_linked=0, num_added=0, bytes_linked=0,
+                     num_failed=0)
+
+        # checked up front, so that files aren't all checksummed for nothing
+        if not self.can_link(path):
+            return stats
+
+        for root, _, filenames in os.walk(path):
+            for filename in filenames:
+                filepath = os.path.join(root, filename)
+                st = os.lstat(filepath)
+                if not stat.S_ISREG(st.st_mode) or not st.st_size:
+                    continue
+
+                stats["num_files"] += 1
+                try:
+                    result = self.add_file(filepath, st)
+                except (IOError, OSError):
+                    stats["num_failed"] += 1
+                    continue
+
+                if result == "linked":
+                    stats["num_linked"] += 1
+                    stats["bytes_linked"] += st.st_size
+                elif result == "added":
+                    stats["num_added"] += 1
+
+        return stats
+
+    def add_file(self, filepath, st=None, checksum=None):
+        """Deduplicate a single file into the store.
+
+        The file must be linkable into the store - see `can_link`.
+
+        Args:
+            filepath (str): File to add.
+            st (`os.stat_result`): Stat of the file, if already known.
+            checksum (str): Checksum of the file, if already known.
+
+        Returns:
+            str: "linked" if the file was replaced with a link to an existing
+            blob, "added" if it became a new blob, or "unchanged" if it was
+            already linked to its blob.
+        """
+        st = st or os.lstat(filepath)
+        checksum = checksum or self.get_checksum(filepath)
+        blob_path = self.get_blob_path(checksum, st.st_mode)
+
+        while True:
+            try:
+                blob_st = os.stat(blob_path)
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+                # the file becomes the blob
+                safe_makedirs(os.path.dirname(blob_path))
+                try:
+                    os.link(filepath, blob_path)
+                except OSError as e:
+                    if e.errno == errno.EEXIST:
+                        continue  # another process added the same blob
+                    raise
+                return "added"
+
+            if (blob_st.st_dev, blob_st.st_ino) == (st.st_dev, st.st_ino):
+                return "unchanged"
+
+            # replace the file with a link to the blob. The blob may be
+            # removed by a concurrent gc, in which case the file is added as
+            # the blob instead.
+            tmp_filepath = "%s.payload-store-%d" % (filepath, os.getpid())
+            try:
+                os.link(blob_path, tmp_filepath)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    continue
+                raise
+
+            os.rename(tmp_filepath, filepath)
+            return "linked"
+
+    def can_link(self, path):
+        """Determine if files under a directory can be linked into the store.
+
+        Args:
+            path (str): Directory, which need not exist yet.
+
+        Returns:
+            bool: True if hardlinks are supported, and `path` is on the same
+            device as the store.
+        """
+        if not hasattr(os, "link"):
+            return False
+
+        try:
+            return _get_device(self.path) == _get_device(path)
+        except OSError:
+            return False
+
+    def gc(self, dry_run=False):
+        """Remove blobs that are no longer linked to by any payload.
+
+        Args:
+            dry_run (bool): If True, only report what would be removed.
+
+        Returns:
+            tuple: Number of blobs removed, and bytes freed.
+        """
+        num_removed = 0
+        bytes_freed = 0
+
+        for blob_path, st in self._iter_blobs():
+            if st.st_nlink > 1:
+                continue
+
+            if not dry_run:
+                try:
+                    os.remove(blob_path)
+                except OSError:
+                    continue
+
+            num_removed += 1
+            bytes_freed += st.st_size
+
+        return num_removed, bytes_freed
+
+    def report(self):
+        """Report on how much disk space the store is saving.
+
+        Returns:
+            dict: Stats, containing:
+            - num_blobs: Number of blobs in the store;
+            - num_unused_blobs: Number of blobs that `gc` would remove;
+            - num_links: Number of payload files linked to blobs;
+            - store_bytes: Disk space used by the blobs;
+            - payload_bytes: Size of all payload files that are linked to
+              blobs, as if they were separate copies;
+            - bytes_saved: Disk space saved by deduplication.
+        """
+        num_blobs = 0
+        num_unused_blobs = 0
+        num_links = 0
+        store_bytes = 0
+        payload_bytes = 0
+
+        for _, st in self._iter_blobs():
+            num_blobs += 1
+            store_bytes += st.st_size
+            links = st.st_nlink - 1
+
+            if links:
+                num_links += links
+                payload_bytes += st.st_size * links
+            else:
+                num_unused_blobs += 1
+
+        return dict(num_blobs=num_blobs,
+                    num_unused_blobs=num_unused_blobs,
+                    num_links=num_links,
+                    store_bytes=store_bytes,
+                    payload_bytes=payload_bytes,
+                    bytes_saved=max(payload_bytes - store_bytes, 0))
+
+    def get_blob_path(self, checksum, mode):
+        """Get the path of the blob for a file content and mode."""
+        name = "%s-%o" % (checksum, stat.S_IMODE(mode))
+        return os.path.join(self.blobs_path, checksum[:2], name)
+
+    @classmethod
+    def get_checksum(cls, filepath):
+        """Get the sha1 checksum of a file's content."""
+        hash_ = hashlib.sha1()
+        with open(filepath, "rb") as f:
+            while True:
+                chunk = f.read(cls.chunk_size)
+                if not chunk:
+                    break
+                hash_.update(chunk)
+        return hash_.hexdigest()
+
+    def _iter_blobs(self):
+        if not os.path.isdir(self.blobs_path):
+            return
+
+        for dirname in os.listdir(self.blobs_path):
+            path = os.path.join(self.blobs_path, dirname)
+            for name in os.listdir(path):
+                blob_path = os.path.join(path, name)
+                try:
+                    st = os.lstat(blob_path)
+                except OSError:
+                    continue
+                yield blob_path, st
+
+
+def _get_device(path):
+    # device of the path, or of its nearest existing parent directory
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return os.stat(path).st_dev
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -26,9 +26,16 @@ from rez.vendor.enum import Enum
 from rez.vendor import yaml
 from rez.utils import json
 from rez.utils.yaml import dump_yaml
+from rez.utils.rxt import is_compact_rxt, write_compact_rxt, CompactRxtReader
+from rez.utils.local_cache import LocalCache
+from rez.utils.logging_ import print_warning
+from rez.utils.profiling import profiled, span, instrumented, write_trace, \
+    get_active_profiler
 
 from tempfile import mkdtemp
 from functools import wraps
+from collections import defaultdict, OrderedDict
+from hashlib import md5
 import getpass
 import socket
 import threading
@@ -40,6 +47,28 @@ import os
 import os.path
 
 
+# (config data, digest) of the parts of context interpretation cache keys that
+# are the same for every context in this process
+_interpretation_key_material = None
+
+
+def _get_interpretation_key_material():
+    global _interpretation_key_material
+
+    # a new config data dict is created whenever the config is changed
+    data = config._data
+    material = _interpretation_key_material
+    if material is None or material[0] is not data:
+        # hostname rather than fqdn, which may block on a DNS lookup
+        h = md5(repr((system.platform, system.arch, system.os,
+                      socket.gethostname())))
+        h.update(json.dumps(data, sort_keys=True, default=str))
+        material = (data, h.hexdigest())
+        _interpretation_key_material = material
+
+    return material[1]
+
+
 class RezToolsVisibility(Enum):
     """Determines if/how rez cli tools are added back to PATH within a
     resolved environment."""
@@ -113,9 +142,14 @@ class ResolvedContext(object):
     command within a configured python namespace, without spawning a child
     shell.
     """
-    serialize_version = (4, 3)
+    serialize_version = (4, 4)
     tmpdir_manager = TempDirs(config.context_tmpdir, prefix="rez_context_")
 
+    # see 'context_interpretation_caching'
+    max_cached_interpretations = 16
+    rxt_file_placeholder = "__REZ_RXT_FILE__"
+    context_file_placeholder = "__REZ_CONTEXT_FILE__"
+
     context_tracking_payload = None
     context_tracking_lock = threading.Lock()
 
@@ -228,9 +262,18 @@ class ResolvedContext(object):
         self.status_ = ResolverStatus.pending
         self._resolved_packages = None
         self.failure_description = None
+        self._graph_reader = None
         self.graph_string = None
         self.graph_ = None
         self.from_cache = None
+        self.profile_filepath = None  # see config.resolve_profile_path
+        self._rxt_file = None
+        self._interpretation_key = None
+        self._interpretations = OrderedDict()
+
+        # tool index, see `_get_tool_index`
+        self._tools = None
+        self._tool_variants = None
 
         # stats
         self.solve_time = 0.0  # total solve time, inclusive of load time
@@ -273,7 +316,20 @@ class ResolvedContext(object):
                             suppress_passive=suppress_passive,
                             print_stats=print_stats)
 
-        resolver.solve()
+        # profile the resolve, unless the caller is already profiling
+        if config.resolve_profile_path and get_active_profiler() is None:
+            request_str = " ".join(str(x) for x in request)
+            with profiled(name=request_str) as profiler:
+                resolver.solve()
+
+            # failing to write the trace doesn't fail the resolve
+            try:
+                self.profile_filepath = write_trace(profiler)
+            except (IOError, OSError) as e:
+                print_warning("Could not write resolve profile to %s: %s"
+                              % (config.resolve_profile_path, e))
+        else:
+            resolver.solve()
 
         # convert the results
         self.status_ = resolver.status
@@ -379,7 +435,26 @@ class ResolvedContext(object):
     @property
     def has_graph(self):
         """Return True if the resolve has a graph."""
-        return bool((self.graph_ is not None) or self.graph_string)
+        return bool((self.graph_ is not None)
+                    or (self._graph_reader is not None)
+                    or self.graph_string)
+
+    @property
+    def graph_string(self):
+        """The resolve graph, as stored in the context file.
+
+        Contexts loaded from compact rxt files only read the graph from the
+        file when it is first needed.
+        """
+        if self._graph_reader is not None:
+            self._graph_string = self._graph_reader.read_field("graph")
+            self._graph_reader = None
+        return self._graph_string
+
+    @graph_string.setter
+    def graph_string(self, value):
+        self._graph_reader = None
+        self._graph_string = value
 
     def get_resolved_package(self, name):
         """Returns a `Variant` object or None if the package is not in the
@@ -525,15 +600,40 @@ class ResolvedContext(object):
 
         return write_dot(self.graph_)
 
-    def save(self, path):
-        """Save the resolved context to file."""
-        with open(path, 'w') as f:
-            self.write_to_buffer(f)
+    def save(self, path, compact=None):
+        """Save the resolved context to file.
+
+        Args:
+            path (str): File to write to.
+            compact (bool): If True, write the compact rxt format, which only
+                this version of rez (and later) can read. Defaults to
+                `config.rxt_compact`.
+        """
+        if compact is None:
+            compact = config.rxt_compact
+
+        with open(path, 'wb' if compact else 'w') as f:
+            self.write_to_buffer(f, compact=compact)
 
-    def write_to_buffer(self, buf):
-        """Save the context to a buffer."""
+        self._set_rxt_file(path, persistent=True)
+
+    def write_to_buffer(self, buf, compact=None):
+        """Save the context to a buffer.
+
+        Args:
+            buf (file-like object): Buffer to write to.
+            compact (bool): If True, write the compact rxt format. Defaults to
+                `config.rxt_compact`.
+        """
         doc = self.to_dict()
 
+        if compact is None:
+            compact = config.rxt_compact
+
+        if compact:
+            write_compact_rxt(doc, buf)
+            return
+
         if config.rxt_as_yaml:
             content = dump_yaml(doc)
         else:
@@ -557,11 +657,38 @@ class ResolvedContext(object):
     @classmethod
     def load(cls, path):
         """Load a resolved context from file."""
-        with open(path) as f:
+        with open(path, 'rb') as f:
             context = cls.read_from_buffer(f, path)
         context.set_load_path(path)
         return context
 
+    @classmethod
+    def read_fields(cls, path, fields):
+        """Read some fields of a context file, without loading the context.
+
+        For compact rxt files (see `config.rxt_compact`), only the parts of
+        the file containing the fields are decoded - for example, the resolved
+        packages can be read without reading the resolve graph.
+
+        Args:
+            path (str): Context file.
+            fields (list of str): Fields to read, see `to_dict`.
+
+        Returns:
+            dict: Field values. Fields not present in the file are skipped.
+        """
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+
+            if is_compact_rxt(content):
+                return CompactRxtReader(content).read_fields(fields)
+
+            doc = cls._parse_content(content)
+            return dict((k, v) for k, v in doc.iteritems() if k in fields)
+        except Exception as e:
+            cls._load_error(e, path)
+
     @classmethod
     def read_from_buffer(cls, buf, identifier_str=None):
         """Load the context from a buffer."""
@@ -927,10 +1054,14 @@ class ResolvedContext(object):
         @returns The environment dict generated by this context, when
             interpreted in a python rex interpreter.
         """
-        interp = Python(target_environ={}, passive=True)
-        executor = self._create_executor(interp, parent_environ)
-        self._execute(executor)
-        return executor.get_output()
+        def _interpret():
+            interp = Python(target_environ={}, passive=True)
+            executor = self._create_executor(interp, parent_environ)
+            self._execute(executor)
+            return executor.get_output()
+
+        environ = self._get_interpretation("environ", parent_environ, _interpret)
+        return environ.copy()
 
     @_on_success
     def get_key(self, key, request_only=False):
@@ -967,7 +1098,19 @@ class ResolvedContext(object):
         Returns:
             Dict of {pkg-name: (variant, [tools])}.
         """
-        return self.get_key("tools", request_only=request_only)
+        tools, _ = self._get_tool_index()
+        variants = dict((x.name, x) for x in self._resolved_packages)
+
+        if request_only:
+            requested_names = set(x.name for x in self._package_requests
+                                  if not x.conflict)
+        else:
+            requested_names = None
+
+        return dict(
+            (name, (variants[name], tools_))
+            for name, tools_ in tools.iteritems()
+            if requested_names is None or name in requested_names)
 
     @_on_success
     def get_tool_variants(self, tool_name):
@@ -983,12 +1126,8 @@ class ResolvedContext(object):
             Set of `Variant` objects. If no variant provides the tool, an
             empty set is returned.
         """
-        variants = set()
-        tools_dict = self.get_tools(request_only=False)
-        for variant, tools in tools_dict.itervalues():
-            if tool_name in tools:
-                variants.add(variant)
-        return variants
+        _, tool_variants = self._get_tool_index()
+        return set(tool_variants.get(tool_name, ()))
 
     @_on_success
     def get_conflicting_tools(self, request_only=False):
@@ -1001,17 +1140,58 @@ class ResolvedContext(object):
         Returns:
             Dict of {tool-name: set([Variant])}.
         """
-        from collections import defaultdict
-
-        tool_sets = defaultdict(set)
-        tools_dict = self.get_tools(request_only=request_only)
-        for variant, tools in tools_dict.itervalues():
-            for tool in tools:
-                tool_sets[tool].add(variant)
+        _, tool_variants = self._get_tool_index()
+
+        if request_only:
+            requested_names = set(x.name for x in self._package_requests
+                                  if not x.conflict)
+            tool_sets = dict(
+                (k, set(x for x in v if x.name in requested_names))
+                for k, v in tool_variants.iteritems())
+        else:
+            tool_sets = tool_variants
 
-        conflicts = dict((k, v) for k, v in tool_sets.iteritems() if len(v) > 1)
+        conflicts = dict((k, set(v)) for k, v in tool_sets.iteritems()
+                         if len(v) > 1)
         return conflicts
 
+    def _get_tool_index(self):
+        """Get the tools provided by each resolved package.
+
+        The index is built on first use, or is read from the serialized
+        context, so that tool lookups don't need to read the tools of every
+        resolved package each time.
+
+        Returns:
+            2-tuple:
+            - Dict of {pkg-name: [tools]};
+            - Dict of {tool-name: set([Variant])}.
+        """
+        if self._tool_variants is not None:
+            return self._tools, self._tool_variants
+
+        if self._tools is None:
+            tools = {}
+            for pkg in self._resolved_packages:
+                value = pkg.tools
+                if value is not None:
+                    tools[pkg.name] = list(value)
+        else:
+            resolved_names = set(x.name for x in self._resolved_packages)
+            tools = dict((k, v) for k, v in self._tools.iteritems()
+                         if k in resolved_names)
+
+        variants = dict((x.name, x) for x in self._resolved_packages)
+        tool_variants = defaultdict(set)
+
+        for name, tools_ in tools.iteritems():
+            for tool in tools_:
+                tool_variants[tool].add(variants[name])
+
+        self._tools = tools
+        self._tool_variants = dict(tool_variants)
+        return self._tools, self._tool_variants
+
     @_on_success
     def get_shell_code(self, shell=None, parent_environ=None, style=OutputStyle.file):
         """Get the shell code resulting from intepreting this context.
@@ -1023,14 +1203,24 @@ class ResolvedContext(object):
                 defaults to os.environ if None.
             style (): Style to format shell code in.
         """
-        executor = self._create_executor(interpreter=create_shell(shell),
-                                         parent_environ=parent_environ)
+        sh = create_shell(shell)
 
         if self.load_path and os.path.isfile(self.load_path):
-            executor.env.REZ_RXT_FILE = self.load_path
+            rxt_file = self.load_path
+        else:
+            rxt_file = None
 
-        self._execute(executor)
-        return executor.get_output(style)
+        def _interpret():
+            executor = self._create_executor(interpreter=sh,
+                                             parent_environ=parent_environ)
+            if rxt_file:
+                executor.env.REZ_RXT_FILE = rxt_file
+
+            self._execute(executor)
+            return executor.get_output(style)
+
+        return self._get_interpretation("shell_code", parent_environ, _interpret,
+                                        sh.name(), style.name, rxt_file)
 
     @_on_success
     def get_actions(self, parent_environ=None):
@@ -1228,26 +1418,51 @@ class ResolvedContext(object):
         if self.load_path and os.path.isfile(self.load_path):
             rxt_file = self.load_path
         else:
-            rxt_file = os.path.join(tmpdir, "context.rxt")
-            self.save(rxt_file)
+            # reuse the rxt written by a previous spawn, if it is untouched.
+            # Rxt files in tmpdirs that are cleaned up on exit are not reused
+            # by detached shells, which may outlive this process
+            rxt_file = self._get_rxt_file(persistent=detached)
+            if rxt_file is None:
+                rxt_file = os.path.join(tmpdir, "context.rxt")
+                self.save(rxt_file)
+                self._set_rxt_file(rxt_file, persistent=detached)
 
         context_file = context_filepath or \
             os.path.join(tmpdir, "context.%s" % sh.file_extension())
 
         # interpret this context and write out the native context file
-        executor = self._create_executor(sh, parent_environ)
-        executor.env.REZ_RXT_FILE = rxt_file
-        executor.env.REZ_CONTEXT_FILE = context_file
+        if config.context_interpretation_caching \
+                and not (actions_callback or post_actions_callback):
+            # the rxt and context filepaths differ between spawns, so the
+            # cached code contains placeholders for them
+            def _interpret():
+                executor = self._create_executor(sh, parent_environ)
+                executor.env.REZ_RXT_FILE = self.rxt_file_placeholder
+                executor.env.REZ_CONTEXT_FILE = self.context_file_placeholder
+                self._execute(executor)
+                return executor.get_output()
+
+            context_code = self._get_interpretation(
+                "shell", parent_environ, _interpret, sh.name())
+
+            context_code = context_code \
+                .replace(self.rxt_file_placeholder, rxt_file) \
+                .replace(self.context_file_placeholder, context_file)
+        else:
+            executor = self._create_executor(sh, parent_environ)
+            executor.env.REZ_RXT_FILE = rxt_file
+            executor.env.REZ_CONTEXT_FILE = context_file
 
-        if actions_callback:
-            actions_callback(executor)
+            if actions_callback:
+                actions_callback(executor)
 
-        self._execute(executor)
+            self._execute(executor)
 
-        if post_actions_callback:
-            post_actions_callback(executor)
+            if post_actions_callback:
+                post_actions_callback(executor)
+
+            context_code = executor.get_output()
 
-        context_code = executor.get_output()
         with open(context_file, 'w') as f:
             f.write(context_code)
 
@@ -1317,6 +1532,13 @@ class ResolvedContext(object):
 
             data["graph"] = graph_str
 
+        if _add("tools"):
+            if self.success:
+                tools, _ = self._get_tool_index()
+                data["tools"] = tools
+            else:
+                data["tools"] = None
+
         data.update(dict(
             timestamp=self.timestamp,
             requested_timestamp=self.requested_timestamp,
@@ -1412,8 +1634,13 @@ class ResolvedContext(object):
         r.solve_time = d["solve_time"]
         r.load_time = d["load_time"]
 
+        r._graph_reader = None
         r.graph_string = d["graph"]
         r.graph_ = None
+        r.profile_filepath = None
+        r._rxt_file = None
+        r._interpretation_key = None
+        r._interpretations = OrderedDict()
 
         r._resolved_packages = []
         for d_ in d["resolved_packages"]:
@@ -1463,6 +1690,11 @@ class ResolvedContext(object):
 
         r.num_loaded_packages = d.get("num_loaded_packages", -1)
 
+        # -- SINCE SERIALIZE VERSION 4.4
+
+        r._tools = d.get("tools")
+        r._tool_variants = None
+
         # track context usage
         if config.context_tracking_host:
             data = dict((k, v) for k, v in d.iteritems()
@@ -1525,14 +1757,30 @@ class ResolvedContext(object):
     def _read_from_buffer(cls, buf, identifier_str=None):
         content = buf.read()
 
-        if content.startswith('{'):  # assume json content
-            doc = json.loads(content)
-        else:
-            doc = yaml.load(content)
+        if is_compact_rxt(content):
+            # the graph is read from the file content when first needed
+            reader = CompactRxtReader(content)
+            doc = reader.read_fields(exclude=["graph"])
+            doc["graph"] = None
+
+            context = cls.from_dict(doc, identifier_str)
+            # the reader is kept rather than a closure, so that the context
+            # can still be pickled
+            if reader.has_field("graph"):
+                context._graph_reader = reader
+            return context
 
+        doc = cls._parse_content(content)
         context = cls.from_dict(doc, identifier_str)
         return context
 
+    @classmethod
+    def _parse_content(cls, content):
+        if content.startswith('{'):  # assume json content
+            return json.loads(content)
+        else:
+            return yaml.load(content)
+
     @classmethod
     def _load_error(cls, e, path=None):
         exc_name = e.__class__.__name__
@@ -1544,6 +1792,97 @@ class ResolvedContext(object):
     def _set_parent_suite(self, suite_path, context_name):
         self.parent_suite_path = suite_path
         self.suite_context_name = context_name
+        self._rxt_file = None
+        self._interpretation_key = None
+        self._interpretations.clear()
+
+    def _get_interpretation(self, kind, parent_environ, func, *args):
+        # get the result of interpreting the context, from the in-process or
+        # on-disk cache if possible. See 'context_interpretation_caching'
+        if not config.context_interpretation_caching:
+            return func()
+
+        key = self._get_interpretation_cache_key(kind, parent_environ, args)
+        value = self._interpretations.pop(key, None)
+
+        if value is None:
+            cache = LocalCache(config.context_interpretation_cache_path)
+            if cache:
+                value = cache.get(key)
+
+            if value is None or value is LocalCache.miss:
+                value = func()
+                if cache:
+                    try:
+                        cache.set(key, value)
+                    except (IOError, OSError):
+                        pass  # failing to cache is not an error
+
+        self._interpretations[key] = value
+        while len(self._interpretations) > self.max_cached_interpretations:
+            self._interpretations.popitem(last=False)
+
+        return value
+
+    def _get_interpretation_cache_key(self, kind, parent_environ, args):
+        if self._interpretation_key is None:
+            doc = self.to_dict(fields=["resolved_packages",
+                                       "package_requests",
+                                       "implicit_packages",
+                                       "package_paths",
+                                       "timestamp",
+                                       "requested_timestamp",
+                                       "building",
+                                       "rez_version",
+                                       "rez_path",
+                                       "parent_suite_path",
+                                       "suite_context_name"])
+            self._interpretation_key = json.dumps(doc, sort_keys=True)
+
+        # a package definition file that has changed since the context was
+        # interpreted may have different commands
+        states = []
+        for variant in self._resolved_packages:
+            repo = variant.resource._repository
+            states.append(repo.get_variant_state_handle(variant.resource))
+
+        if parent_environ is None:
+            parent_environ = os.environ
+
+        h = md5(kind)
+        h.update(repr(args))
+        h.update(self._interpretation_key)
+        h.update(repr(states))
+        h.update(repr(sorted(parent_environ.items())))
+        h.update(repr(self.verbosity))
+        h.update(_get_interpretation_key_material())
+        return "context_interpretation:%s" % h.hexdigest()
+
+    def _set_rxt_file(self, path, persistent):
+        # remember where this context was last written, so that it can be
+        # reused rather than written again
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        self._rxt_file = (path, st.st_mtime, st.st_size, persistent)
+
+    def _get_rxt_file(self, persistent=False):
+        if self._rxt_file is None:
+            return None
+
+        path, mtime, size, persistent_ = self._rxt_file
+        if persistent and not persistent_:
+            return None
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        if (st.st_mtime, st.st_size) == (mtime, size):
+            return path
+        return None
 
     def _create_executor(self, interpreter, parent_environ):
         parent_vars = True if config.all_parent_variables \
@@ -1565,6 +1904,7 @@ class ResolvedContext(object):
         return self.pre_resolve_bindings
 
     @pool_memcached_connections
+    @instrumented("interpret", "rex")
     def _execute(self, executor):
         br = '#' * 80
         br_minor = '-' * 80
@@ -1669,7 +2009,8 @@ class ResolvedContext(object):
                 commands.set_package(pkg)
 
                 try:
-                    executor.execute_code(commands, isolate=True)
+                    with span(attr, "rex", package=pkg.qualified_name):
+                        executor.execute_code(commands, isolate=True)
                 except error_class as e:
                     exc = e
 
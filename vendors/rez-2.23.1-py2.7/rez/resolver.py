@@ -1,9 +1,12 @@
-from rez.solver import Solver, SolverStatus, PackageVariantCache
+from rez.solver import Solver, SolverStatus, PackageVariantCache, \
+    SharedPackageCache
 from rez.package_repository import package_repository_manager
 from rez.packages_ import get_variant, get_last_release_time
 from rez.package_filter import PackageFilterList, TimestampRule
 from rez.utils.memcached import memcached_client, pool_memcached_connections
+from rez.utils.local_cache import LocalCache
 from rez.utils.logging_ import log_duration
+from rez.utils.profiling import span, count
 from rez.config import config
 from rez.vendor.enum import Enum
 from contextlib import contextmanager
@@ -97,6 +100,7 @@ class Resolver(object):
         self.graph_ = None
         self.from_cache = False
         self.memcached_servers = config.memcached_uri if config.resolve_caching else None
+        self.local_cache_path = config.resolve_cache_path if config.resolve_caching else None
 
         self.solve_time = 0.0  # time spent solving
         self.load_time = 0.0   # time spent loading package resources
@@ -107,20 +111,27 @@ class Resolver(object):
     def solve(self):
         """Perform the solve.
         """
-        with log_duration(self._print, "memcache get (resolve) took %s"):
-            solver_dict = self._get_cached_solve()
+        with span("resolve", "resolver"):
+            with log_duration(self._print, "memcache get (resolve) took %s"):
+                with span("resolve_cache_get", "resolver"):
+                    solver_dict = self._get_cached_solve()
+
+            if solver_dict:
+                count("resolver.cache_hits")
+                self.from_cache = True
+                self._set_result(solver_dict)
+            else:
+                if self._cache_enabled():
+                    count("resolver.cache_misses")
 
-        if solver_dict:
-            self.from_cache = True
-            self._set_result(solver_dict)
-        else:
-            self.from_cache = False
-            solver = self._solve()
-            solver_dict = self._solver_to_dict(solver)
-            self._set_result(solver_dict)
+                self.from_cache = False
+                solver = self._solve()
+                solver_dict = self._solver_to_dict(solver)
+                self._set_result(solver_dict)
 
-            with log_duration(self._print, "memcache set (resolve) took %s"):
-                self._set_cached_solve(solver_dict)
+                with log_duration(self._print, "memcache set (resolve) took %s"):
+                    with span("resolve_cache_set", "resolver"):
+                        self._set_cached_solve(solver_dict)
 
     @property
     def status(self):
@@ -195,8 +206,11 @@ class Resolver(object):
         reused if the timestamp matches exactly (but this might happen a lot -
         consider a workflow where a work area is tied down to a particular
         timestamp in order to 'lock' it from any further software releases).
+
+        If no memcached servers are configured, but 'resolve_cache_path' is
+        set, a local file-backed cache is used instead, with the same rules.
         """
-        if not (self.caching and self.memcached_servers):
+        if not self._cache_enabled():
             return None
 
         # these caches avoids some potentially repeated file stats
@@ -301,8 +315,15 @@ class Resolver(object):
             else:
                 return _hit(data)
 
+    def _cache_enabled(self):
+        return bool(self.caching and (self.memcached_servers or self.local_cache_path))
+
     @contextmanager
     def _memcached_client(self):
+        if not self.memcached_servers:
+            yield LocalCache(self.local_cache_path)
+            return
+
         with memcached_client(self.memcached_servers,
                               debug=config.debug_memcache) as client:
             yield client
@@ -322,7 +343,7 @@ class Resolver(object):
         if self.status_ != ResolverStatus.solved:
             return  # don't cache failed solves
 
-        if not (self.caching and self.memcached_servers):
+        if not self._cache_enabled():
             return
 
         # most recent release times get stored with solve result in the cache
@@ -441,6 +462,96 @@ class Resolver(object):
             variant_handles=variant_handles)
 
 
+
+def resolve_batch(requests, processes=None, **context_kwargs):
+    """Resolve many requests at once.
+
+    The resolves share their package loading (see `SharedPackageCache`), so
+    resolving many related requests - such as every application against every
+    project's config - loads each package once, rather than once per resolve.
+    Identical requests are only resolved once.
+
+    Example:
+
+        >>> contexts = resolve_batch([["maya-2017", "mtoa"], ["nuke"]],
+        >>>                          processes=4)
+
+    Args:
+        requests (list of list of str): Requests to resolve. Each is a list of
+            package request strings, or `PackageRequest` objects.
+        processes (int): If greater than 1, resolve in a pool of this many
+            processes. Requests are split into one batch per process, and each
+            process shares package loading across its own batch.
+        context_kwargs: Extra arguments to pass to each `ResolvedContext`. If
+            resolving in a process pool, these must be picklable, so
+            'callback', 'package_load_callback' and 'buf' are not supported.
+
+    Returns:
+        List of `ResolvedContext`: A context for each request, in the same
+        order as `requests`. Identical requests get the same context object.
+    """
+    from rez.resolved_context import ResolvedContext
+
+    keys = []
+    unique_requests = {}
+
+    for request in requests:
+        key = tuple(str(x) for x in request)
+        keys.append(key)
+        unique_requests.setdefault(key, list(key))
+
+    unique_keys = sorted(unique_requests.iterkeys())
+    processes = min(processes or 1, len(unique_keys))
+
+    if processes > 1:
+        unpicklable = set(context_kwargs) & \
+            set(["callback", "package_load_callback", "buf"])
+        if unpicklable:
+            raise ValueError("Not supported when resolving in a process pool: "
+                             "%s" % ", ".join(sorted(unpicklable)))
+
+        from multiprocessing import Pool
+
+        # sorting keeps requests for the same packages in the same batch
+        size = (len(unique_keys) + processes - 1) / processes
+        batches = [unique_keys[i:i + size]
+                   for i in range(0, len(unique_keys), size)]
+
+        pool = Pool(processes)
+        try:
+            results = pool.map(
+                _resolve_batch,
+                [([unique_requests[x] for x in batch], context_kwargs)
+                 for batch in batches])
+        finally:
+            pool.close()
+            pool.join()
+
+        contexts = {}
+        for batch, batch_results in zip(batches, results):
+            for key, data in zip(batch, batch_results):
+                contexts[key] = ResolvedContext.from_dict(data)
+    else:
+        with SharedPackageCache():
+            contexts = dict(
+                (key, ResolvedContext(unique_requests[key], **context_kwargs))
+                for key in unique_keys)
+
+    return [contexts[key] for key in keys]
+
+
+def _resolve_batch(args):
+    # process pool worker of `resolve_batch`. Contexts are returned as dicts,
+    # since they are not themselves picklable
+    from rez.resolved_context import ResolvedContext
+
+    requests, context_kwargs = args
+
+    with SharedPackageCache():
+        return [ResolvedContext(x, **context_kwargs).to_dict()
+                for x in requests]
+
+
 # Copyright 2013-2016 Allan Johns.
 #
 # This library is free software: you can redistribute it and/or
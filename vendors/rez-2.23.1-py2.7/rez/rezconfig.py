@@ -61,6 +61,18 @@ local_packages_path = "~/packages"
 # production use, you will probably want to change this to a site-wide location.
 release_packages_path = "~/.rez/packages/int"
 
+# Directory of a content-addressed store that installed package payloads are
+# deduplicated into. Identical files in different payloads (for example, in
+# adjacent patch versions of a package) are hardlinked to a single copy in the
+# store, so they only use disk space once. The store must be on the same
+# filesystem as the payloads, and the platform must support hardlinks; payloads
+# that cannot be hardlinked are left as they are. Note that deduplicated
+# payload files must not be modified in place. Installs do not deduplicate
+# payloads; use 'rez-payloads' (for example as a scheduled task) to deduplicate
+# payloads into, report on, and garbage collect, the store. Null disables
+# deduplication.
+payload_store_path = None
+
 # Where temporary files go. Defaults to appropriate path depending on your
 # system - for example, *nix distributions will probably set this to "/tmp". It
 # is highly recommended that this be set to local storage, such as /tmp.
@@ -136,6 +148,26 @@ bind_module_path = []
 # would change the result of an existing resolve.
 resolve_caching = True
 
+# Directory in which to cache resolves locally, when no memcached server is
+# configured (see 'memcached_uri'). This gives each workstation a persistent
+# resolve cache, so that repeat resolves of the same request skip the solver.
+# Entries are invalidated in the same way as memcached resolve entries. Has no
+# effect if 'resolve_caching' is False.
+resolve_cache_path = None
+
+# Cache the result of interpreting a context - the shell code and environment
+# that its packages' commands produce - so that spawning the same context again
+# skips running the commands. Results are keyed on the context, the state of
+# its packages' definition files, the parent environment, the shell type and
+# the rez configuration. Only enable this if your packages' commands only
+# depend on these (eg, they do not read other files).
+context_interpretation_caching = False
+
+# Directory in which to also cache context interpretations on disk, so they are
+# reused across processes. Has no effect if 'context_interpretation_caching' is
+# False.
+context_interpretation_cache_path = None
+
 # Cache package file reads to memcached, if enabled. Updated package files will
 # still be read correctly (ie, the cache invalidates when the filesystem
 # changes).
@@ -146,6 +178,22 @@ cache_package_files = True
 # changes).
 cache_listdir = True
 
+# Path of a sqlite database in which to cache directory traversals of filesystem
+# package repositories, shared by all rez processes on this machine. Directory
+# traversals are always cached in-process too (if 'cache_listdir' is True); this
+# extends that cache across processes, for when memcached is not available.
+# Entries are keyed on each directory's inode and modification time, so they
+# never go stale. Null disables the on-disk cache.
+listdir_cache_path = None
+
+# Directory in which to store package search indexes - the catalog of packages
+# that 'rez-search' queries, and the index of package requirements that
+# 'rez-depends' uses to find reverse dependencies. Indexes are updated
+# incrementally, only reloading package families that have been released since
+# the index was last written. Null means indexes are not stored, and searches
+# walk the package repositories instead.
+package_search_cache_path = None
+
 # The size of the local (in-process) resource cache. Resources include package
 # families, packages and variants. A value of 0 disables caching; -1 sets a cache
 # of unlimited size. The size refers to the number of entries, not byte count.
@@ -154,8 +202,19 @@ resource_caching_maxsize = -1
 # Uris of running memcached server(s) to use as a file and resolve cache. For
 # example, the uri "127.0.0.1:11211" points to memcached running on localhost on
 # its default port. Must be either null, or a list of strings.
+#
+# Rather than a memcached server, a "file://" uri (for example
+# "file:///var/tmp/rez_cache") selects a local on-disk store, which is shared by
+# every process that can read and write the directory. This gives the same
+# caching where running memcached isn't practical. A local store cannot be
+# combined with memcached servers.
 memcached_uri = []
 
+# Maximum size of a local memcached store (see 'memcached_uri'), in megabytes.
+# The least recently used entries are evicted when the store grows past this.
+# Zero means unlimited.
+memcached_local_store_max_size = 1024
+
 # Bytecount beyond which memcached entries are compressed, for cached package
 # files (such as package.yaml, package.py). Zero means never compress.
 memcached_package_file_min_compress_len = 16384
@@ -509,6 +568,17 @@ debug_package_exclusions = False
 # Print debugging info related to use of memcached during a resolve
 debug_resolve_memcache = False
 
+# If set, every resolve is profiled, and a trace of where its time went (in
+# solving, loading package definitions, listing directories and so on) is
+# written to a new file in this directory. See 'resolve_profile_format'.
+resolve_profile_path = None
+
+# Format of resolve profile traces (see 'resolve_profile_path'). One of:
+# - "json": a summary of timings and counters, along with each timed event;
+# - "chrome": the Chrome trace event format. Load these files into
+#   chrome://tracing, or https://ui.perfetto.dev, to view them as a timeline.
+resolve_profile_format = "json"
+
 # Debug memcache usage. As well as printing debugging info to stdout, it also
 # sends human-readable strings as memcached keys (that you can read by running
 # "memcached -vv" as the server)
@@ -644,6 +714,15 @@ max_package_changelog_revisions = 0
 # rxt file load.
 rxt_as_yaml = False
 
+# If this is true, rxt files are written in a compact, compressed binary format
+# rather than json (this overrides 'rxt_as_yaml'). The resolve graph is stored
+# separately from the rest of the context, and is only read from the file when
+# it is needed. Note that rez will detect this format on rxt file load, but older
+# versions of rez cannot read it. This includes the rxt files that rez-env and
+# other rez tools give to spawned shells (see REZ_RXT_FILE), so only enable this
+# if every rez that may read these files supports the format.
+rxt_compact = False
+
 # Warn or disallow when a package is found to contain old rez-1-style commands.
 warn_old_commands = True
 error_old_commands = False
@@ -5,6 +5,7 @@ from rez.package_resources_ import package_rex_keys
 from rez.utils.scope import ScopeContext
 from rez.utils.sourcecode import SourceCode, early, late, include
 from rez.utils.logging_ import print_debug
+from rez.utils.profiling import span
 from rez.utils.filesystem import TempDirs
 from rez.utils.data_utils import ModifyList
 from rez.exceptions import ResourceError, InvalidPackageError
@@ -124,11 +125,12 @@ def _load_file(filepath, format_, update_data_callback):
     if config.debug("file_loads"):
         print_debug("Loading file: %s" % filepath)
 
-    with open(filepath) as f:
-        result = load_func(f, filepath=filepath)
+    with span("load_file", "packages", filepath=filepath):
+        with open(filepath) as f:
+            result = load_func(f, filepath=filepath)
 
-    if update_data_callback:
-        result = update_data_callback(format_, result)
+        if update_data_callback:
+            result = update_data_callback(format_, result)
     return result
 
 
@@ -8,10 +8,12 @@ with a faster resolve.
 See SOLVER.md for an in-depth description of how this module works.
 """
 from rez.config import config
-from rez.packages_ import iter_packages
+from rez.packages_ import Package, iter_packages, prefetch_packages
 from rez.package_repository import package_repo_stats
 from rez.utils.logging_ import print_debug
+from rez.utils.profiling import instrumented, get_active_profiler
 from rez.utils.data_utils import cached_property
+from rez.utils.sourcecode import SourceCode
 from rez.vendor.pygraph.classes.digraph import digraph
 from rez.vendor.pygraph.algorithms.cycles import find_cycle
 from rez.vendor.pygraph.algorithms.accessibility import accessibility
@@ -23,6 +25,8 @@ from rez.vendor.version.requirement import VersionedObject, Requirement, \
 from rez.vendor.enum import Enum
 from rez.vendor.sortedcontainers.sortedset import SortedSet
 from contextlib import contextmanager
+from threading import local
+import itertools
 import copy
 import time
 import sys
@@ -34,6 +38,14 @@ import os
 _force_unoptimised_solver = (os.getenv("_FORCE_REZ_UNOPTIMISED_SOLVER") == "1")
 
 
+# sentinels used by the solver's intersection and reduction memos
+_memo_miss = object()
+_memo_unchanged = object()
+
+# marks a shared package entry whose variants are expanded per solver
+_late_bound = object()
+
+
 class VariantSelectMode(Enum):
     """Variant selection mode."""
     version_priority = 0
@@ -429,10 +441,15 @@ class _PackageEntry(object):
 
 class _PackageVariantList(_Common):
     """A list of package variants, loaded lazily.
+
+    A variant list may be shared by several solvers (see
+    `SharedPackageCache`), in which case `solver` is the solver that created
+    it, and each solver passes itself to `get_intersection`.
     """
-    def __init__(self, package_name, solver):
+    def __init__(self, package_name, solver, shared=False):
         self.package_name = package_name
         self.solver = solver
+        self.shared = shared
 
         # note: we do not apply package filters here, because doing so might
         # cause package loads (eg, timestamp rules). We only apply filters
@@ -450,17 +467,27 @@ class _PackageVariantList(_Common):
                 "package family not found: %s (searched: %s)"
                 % (package_name, "; ".join(self.solver.package_paths)))
 
-    def get_intersection(self, range_):
+    def get_intersection(self, range_, solver=None):
         """Get a list of variants that intersect with the given range.
 
         Args:
             range_ (`VersionRange`): Package version range.
+            solver (`Solver`): Solver the variants are for, defaults to the
+                solver that created the list.
 
         Returns:
             List of `_PackageEntry` objects.
         """
+        solver = solver or self.solver
         result = []
 
+        # load the candidate packages together, so that repositories can load
+        # them concurrently
+        unloaded = [package for package, value in self.entries
+                    if value is False and package.version in range_]
+        if len(unloaded) > 1:
+            prefetch_packages(unloaded)
+
         for entry in self.entries:
             package, value = entry
 
@@ -472,13 +499,20 @@ class _PackageVariantList(_Common):
 
             if isinstance(value, list):
                 variants = value
-                entry_ = _PackageEntry(package, variants, self.solver)
+                entry_ = _PackageEntry(package, variants, solver)
+                result.append(entry_)
+                continue
+
+            if value is _late_bound:
+                package_ = Package(package.resource, context=solver.context)
+                variants = self._get_variants(package_, solver)
+                entry_ = _PackageEntry(package_, variants, solver)
                 result.append(entry_)
                 continue
 
             # apply package filter
-            if self.solver.package_filter:
-                rule = self.solver.package_filter.excludes(package)
+            if solver.package_filter:
+                rule = solver.package_filter.excludes(package)
                 if rule:
                     if config.debug_package_exclusions:
                         print_debug("Package '%s' was excluded by rule '%s'"
@@ -487,20 +521,37 @@ class _PackageVariantList(_Common):
                     continue
 
             # expand package entry into list of variants
-            if self.solver.package_load_callback:
-                self.solver.package_load_callback(package)
-
-            variants_ = []
-            for var in package.iter_variants():
-                variant = PackageVariant(var, self.solver.building)
-                variants_.append(variant)
+            if solver.package_load_callback:
+                solver.package_load_callback(package)
+
+            # late bound requirements can depend on the context, so they can't
+            # be shared between solvers
+            if self.shared and self._has_late_bound_requires(package):
+                entry[1] = _late_bound
+                package = Package(package.resource, context=solver.context)
+                variants_ = self._get_variants(package, solver)
+            else:
+                variants_ = self._get_variants(package, solver)
+                entry[1] = variants_
 
-            entry[1] = variants_
-            entry_ = _PackageEntry(package, variants_, self.solver)
+            entry_ = _PackageEntry(package, variants_, solver)
             result.append(entry_)
 
         return result or None
 
+    @classmethod
+    def _get_variants(cls, package, solver):
+        return [PackageVariant(var, solver.building)
+                for var in package.iter_variants()]
+
+    @classmethod
+    def _has_late_bound_requires(cls, package):
+        for key in ("requires", "build_requires", "private_build_requires"):
+            value = getattr(package.resource, key, None)
+            if isinstance(value, SourceCode) and value.late_binding:
+                return True
+        return False
+
     def dump(self):
         print self.package_name
 
@@ -512,6 +563,8 @@ class _PackageVariantList(_Common):
                 variants = value
                 for variant in variants:
                     print "    %s" % str(variant)
+            elif value is _late_bound:
+                print "    [LATE BOUND]"
             else:
                 print "    %s" % str(package)
 
@@ -524,6 +577,8 @@ class _PackageVariantList(_Common):
             elif isinstance(value, list):
                 variants = value
                 val_str = ','.join(str(x) for x in variants)
+            elif value is _late_bound:
+                val_str = str(package) + "[late]"
             else:
                 val_str = str(package)
 
@@ -543,6 +598,7 @@ class _PackageVariantSlice(_Common):
         self.solver = solver
         self.package_name = package_name
         self.entries = entries
+        self.uid = next(solver.slice_ids)
         self.extracted_fams = set()
         self.been_reduced_by = set()
         self.been_intersected_with = set()
@@ -602,6 +658,20 @@ class _PackageVariantSlice(_Common):
             if range_ in self.been_intersected_with:
                 return self
 
+            # slices that share a uid have the same entries, so the result of
+            # a previous intersection (typically in a since failed phase) can
+            # be reused.
+            key = (self.uid, range_)
+            result = self.solver.intersection_memo.get(key, _memo_miss)
+            if result is not _memo_miss:
+                self.solver.intersection_memo_hits += 1
+                if result is _memo_unchanged:
+                    self.been_intersected_with.add(range_)
+                    return self
+                return result
+
+            self.solver.intersection_memo_misses += 1
+
         if self.pr:
             self.pr.passive("intersecting %s wrt range '%s'...", self, range_)
 
@@ -612,14 +682,18 @@ class _PackageVariantSlice(_Common):
             entries = [x for x in self.entries if x.version in range_]
 
         if not entries:
-            return None
+            result = None
         elif len(entries) < len(self.entries):
-            copy_ = self._copy(entries)
-            copy_.been_intersected_with.add(range_)
-            return copy_
+            result = self._copy(entries)
+            result.been_intersected_with.add(range_)
         else:
             self.been_intersected_with.add(range_)
-            return self
+            result = self
+
+        if self.solver.optimised:
+            self.solver.intersection_memo[key] = \
+                _memo_unchanged if result is self else result
+        return result
 
     def reduce_by(self, package_request):
         """Remove variants whos dependencies conflict with the given package
@@ -641,8 +715,31 @@ class _PackageVariantSlice(_Common):
                 (package_request.name not in self.fam_requires):
             return (self, [])
 
+        if not self.solver.optimised:
+            with self.solver.timed(self.solver.reduction_time):
+                return self._reduce_by(package_request)
+
+        # see intersect() - slices that share a uid have the same entries
+        key = (self.uid, package_request)
+        result = self.solver.reduction_memo.get(key, _memo_miss)
+        if result is not _memo_miss:
+            self.solver.reduction_memo_hits += 1
+            slice_, reductions = result
+            if slice_ is _memo_unchanged:
+                self.been_reduced_by.add(package_request)
+                return (self, [])
+            return (slice_, reductions)
+
+        self.solver.reduction_memo_misses += 1
+
         with self.solver.timed(self.solver.reduction_time):
-            return self._reduce_by(package_request)
+            slice_, reductions = self._reduce_by(package_request)
+
+        if slice_ is self:
+            self.solver.reduction_memo[key] = (_memo_unchanged, [])
+        else:
+            self.solver.reduction_memo[key] = (slice_, reductions)
+        return (slice_, reductions)
 
     def _reduce_by(self, package_request):
         self.solver.reduction_tests_count += 1
@@ -895,9 +992,23 @@ class _PackageVariantSlice(_Common):
 
 
 class PackageVariantCache(object):
-    def __init__(self, solver):
+    def __init__(self, solver, variant_lists=None):
+        """Create a package variant cache.
+
+        Args:
+            solver (`Solver`): Solver the cache is used by.
+            variant_lists (dict): Variant lists shared with other solvers, see
+                `SharedPackageCache`. If None, the variant lists are private
+                to this cache.
+        """
         self.solver = solver
-        self.variant_lists = {}  # {package-name: _PackageVariantList}
+        self.shared = (variant_lists is not None)
+
+        # {package-name: _PackageVariantList}
+        self.variant_lists = {} if variant_lists is None else variant_lists
+
+        # {(package-name, range): _PackageVariantSlice}
+        self.variant_slices = {}
 
     def get_variant_slice(self, package_name, range_):
         """Get a list of variants from the cache.
@@ -909,13 +1020,29 @@ class PackageVariantCache(object):
         Returns:
             `_PackageVariantSlice` object.
         """
+        if self.solver.optimised:
+            key = (package_name, range_)
+            slice_ = self.variant_slices.get(key, _memo_miss)
+            if slice_ is not _memo_miss:
+                self.solver.variant_slice_memo_hits += 1
+                return slice_
+
+            self.solver.variant_slice_memo_misses += 1
+            slice_ = self._get_variant_slice(package_name, range_)
+            self.variant_slices[key] = slice_
+            return slice_
+
+        return self._get_variant_slice(package_name, range_)
+
+    def _get_variant_slice(self, package_name, range_):
         variant_list = self.variant_lists.get(package_name)
 
         if variant_list is None:
-            variant_list = _PackageVariantList(package_name, self.solver)
+            variant_list = _PackageVariantList(package_name, self.solver,
+                                               shared=self.shared)
             self.variant_lists[package_name] = variant_list
 
-        entries = variant_list.get_intersection(range_)
+        entries = variant_list.get_intersection(range_, self.solver)
         if not entries:
             return None
 
@@ -925,6 +1052,59 @@ class PackageVariantCache(object):
         return slice_
 
 
+class SharedPackageCache(object):
+    """Package variants shared between solvers.
+
+    Each solver normally loads, filters and expands the packages it considers
+    itself. Solvers created while a shared cache is active (see `current`)
+    share this work instead, so that resolving many related requests loads
+    each package only once. Solvers only share with other solvers that use
+    the same package search path, package filter and 'building' setting.
+
+    Packages with late bound requirements are still loaded once, but their
+    variants are expanded by each solver, since their requirements may depend
+    on the context being resolved.
+
+    Example:
+
+        >>> with SharedPackageCache():
+        >>>     contexts = [ResolvedContext(x) for x in requests]
+    """
+    _current = local()
+
+    def __init__(self):
+        self.variant_lists = {}  # {settings-key: {package-name: list}}
+
+    def get_variant_lists(self, solver):
+        """Get the variant lists to share with a solver.
+
+        Returns:
+            dict: Variant lists, keyed by package name.
+        """
+        package_filter = solver.package_filter
+        key = (tuple(solver.package_paths),
+               package_filter.sha1 if package_filter else None,
+               bool(solver.building))
+
+        return self.variant_lists.setdefault(key, {})
+
+    @classmethod
+    def current(cls):
+        """Get the shared cache that is active in this thread, if any."""
+        stack = getattr(cls._current, "stack", None)
+        return stack[-1] if stack else None
+
+    def __enter__(self):
+        stack = getattr(self._current, "stack", None)
+        if stack is None:
+            stack = self._current.stack = []
+        stack.append(self)
+        return self
+
+    def __exit__(self, *nargs):
+        self._current.stack.pop()
+
+
 class _PackageScope(_Common):
     """Contains possible solutions for a package, such as a list of variants,
     or a conflict range. As the resolve progresses, package scopes are narrowed
@@ -1835,6 +2015,17 @@ class Solver(_Common):
         self.reductions_count = 0
         self.reduction_tests_count = 0
         self.reduction_broad_tests_count = 0
+        self.intersection_memo_hits = 0
+        self.intersection_memo_misses = 0
+        self.reduction_memo_hits = 0
+        self.reduction_memo_misses = 0
+        self.variant_slice_memo_hits = 0
+        self.variant_slice_memo_misses = 0
+
+        # memoised slice intersections and reductions, see _PackageVariantSlice
+        self.slice_ids = itertools.count()
+        self.intersection_memo = {}  # {(slice-uid, range): slice}
+        self.reduction_memo = {}  # {(slice-uid, request): (slice, reductions)}
 
         self.extraction_time = [0.0]
         self.intersection_time = [0.0]
@@ -1844,7 +2035,12 @@ class Solver(_Common):
 
         self._init()
 
-        self.package_cache = PackageVariantCache(self)
+        shared_cache = SharedPackageCache.current()
+        if shared_cache is None:
+            self.package_cache = PackageVariantCache(self)
+        else:
+            variant_lists = shared_cache.get_variant_lists(self)
+            self.package_cache = PackageVariantCache(self, variant_lists)
 
         # merge the request
         if self.pr:
@@ -1962,6 +2158,12 @@ class Solver(_Common):
         self.load_time = package_repo_stats.package_load_time - pt1
         self.solve_time = time.time() - t1
 
+        profiler = get_active_profiler()
+        if profiler:
+            for section, stats in self.solve_stats.iteritems():
+                for key, value in stats.iteritems():
+                    profiler.increment("solver.%s.%s" % (section, key), value)
+
         # print stats
         if self.pr.verbosity > 2:
             from pprint import pformat
@@ -1985,7 +2187,11 @@ class Solver(_Common):
             "num_intersection_tests": self.intersection_tests_count,
             "num_intersection_broad_tests": self.intersection_broad_tests_count,
             "intersection_time": self.intersection_time[0],
-            "intersection_test_time": self.intersection_test_time[0]
+            "intersection_test_time": self.intersection_test_time[0],
+            "num_intersection_memo_hits": self.intersection_memo_hits,
+            "num_intersection_memo_misses": self.intersection_memo_misses,
+            "num_variant_slice_memo_hits": self.variant_slice_memo_hits,
+            "num_variant_slice_memo_misses": self.variant_slice_memo_misses
         }
 
         reduction_stats = {
@@ -1993,7 +2199,9 @@ class Solver(_Common):
             "num_reduction_tests": self.reduction_tests_count,
             "num_reduction_broad_tests": self.reduction_broad_tests_count,
             "reduction_time": self.reduction_time[0],
-            "reduction_test_time": self.reduction_test_time[0]
+            "reduction_test_time": self.reduction_test_time[0],
+            "num_reduction_memo_hits": self.reduction_memo_hits,
+            "num_reduction_memo_misses": self.reduction_memo_misses
         }
 
         global_stats = {
@@ -2010,6 +2218,7 @@ class Solver(_Common):
             "reductions": reduction_stats
         }
 
+    @instrumented("solve_step", "solver")
     def solve_step(self):
         """Perform a single solve step.
         """
@@ -2173,6 +2382,12 @@ class Solver(_Common):
         self.reductions_count = 0
         self.reduction_tests_count = 0
         self.reduction_broad_tests_count = 0
+        self.intersection_memo_hits = 0
+        self.intersection_memo_misses = 0
+        self.reduction_memo_hits = 0
+        self.reduction_memo_misses = 0
+        self.variant_slice_memo_hits = 0
+        self.variant_slice_memo_misses = 0
 
         self.extraction_time = [0.0]
         self.intersection_time = [0.0]
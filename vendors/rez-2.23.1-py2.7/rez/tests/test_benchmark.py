@@ -0,0 +1,78 @@
+"""
+test solver benchmarking
+"""
+import rez.vendor.unittest2 as unittest
+from rez.tests.util import TestBase
+from rez.benchmark import create_synthetic_repository_data, \
+    create_synthetic_requests, run_synthetic_benchmark, compare_results
+from rez.utils import json
+
+
+class TestBenchmark(TestBase):
+    @classmethod
+    def setUpClass(cls):
+        cls.settings = {}
+
+    def test_1(self):
+        """test synthetic repository generation."""
+        data = create_synthetic_repository_data(num_families=10,
+                                                versions_per_family=3,
+                                                variant_fanout=2,
+                                                seed=4)
+        self.assertEqual(data, create_synthetic_repository_data(
+            num_families=10, versions_per_family=3, variant_fanout=2, seed=4))
+
+        self.assertEqual(len(data), 11)  # includes the variant base family
+        self.assertEqual(sorted(data["bench_0000"].keys()), ["1", "2", "3"])
+        package = data["bench_0000"]["1"]
+        self.assertEqual(package["variants"],
+                         [["bench_base-0"], ["bench_base-1"]])
+
+        # the last family has nothing left to depend on
+        for package in data["bench_0009"].itervalues():
+            self.assertEqual(package["requires"], [])
+
+        requests = create_synthetic_requests(num_families=10, num_requests=4)
+        self.assertEqual(len(requests), 4)
+
+    def test_2(self):
+        """test running a benchmark, and comparing its results."""
+        results = run_synthetic_benchmark(num_requests=3,
+                                          repetitions=2,
+                                          num_families=12,
+                                          versions_per_family=4,
+                                          conflict_density=0.0)
+
+        self.assertEqual(len(results["resolves"]), 3)
+        for entry in results["resolves"]:
+            self.assertEqual(entry["status"], "solved")
+            self.assertEqual(len(entry["solve_stats"]), 2)
+
+        summary = results["summary"]
+        self.assertEqual(summary["global"]["num_resolves"], 6)
+        self.assertGreater(summary["global"]["num_solves"], 0)
+
+        # results must survive a round trip through json
+        results_ = json.loads(json.dumps(results))
+        comparison = compare_results(results_, results)
+        self.assertEqual(comparison["global"]["num_solves"]["ratio"], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
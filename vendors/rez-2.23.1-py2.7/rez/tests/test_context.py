@@ -6,8 +6,12 @@ from rez.tests.util import restore_os_environ, restore_sys_path, TempdirMixin, \
 from rez.resolved_context import ResolvedContext
 from rez.bind import hello_world
 from rez.utils.platform_ import platform_
+from rez.utils.profiling import profiled
+from rez.utils import json
 import rez.vendor.unittest2 as unittest
 import subprocess
+import threading
+import pickle
 import os.path
 import os
 
@@ -91,6 +95,208 @@ class TestContext(TestBase, TempdirMixin):
         r2 = ResolvedContext.load(file)
         self.assertEqual(r.resolved_packages, r2.resolved_packages)
 
+    def test_serialize_compact(self):
+        """Test save/load of context in the compact rxt format."""
+        self.update_settings(dict(rxt_compact=True))
+
+        file = os.path.join(self.root, "test_compact.rxt")
+        r = ResolvedContext(["hello_world"])
+        r.save(file)
+        with open(file, 'rb') as f:
+            self.assertFalse(f.read(1) == '{')
+
+        # the graph is only read when needed
+        r2 = ResolvedContext.load(file)
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+        self.assertTrue(r2.has_graph)
+        self.assertTrue(r2._graph_reader is not None)
+
+        # the deferred graph is plain data, rather than a closure
+        reader = pickle.loads(pickle.dumps(r2._graph_reader))
+        self.assertEqual(reader.read_field("graph"), r.to_dict()["graph"])
+
+        self.assertEqual(r2.graph_string, r.to_dict()["graph"])
+        self.assertEqual(r2.to_dict(), r.to_dict())
+
+        fields = ResolvedContext.read_fields(file, ["resolved_packages",
+                                                    "package_requests"])
+        self.assertEqual(sorted(fields.keys()),
+                         ["package_requests", "resolved_packages"])
+        self.assertEqual(fields["package_requests"], ["hello_world"])
+
+        # json files are still read
+        self.update_settings(dict(rxt_compact=False))
+        file = os.path.join(self.root, "test_json.rxt")
+        r.save(file)
+        self.assertEqual(ResolvedContext.read_fields(file, ["package_requests"]),
+                         {"package_requests": ["hello_world"]})
+
+        # compact files can be asked for explicitly
+        file = os.path.join(self.root, "test_compact_2.rxt")
+        r.save(file, compact=True)
+        with open(file, 'rb') as f:
+            self.assertFalse(f.read(1) == '{')
+
+    def test_reuse_rxt_file(self):
+        """Test that an unchanged rxt file is reused between shell spawns."""
+        r = ResolvedContext(["hello_world"])
+        self.assertEqual(r._get_rxt_file(), None)
+
+        file = os.path.join(self.root, "reuse.rxt")
+        r.save(file)
+        self.assertEqual(r._get_rxt_file(), file)
+        self.assertEqual(r._get_rxt_file(persistent=True), file)
+
+        # a modified file is not reused
+        with open(file, 'a') as f:
+            f.write(' ')
+        self.assertEqual(r._get_rxt_file(), None)
+
+    def test_tool_index(self):
+        """Test that the tool index is serialized with the context."""
+        r = ResolvedContext(["hello_world"])
+        variant = r.get_resolved_package("hello_world")
+        self.assertEqual(r.get_tools(),
+                         {"hello_world": (variant, ["hello_world"])})
+        self.assertEqual(r.get_tool_variants("hello_world"), set([variant]))
+        self.assertEqual(r.get_tool_variants("nope"), set())
+        self.assertEqual(r.get_conflicting_tools(), {})
+        self.assertEqual(r.to_dict()["tools"], {"hello_world": ["hello_world"]})
+
+        file = os.path.join(self.root, "tools.rxt")
+        r.save(file)
+        r2 = ResolvedContext.load(file)
+        self.assertEqual(r2._tools, {"hello_world": ["hello_world"]})
+        self.assertEqual(r2.get_tools(request_only=True), r.get_tools())
+        self.assertEqual(r2.get_tool_variants("hello_world"),
+                         set(r2.resolved_packages))
+
+    def test_interpretation_caching(self):
+        """Test caching of context interpretations."""
+        cache_path = os.path.join(self.root, "interpretation_cache")
+        self.update_settings(dict(context_interpretation_caching=True,
+                                  context_interpretation_cache_path=cache_path))
+
+        def _count_executions(context):
+            executions = []
+            execute = context._execute
+
+            def _execute(executor):
+                executions.append(executor)
+                return execute(executor)
+
+            context._execute = _execute
+            return executions
+
+        parent_environ = {"HOME": "/home/foo"}
+        r = ResolvedContext(["hello_world"])
+        executions = _count_executions(r)
+
+        environ = r.get_environ(parent_environ=parent_environ)
+        self.assertEqual(environ.get("OH_HAI_WORLD"), "hello")
+        self.assertEqual(r.get_environ(parent_environ=parent_environ), environ)
+        self.assertEqual(len(executions), 1)
+
+        r.get_environ(parent_environ={"HOME": "/home/bah"})
+        self.assertEqual(len(executions), 2)
+
+        code = r.get_shell_code(shell="bash", parent_environ=parent_environ)
+        self.assertEqual(r.get_shell_code(shell="bash",
+                                          parent_environ=parent_environ), code)
+        self.assertEqual(len(executions), 3)
+
+        # the on-disk cache is shared with other instances of the context
+        file = os.path.join(self.root, "interpreted.rxt")
+        r.save(file)
+        r2 = ResolvedContext.load(file)
+        executions = _count_executions(r2)
+        self.assertEqual(r2.get_environ(parent_environ=parent_environ), environ)
+        self.assertEqual(len(executions), 0)
+
+        # changing the config changes the key
+        self.update_settings(dict(context_interpretation_caching=True,
+                                  context_interpretation_cache_path=cache_path,
+                                  max_package_changelog_chars=12))
+        r2.get_environ(parent_environ=parent_environ)
+        self.assertEqual(len(executions), 1)
+
+    def test_local_resolve_cache(self):
+        """Test that resolves are reused from a local resolve cache."""
+        cache_path = os.path.join(self.root, "resolve_cache")
+        self.update_settings(dict(resolve_caching=True,
+                                  resolve_cache_path=cache_path))
+
+        r = ResolvedContext(["hello_world"])
+        self.assertFalse(r.from_cache)
+        self.assertTrue(os.listdir(cache_path))
+
+        r2 = ResolvedContext(["hello_world"])
+        self.assertTrue(r2.from_cache)
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+
+        # a different request must not hit the same entry
+        r3 = ResolvedContext(["hello_world-1"])
+        self.assertFalse(r3.from_cache)
+
+        # failing to write to the cache doesn't fail the resolve
+        filepath = os.path.join(self.root, "resolve_cache_file")
+        open(filepath, 'w').close()
+        self.update_settings(dict(resolve_caching=True,
+                                  resolve_cache_path=os.path.join(filepath, "x")))
+        r4 = ResolvedContext(["hello_world"])
+        self.assertTrue(r4.success)
+        self.assertFalse(r4.from_cache)
+
+    def test_resolve_profile(self):
+        """Test that resolves are profiled."""
+        profile_path = os.path.join(self.root, "profiles")
+        self.update_settings(dict(resolve_profile_path=profile_path,
+                                  resolve_profile_format="json"))
+
+        r = ResolvedContext(["hello_world"])
+        self.assertEqual(os.path.dirname(r.profile_filepath), profile_path)
+
+        with open(r.profile_filepath) as f:
+            trace = json.loads(f.read())
+
+        self.assertEqual(trace["name"], "hello_world")
+        self.assertEqual(trace["spans"]["resolve"]["count"], 1)
+        self.assertGreater(trace["spans"]["solve_step"]["count"], 0)
+        self.assertGreater(trace["counters"]["solver.global.num_solves"], 0)
+
+        # a caller that is already profiling gets the spans instead
+        self.update_settings(dict(resolve_profile_format="chrome"))
+        with profiled() as profiler:
+            r = ResolvedContext(["hello_world"])
+            r.get_environ()
+
+        self.assertIsNone(r.profile_filepath)
+        names = set(x["name"] for x in
+                    profiler.to_chrome_trace()["traceEvents"])
+        self.assertIn("resolve", names)
+        self.assertIn("commands", names)
+
+        # a resolve in another thread is profiled separately
+        self.update_settings(dict(resolve_profile_path=profile_path))
+        contexts = []
+        with profiled() as profiler:
+            thread = threading.Thread(target=lambda: contexts.append(
+                ResolvedContext(["hello_world"])))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(profiler.events, [])
+        self.assertEqual(os.path.dirname(contexts[0].profile_filepath),
+                         profile_path)
+
+        # failing to write the trace doesn't fail the resolve
+        filepath = os.path.join(self.root, "profile_file")
+        open(filepath, 'w').close()
+        self.update_settings(dict(resolve_profile_path=filepath))
+        r = ResolvedContext(["hello_world"])
+        self.assertTrue(r.success)
+        self.assertIsNone(r.profile_filepath)
+
 
 if __name__ == '__main__':
     unittest.main()
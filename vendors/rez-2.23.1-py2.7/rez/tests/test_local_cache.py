@@ -0,0 +1,155 @@
+"""
+test local (non-memcached) caches
+"""
+import rez.vendor.unittest2 as unittest
+from rez.tests.util import TestBase, TempdirMixin
+from rez.utils.local_cache import LocalCache, SqliteCache, LocalStoreClient, \
+    local_cached
+from rez.utils.memcached import Client
+import os.path
+import os
+
+
+class TestLocalCache(TestBase, TempdirMixin):
+    @classmethod
+    def setUpClass(cls):
+        TempdirMixin.setUpClass()
+        cls.settings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        TempdirMixin.tearDownClass()
+
+    def _test_cache(self, cache):
+        self.assertIs(cache.get("foo"), cache.miss)
+
+        cache.set("foo", {"bah": [1, 2]})
+        self.assertEqual(cache.get("foo"), {"bah": [1, 2]})
+
+        cache.set("none", None)
+        self.assertIsNone(cache.get("none"))
+
+        cache.delete("foo")
+        self.assertIs(cache.get("foo"), cache.miss)
+
+        cache.flush()
+        self.assertIs(cache.get("none"), cache.miss)
+
+    def test_local_cache(self):
+        """Test the file-per-entry cache."""
+        self._test_cache(LocalCache(os.path.join(self.root, "local")))
+
+    def test_local_cache_unwritable(self):
+        """Test that failing to write to the file-per-entry cache is not an
+        error."""
+        path = os.path.join(self.root, "readonly")
+        os.makedirs(path)
+        os.chmod(path, 0o555)
+
+        # root can write to a read-only directory, but not to one whose parent
+        # is a file
+        if os.access(path, os.W_OK):
+            path = os.path.join(self.root, "notadir")
+            open(path, 'w').close()
+            path = os.path.join(path, "cache")
+
+        cache = LocalCache(path)
+        cache.set("foo", "bah")
+        self.assertIs(cache.get("foo"), cache.miss)
+
+    def test_sqlite_cache(self):
+        """Test the sqlite cache."""
+        self._test_cache(SqliteCache(os.path.join(self.root, "cache.db")))
+
+    def test_local_cached(self):
+        """Test the local_cached decorator."""
+        calls = []
+        db_path = os.path.join(self.root, "decorator.db")
+
+        def _listdir(path, stamp):
+            calls.append(path)
+            return [path, stamp]
+
+        cached = local_cached(key=lambda path, stamp: str((path, stamp)),
+                              path=lambda: db_path)(_listdir)
+
+        self.assertEqual(cached("a", 1), ["a", 1])
+        self.assertEqual(cached("a", 1), ["a", 1])
+        self.assertEqual(calls, ["a"])
+
+        # a changed key must not hit
+        self.assertEqual(cached("a", 2), ["a", 2])
+        self.assertEqual(calls, ["a", "a"])
+
+        # forgetting in-process entries still hits the on-disk cache
+        cached.forget()
+        self.assertEqual(cached("a", 1), ["a", 1])
+        self.assertEqual(calls, ["a", "a"])
+
+        disabled = local_cached(key=lambda path, stamp: str((path, stamp)),
+                                enabled=lambda: False)(_listdir)
+        disabled("b", 1)
+        disabled("b", 1)
+        self.assertEqual(calls, ["a", "a", "b", "b"])
+
+    def test_local_store(self):
+        """Test the local store memcached stand-in."""
+        uri = "file://" + os.path.join(self.root, "store")
+        store = LocalStoreClient(uri)
+
+        self.assertIsNone(store.get("foo"))
+        self.assertTrue(store.set("foo", {"bah": [1, 2]}))
+        self.assertEqual(store.get("foo"), {"bah": [1, 2]})
+
+        store.set("big", "x" * 1000, min_compress_len=100)
+        self.assertEqual(store.get("big"), "x" * 1000)
+
+        store.delete("foo")
+        self.assertIsNone(store.get("foo"))
+
+        # expired entries are misses
+        store.set("expired", 1, time=1000000000)
+        self.assertIsNone(store.get("expired"))
+
+        _, stats = store.get_stats()[0]
+        self.assertEqual(stats["curr_items"], "1")
+        self.assertEqual(stats["get_hits"], "2")
+
+        # the least recently used entries are evicted first
+        store.flush_all()
+        store.max_size = 1000
+        for i in range(10):
+            store.set(str(i), "x" * 100)
+            filepath = store._filepath(str(i))
+            os.utime(filepath, (i, i))
+
+        self.assertGreater(store.evict(), 0)
+        self.assertIsNone(store.get("0"))
+        self.assertEqual(store.get("9"), "x" * 100)
+
+        # memcached clients use the store given a file:// uri
+        client = Client([uri])
+        client.set("foo", None)
+        self.assertIsNone(client.get("foo"))
+        self.assertEqual(client.test_servers(), set([uri]))
+        client.flush(hard=True)
+        self.assertIs(client.get("foo"), client.miss)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -0,0 +1,155 @@
+"""
+test package filters
+"""
+from rez.packages_ import iter_package_families
+from rez.package_filter import PackageFilter, PackageFilterList, Rule, \
+    RegexRule
+from rez.tests.util import TestBase
+import rez.vendor.unittest2 as unittest
+import os.path
+
+
+class TestPackageFilter(TestBase):
+    @classmethod
+    def setUpClass(cls):
+        path = os.path.dirname(__file__)
+        cls.packages_path = [
+            os.path.join(path, "data", "solver", "packages"),
+            os.path.join(path, "data", "packages", "py_packages")]
+
+        cls.settings = dict(
+            packages_path=cls.packages_path,
+            package_filter=None)
+
+    def _packages(self):
+        for family in iter_package_families():
+            for package in family.iter_packages():
+                yield package
+
+    @classmethod
+    def _excludes(cls, filter_, package):
+        # reference implementation, that tests each rule in turn
+        def _match(rules):
+            for rule in rules or []:
+                if rule.match(package):
+                    return rule
+            return None
+
+        excl = (_match(filter_._excludes.get(package.name))
+                or _match(filter_._excludes.get(None)))
+
+        if excl and (_match(filter_._includes.get(package.name))
+                     or _match(filter_._includes.get(None))):
+            excl = None
+        return excl
+
+    def _filter(self, excludes, includes=None):
+        return PackageFilter.from_pod(dict(excludes=excludes,
+                                           includes=includes or []))
+
+    def _test_filter(self, filter_, expected_excluded):
+        excluded = set()
+
+        for package in self._packages():
+            rule = filter_.excludes(package)
+            self.assertEqual(rule, self._excludes(filter_, package))
+            # memoized verdicts are the same
+            self.assertEqual(rule, filter_.excludes(package))
+            if rule:
+                excluded.add(package.qualified_name)
+
+        self.assertEqual(excluded, set(expected_excluded))
+
+    def test_1(self):
+        """test compiled rules."""
+        self._test_filter(self._filter(["pyfoo-*"]),
+                          ["pyfoo-3.0.0", "pyfoo-3.1.0"])
+
+        self._test_filter(self._filter(["regex(py.*-1)", "glob(*-3*)"]),
+                          ["pydad-1", "pymum-1", "pyodd-1", "pyson-1",
+                           "pydad-3", "pymum-3",
+                           "pyfoo-3.0.0", "pyfoo-3.1.0", "versioned-3.0",
+                           "single_versioned-3.5",
+                           "test_variant_split_end-3.0"])
+
+        self._test_filter(self._filter(["python<2.6.8", "!pymum-2"]),
+                          ["python-2.5.2", "python-2.6.0",
+                           "pymum-1", "pymum-3"])
+
+        # regexes containing groups are not merged
+        filter_ = self._filter(["regex(pyb.*)", "pybah-4"])
+        filter_.add_exclusion(RegexRule(".*s(on|plit).(1|5)$"))
+        self._test_filter(filter_, ["pybah-4", "pybah-5", "pyson-1",
+                                    "pysplit-5"])
+
+        self._test_filter(
+            self._filter(["before(timestamped:2000)",
+                          "after(timestamped:6000)",
+                          "after(timestamped:7000)"],
+                         includes=["timestamped-2.1.0"]),
+            ["timestamped-1.0.5", "timestamped-1.0.6", "timestamped-2.1.5"])
+
+    def test_2(self):
+        """test family-specific and global rules."""
+        filter_ = self._filter(["glob(*-2*)", "after(timestamped:3000)"],
+                               includes=["glob(py*)", "pydad<3"])
+
+        excluded = ["bahish-2", "multi-2.0", "nopy-2.1", "variants_py-2.0",
+                    "versioned-2.0", "test_variant_split_start-2.0",
+                    "test_variant_split_mid1-2.0",
+                    "test_variant_split_mid2-2.0",
+                    "test_variant_split_end-2.0",
+                    "timestamped-1.1.1", "timestamped-1.2.0"]
+
+        self._test_filter(filter_,
+                          excluded + ["timestamped-2.0.0", "timestamped-2.1.0",
+                                      "timestamped-2.1.5"])
+
+        # adding a rule recompiles the filter
+        filter_.add_inclusion(Rule.parse_rule("timestamped-2"))
+        self._test_filter(filter_, excluded)
+
+        filter_2 = filter_ & self._filter(["pyfoo-3.1"])
+        self._test_filter(filter_2, excluded)
+        self._test_filter(filter_2 & self._filter(["nada"]),
+                          excluded + ["nada"])
+
+    def test_3(self):
+        """test filter lists."""
+        flist = PackageFilterList.from_pod([
+            dict(excludes=["before(timestamped:9000)"]),
+            dict(excludes=["pysplit-*"])])
+
+        # cheapest filter is tested first
+        self.assertEqual([str(x.to_pod()["excludes"]) for x in flist.filters],
+                         ["['glob(pysplit-*)']", "['before(timestamped:9000)']"])
+
+        flist.add_inclusion(Rule.parse_rule("pysplit-7"))
+        flist.add_inclusion(Rule.parse_rule("timestamped-1.0"))
+
+        excluded = set(x.qualified_name for x in self._packages()
+                       if flist.excludes(x))
+        self.assertEqual(excluded, set(
+            ["pysplit-5", "pysplit-6",
+             "timestamped-1.1.0", "timestamped-1.1.1", "timestamped-1.2.0",
+             "timestamped-2.0.0", "timestamped-2.1.0", "timestamped-2.1.5"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -372,6 +372,576 @@ class TestPackages(TestBase, TempdirMixin):
         _test(fam_orderer, "timestamped", expected_timestamp_result)
         _test(fam_orderer, "pymum", ["1", "2", "3"])
 
+    def test_10(self):
+        """test package definition index."""
+        from rez.package_repository import package_repository_manager
+        from rezplugins.package_repository.filesystem import \
+            _IndexedPackageData, PackageIndex
+        import shutil
+
+        packages_path = os.path.join(self.root, "indexed_packages")
+        shutil.copytree(self.solver_packages_path, packages_path)
+
+        self.update_settings(dict(
+            packages_path=[packages_path],
+            plugins=dict(package_repository=dict(
+                filesystem=dict(package_index=True)))))
+
+        def _get_requires():
+            package_repository_manager.clear_caches()
+            result = {}
+            for package in iter_packages("pyfoo"):
+                result[package.qualified_name] = (package.requires,
+                                                  package.resource._data)
+            return result
+
+        # first pass loads package definitions, and builds the index
+        loaded = _get_requires()
+        PackageIndex.flush_all()
+        self.assertTrue(os.path.isfile(
+            os.path.join(packages_path, PackageIndex.filename)))
+        for _, data in loaded.itervalues():
+            self.assertNotIsInstance(data, _IndexedPackageData)
+
+        # second pass reads from the index
+        indexed = _get_requires()
+        self.assertEqual(set(loaded.keys()), set(indexed.keys()))
+        for name, (requires, data) in indexed.iteritems():
+            self.assertIsInstance(data, _IndexedPackageData)
+            self.assertEqual(requires, loaded[name][0])
+
+        # a modified package definition is not read from the index
+        filepath = os.path.join(packages_path, "pyfoo", "3.1.0", "package.py")
+        st = os.stat(filepath)
+        os.utime(filepath, (st.st_atime, st.st_mtime + 10))
+        indexed = _get_requires()
+        self.assertNotIsInstance(indexed["pyfoo-3.1.0"][1], _IndexedPackageData)
+        self.assertIsInstance(indexed["pyfoo-3.0.0"][1], _IndexedPackageData)
+
+        # indexes written by different processes are merged, not overwritten
+        index_1 = PackageIndex(packages_path)
+        index_2 = PackageIndex(packages_path)
+        index_1.set("eek/1", filepath, 1.0, {"name": "eek"})
+        index_2.set("ook/1", filepath, 2.0, {"name": "ook"})
+        index_1.flush()
+        index_2.flush()
+
+        index = PackageIndex(packages_path)
+        self.assertEqual(index.get("eek/1", filepath, 1.0)[0], {"name": "eek"})
+        self.assertEqual(index.get("ook/1", filepath, 2.0)[0], {"name": "ook"})
+        self.assertTrue("pyfoo/3.0.0" in index.entries)
+
+        # indexes that are no longer used are forgotten
+        del index, index_1, index_2
+        package_repository_manager.clear_caches()
+        index = PackageIndex(packages_path)
+        index.clear()
+        self.assertTrue(all(x() is not None for x in PackageIndex.instances))
+
+        package_repository_manager.clear_caches()
+
+    def test_11(self):
+        """test concurrent package prefetching."""
+        from rez.package_repository import package_repository_manager
+        from rez.packages_ import prefetch_packages
+        from rez.resolved_context import ResolvedContext
+        import shutil
+        import sys
+
+        self.update_settings(dict(
+            packages_path=[self.solver_packages_path],
+            plugins=dict(package_repository=dict(
+                filesystem=dict(prefetch_threads=4)))))
+
+        package_repository_manager.clear_caches()
+        packages = list(iter_packages("pyfoo"))
+        self.assertTrue(len(packages) > 1)
+        for package in packages:
+            self.assertFalse("_data" in package.resource.__dict__)
+
+        prefetch_packages(packages)
+        for package in packages:
+            self.assertTrue("_data" in package.resource.__dict__)
+
+        # resolves are unaffected by prefetching
+        package_repository_manager.clear_caches()
+        r = ResolvedContext(["pyfoo", "python-2.6"])
+        self.assertTrue(r.success)
+
+        # indexed packages are not read
+        packages_path = os.path.join(self.root, "prefetched_packages")
+        shutil.copytree(self.solver_packages_path, packages_path)
+        self.update_settings(dict(
+            packages_path=[packages_path],
+            plugins=dict(package_repository=dict(
+                filesystem=dict(prefetch_threads=4, package_index=True)))))
+
+        filesystem = sys.modules[type(packages[0].resource._repository).__module__]
+        prefetch_file = filesystem._prefetch_file
+        reads = []
+
+        def _prefetch_file(filepath):
+            reads.append(filepath)
+            prefetch_file(filepath)
+
+        filesystem._prefetch_file = _prefetch_file
+        try:
+            package_repository_manager.clear_caches()
+            prefetch_packages(list(iter_packages("pyfoo")))
+            self.assertEqual(len(reads), len(packages))
+
+            del reads[:]
+            package_repository_manager.clear_caches()
+            packages = list(iter_packages("pyfoo"))
+            prefetch_packages(packages)
+            self.assertEqual(reads, [])
+        finally:
+            filesystem._prefetch_file = prefetch_file
+
+        package_repository_manager.clear_caches()
+
+    def test_12(self):
+        """test the reverse dependency index."""
+        from rez.package_repository import package_repository_manager
+        from rez.package_search import ReverseDependencyIndex, \
+            get_reverse_dependency_tree
+        import time
+
+        repo_path = os.path.join(self.root, "revdep_packages")
+        cache_path = os.path.join(self.root, "revdep_cache")
+
+        def _write_package(name, version, requires):
+            path = os.path.join(repo_path, name, version)
+            os.makedirs(path)
+            with open(os.path.join(path, "package.py"), 'w') as f:
+                f.write("name = %r\nversion = %r\nrequires = %r\n"
+                        % (name, version, requires))
+
+            # make sure the family's release time changes
+            family_path = os.path.join(repo_path, name)
+            t = time.time() + 10 * len(os.listdir(family_path))
+            os.utime(family_path, (t, t))
+            package_repository_manager.clear_caches()
+
+        _write_package("base", "1.0", [])
+        _write_package("middle", "1.0", ["base"])
+        _write_package("top", "1.0", ["middle", "!other"])
+
+        self.update_settings(dict(packages_path=[repo_path],
+                                  package_search_cache_path=cache_path))
+
+        class _Index(ReverseDependencyIndex):
+            loaded = []
+
+            def _load_family(self, name, release_time):
+                self.loaded.append(name)
+                return ReverseDependencyIndex._load_family(
+                    self, name, release_time)
+
+        index = _Index()
+        index.update(progress=False)
+        self.assertEqual(sorted(_Index.loaded), ["base", "middle", "top"])
+        lookup = index.get_lookup()
+        self.assertEqual(lookup["base"], set(["middle"]))
+        self.assertEqual(lookup["middle"], set(["top"]))
+        self.assertFalse("other" in lookup)  # conflicts are not dependencies
+
+        # a new index reads the stored one, and only reloads changed families
+        del _Index.loaded[:]
+        _write_package("top", "2.0", ["base"])
+        index = _Index()
+        index.update(progress=False)
+        self.assertEqual(_Index.loaded, ["top"])
+        lookup = index.get_lookup()
+        self.assertEqual(lookup["base"], set(["middle", "top"]))
+        self.assertFalse("middle" in lookup)
+
+        pkgs_list, _ = get_reverse_dependency_tree("base", progress=False)
+        self.assertEqual(pkgs_list, [["base"], ["middle", "top"]])
+
+        package_repository_manager.clear_caches()
+
+    def test_13(self):
+        """test the package catalog."""
+        from rez.package_repository import package_repository_manager
+        from rez.package_catalog import PackageCatalog
+        from rez.package_search import ResourceSearcher
+        import time
+
+        repo_path = os.path.join(self.root, "catalog_packages")
+        cache_path = os.path.join(self.root, "catalog_cache")
+
+        def _write_package(name, version, tools):
+            path = os.path.join(repo_path, name, version)
+            os.makedirs(path)
+            with open(os.path.join(path, "package.py"), 'w') as f:
+                f.write("name = %r\nversion = %r\ntools = %r\n"
+                        % (name, version, tools))
+
+            family_path = os.path.join(repo_path, name)
+            t = time.time() + 10 * len(os.listdir(family_path))
+            os.utime(family_path, (t, t))
+            package_repository_manager.clear_caches()
+
+        _write_package("maya", "2016.5", ["maya", "mayapy"])
+        _write_package("maya", "2017.0", ["maya", "mayapy"])
+        _write_package("maya_tools", "1.0", ["mtool"])
+        _write_package("nuke", "11.0", ["nuke"])
+
+        self.update_settings(dict(packages_path=[repo_path],
+                                  package_search_cache_path=cache_path))
+
+        catalog = PackageCatalog()
+        self.assertEqual(catalog.update(), 3)
+        self.assertEqual(list(catalog.iter_family_names("maya*")),
+                         ["maya", "maya_tools"])
+        self.assertEqual(
+            [x.qualified_name for x in catalog.iter_packages("maya*", latest=True)],
+            ["maya-2017.0", "maya_tools-1.0"])
+        self.assertEqual(
+            [x.qualified_name for x in catalog.iter_packages("maya", "<2017")],
+            ["maya-2016.5"])
+        self.assertEqual(
+            [x.qualified_name for x in catalog.find_tool("mayapy", latest=True)],
+            ["maya-2017.0"])
+        self.assertEqual(catalog.update(), 0)
+        catalog.close()
+
+        # only the released family is reloaded
+        _write_package("nuke", "12.0", ["nuke", "nukex"])
+        catalog = PackageCatalog()
+        self.assertEqual(catalog.update(), 1)
+        self.assertEqual([x.qualified_name for x in catalog.find_tool("nukex")],
+                         ["nuke-12.0"])
+        catalog.close()
+
+        # searches give the same results with and without the catalog
+        for request, kwargs in (("*", {}),
+                                ("maya", {}),
+                                ("maya-2017+", {"resource_type": "variant"}),
+                                ("*", {"tool": "mayapy", "latest": True})):
+            results = []
+            for use_catalog in (False, True):
+                searcher = ResourceSearcher(use_catalog=use_catalog, **kwargs)
+                type_, results_ = searcher.search(request)
+                results.append((type_, [str(x.resource) for x in results_]))
+
+            self.assertEqual(results[0], results[1])
+
+        # searches fall back to the repositories if the catalog can't be used
+        filepath = os.path.join(self.root, "catalog_file")
+        open(filepath, 'w').close()
+        self.update_settings(dict(packages_path=[repo_path],
+                                  package_search_cache_path=filepath))
+
+        type_, results_ = ResourceSearcher(use_catalog=True).search("maya")
+        self.assertEqual([x.resource.qualified_name for x in results_],
+                         ["maya-2016.5", "maya-2017.0"])
+
+        package_repository_manager.clear_caches()
+
+    def test_14(self):
+        """test the sqlite package repository."""
+        from rez.package_repository import package_repository_manager
+        from rez.resolved_context import ResolvedContext
+        from rez.exceptions import PackageRepositoryError
+
+        repo_path = "sqlite@" + os.path.join(self.root, "sqlite", "packages.db")
+        repo = package_repository_manager.get_repository(repo_path)
+        self.assertEqual(list(repo.iter_package_families()), [])
+
+        # sync copies families, then only those that were released since
+        families = _to_names(
+            iter_package_families(paths=[self.solver_packages_path]))
+        self.assertEqual(repo.sync(self.solver_packages_path), len(families))
+        self.assertEqual(_to_names(repo.iter_package_families()), families)
+        self.assertEqual(repo.sync(self.solver_packages_path), 0)
+
+        def _resolve(packages_path):
+            self.update_settings(dict(packages_path=packages_path))
+            package_repository_manager.clear_caches()
+            r = ResolvedContext(["pyvariants", "python-2.6"])
+            return [(x.qualified_name, x.root) for x in r.resolved_packages]
+
+        self.assertEqual(_resolve([self.solver_packages_path]),
+                         _resolve([repo_path]))
+
+        family = repo.get_package_family("pyfoo")
+        self.assertEqual(
+            repo.get_last_release_time(family),
+            os.path.getmtime(os.path.join(self.solver_packages_path, "pyfoo")))
+
+        package = get_package("pyfoo", "3.1.0")
+        self.assertEqual(package.resource.repository_type, "sqlite")
+        self.assertEqual(package.requires, [PackageRequest("python-2.6")])
+
+        # install variants of a new package, one at a time
+        package = create_package("foo", {"version": "1.0",
+                                          "variants": [["python-2.6"],
+                                                       ["python-2.7"]]})
+        variants = list(package.iter_variants())
+        self.assertEqual(
+            repo.install_variant(variants[0].resource, dry_run=True), None)
+
+        # the payload would otherwise be expected in the source package's base
+        self.assertRaises(PackageRepositoryError, repo.install_variant,
+                          variants[0].resource)
+
+        payload_path = os.path.join(self.root, "sqlite", "payloads")
+        self.update_settings(dict(
+            packages_path=[repo_path],
+            plugins=dict(package_repository=dict(
+                sqlite=dict(payload_path=payload_path)))))
+        package_repository_manager.clear_caches()
+        repo = package_repository_manager.get_repository(repo_path)
+
+        variant = repo.install_variant(variants[0].resource)
+        self.assertEqual(variant.index, 0)
+        self.assertEqual(variant.parent.base,
+                         os.path.join(payload_path, "foo", "1.0"))
+        self.assertEqual(
+            repo.install_variant(variants[0].resource, dry_run=True), variant)
+
+        variant = repo.install_variant(variants[1].resource)
+        self.assertEqual(variant.index, 1)
+
+        package_repository_manager.clear_caches()
+        package = get_package("foo", "1.0")
+        self.assertEqual(package.variants, [[PackageRequest("python-2.6")],
+                                            [PackageRequest("python-2.7")]])
+        self.assertTrue(package.timestamp)
+
+        package_repository_manager.clear_caches()
+
+    def test_15(self):
+        """test coordinated package installs."""
+        from rez.package_repository import package_repository_manager
+        from rez.exceptions import PackageRepositoryError
+        from rez.utils import json
+        import subprocess
+        import threading
+        import socket
+        import time
+        import sys
+
+        repo_path = os.path.join(self.root, "coordinated_packages")
+        os.makedirs(repo_path)
+        repo = package_repository_manager.get_repository(repo_path)
+        repo.install_poll_interval = 0.01
+        filesystem = sys.modules[type(repo).__module__]
+        installs = []
+
+        def _install(name, version, started=None, finish=None, error=None):
+            installs.append((name, version))
+            if started:
+                started.set()
+            if finish:
+                finish.wait()
+            if error:
+                raise error
+
+            path = os.path.join(repo_path, name, version)
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            with open(os.path.join(path, "package.py"), 'w') as f:
+                f.write("name = %r\nversion = %r\n" % (name, version))
+
+        def _install_package(name, version, results, **kwargs):
+            try:
+                result = repo.install_package(
+                    name, version, lambda: _install(name, version, **kwargs))
+            except Exception as e:
+                result = e
+            results.append(result)
+
+        self.assertTrue(repo.install_package("foo", "1", lambda: _install("foo", "1")))
+        self.assertFalse(repo.install_package("foo", "1", lambda: _install("foo", "1")))
+        self.assertEqual(installs, [("foo", "1")])
+
+        # a second request waits for the first install, and doesn't repeat it
+        def _concurrent(error=None):
+            del installs[:]
+            started = threading.Event()
+            finish = threading.Event()
+            results = []
+
+            owner = threading.Thread(
+                target=_install_package, args=("bah", "1", results),
+                kwargs=dict(started=started, finish=finish, error=error))
+            owner.start()
+            started.wait()
+
+            # the waiter must be waiting before the owner finishes
+            waiting = threading.Event()
+
+            class _Time(object):
+                def __getattr__(self, attr):
+                    return getattr(time, attr)
+
+                def sleep(self, secs):
+                    waiting.set()
+                    time.sleep(secs)
+
+            waiter = threading.Thread(
+                target=_install_package, args=("bah", "1", results))
+            filesystem.time = _Time()
+            try:
+                waiter.start()
+                waiting.wait()
+                finish.set()
+                owner.join()
+                waiter.join()
+            finally:
+                filesystem.time = time
+            return results
+
+        results = _concurrent(error=ValueError("build failed"))
+        self.assertEqual(installs, [("bah", "1")])
+        self.assertIsInstance(results[0], ValueError)
+        self.assertIsInstance(results[1], PackageRepositoryError)
+
+        # the failed install is tried again by the next request
+        results = _concurrent()
+        self.assertEqual(installs, [("bah", "1")])
+        self.assertEqual(results, [True, False])
+        self.assertFalse(os.path.exists(
+            os.path.join(repo_path, "bah", ".installing1")))
+
+        # the claim is held until every variant is installed, not just until
+        # the first variant makes the package valid
+        variant_installed = threading.Event()
+        finish = threading.Event()
+        waiting = threading.Event()
+        variant_path = os.path.join(repo_path, "eek", "1", "variant_1")
+        results = []
+
+        def _install_variants():
+            _install("eek", "1")
+            variant_installed.set()
+            finish.wait()
+            with open(variant_path, 'w'):
+                pass
+
+        def _wait():
+            results.append(repo.install_package(
+                "eek", "1", lambda: _install("eek", "1")))
+            results.append(os.path.exists(variant_path))
+            waiting.set()  # in case it didn't wait
+
+        class _Time(object):
+            def __getattr__(self, attr):
+                return getattr(time, attr)
+
+            def sleep(self, secs):
+                waiting.set()
+                time.sleep(secs)
+
+        owner = threading.Thread(target=lambda: results.append(
+            repo.install_package("eek", "1", _install_variants)))
+        owner.start()
+        variant_installed.wait()
+
+        waiter = threading.Thread(target=_wait)
+        filesystem.time = _Time()
+        try:
+            waiter.start()
+            waiting.wait()
+            finish.set()
+            owner.join()
+            waiter.join()
+        finally:
+            filesystem.time = time
+
+        self.assertEqual(results, [True, False, True])
+
+        # a claim by a process that has died is stale
+        proc = subprocess.Popen(["true"])
+        proc.wait()
+        tagfile = os.path.join(repo_path, "foo", ".installing2")
+        with open(tagfile, 'w') as f:
+            f.write(json.dumps(dict(host=socket.gethostname(), pid=proc.pid,
+                                    state="building")))
+
+        del installs[:]
+        self.assertTrue(repo.install_package("foo", "2", lambda: _install("foo", "2")))
+        self.assertEqual(installs, [("foo", "2")])
+
+        # a rez-build tagfile isn't touched while building, so it is only
+        # stale after an hour
+        tagfile = os.path.join(repo_path, "foo", ".building3")
+        with open(tagfile, 'w'):
+            pass
+        mtime = time.time() - 1200
+        os.utime(tagfile, (mtime, mtime))
+
+        self.assertRaises(PackageRepositoryError, repo.install_package,
+                          "foo", "3", lambda: _install("foo", "3"), timeout=0)
+
+        mtime = time.time() - 7200
+        os.utime(tagfile, (mtime, mtime))
+        self.assertTrue(repo.install_package("foo", "3", lambda: _install("foo", "3")))
+
+        package_repository_manager.clear_caches()
+
+    def test_16(self):
+        """test memoized timestamp package ordering."""
+        from rez.package_repository import package_repository_manager
+        from rez.package_order import TimestampPackageOrder, to_pod, from_pod
+        import shutil
+
+        packages_path = os.path.join(self.root, "ordered_packages")
+        shutil.copytree(os.path.join(self.py_packages_path, "timestamped"),
+                        os.path.join(packages_path, "timestamped"))
+        self.update_settings(dict(packages_path=[packages_path]))
+        TimestampPackageOrder._reorder_cache.clear()
+
+        def _reorder(orderer, range_=None):
+            packages = list(iter_packages("timestamped", range_))
+            ordered = orderer.reorder(packages)
+            for package in ordered:
+                self.assertTrue(any(x is package for x in packages))
+            return [str(x.version) for x in ordered]
+
+        # after v1.1.0 and before v1.1.1
+        orderer = TimestampPackageOrder(timestamp=3001, rank=3)
+        expected = ["1.1.1", "1.1.0", "1.0.6", "1.0.5",
+                    "1.2.0", "2.0.0", "2.1.5", "2.1.0"]
+
+        self.assertEqual(_reorder(orderer), expected)
+        self.assertEqual(len(TimestampPackageOrder._reorder_cache), 1)
+        self.assertEqual(_reorder(from_pod(to_pod(orderer))), expected)
+        self.assertEqual(len(TimestampPackageOrder._reorder_cache), 1)
+
+        # a different set of versions is ordered separately
+        self.assertEqual(_reorder(orderer, "1.1+"),
+                         ["1.1.1", "1.1.0", "1.2.0", "2.0.0", "2.1.5", "2.1.0"])
+        self.assertEqual(len(TimestampPackageOrder._reorder_cache), 2)
+
+        # the release time is memoized until the repository caches are cleared
+        family_path = os.path.join(packages_path, "timestamped")
+        release_time = os.path.getmtime(family_path) + 10
+        os.utime(family_path, (release_time, release_time))
+        self.assertEqual(_reorder(orderer), expected)
+        self.assertEqual(len(TimestampPackageOrder._reorder_cache), 2)
+
+        # a release changes the ordering
+        filepath = os.path.join(packages_path, "timestamped", "1.1.0",
+                                "package.py")
+        with open(filepath, 'w') as f:
+            f.write("name = 'timestamped'\nversion = '1.1.0'\n"
+                    "timestamp = 3500\n")
+
+        release_time += 10
+        os.utime(family_path, (release_time, release_time))
+        package_repository_manager.clear_caches()
+
+        self.assertEqual(_reorder(orderer),
+                         ["1.0.6", "1.0.5", "1.1.1", "1.1.0",
+                          "1.2.0", "2.0.0", "2.1.5", "2.1.0"])
+        self.assertEqual(len(TimestampPackageOrder._reorder_cache), 3)
+
+        package_repository_manager.clear_caches()
+
 
 class TestMemoryPackages(TestBase):
     def test_1_memory_variant_parent(self):
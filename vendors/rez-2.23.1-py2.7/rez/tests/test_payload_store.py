@@ -0,0 +1,115 @@
+"""
+test the package payload store
+"""
+import rez.vendor.unittest2 as unittest
+from rez.tests.util import TestBase, TempdirMixin
+from rez.payload_store import PayloadStore
+import shutil
+import os.path
+import os
+
+
+class TestPayloadStore(TestBase, TempdirMixin):
+    @classmethod
+    def setUpClass(cls):
+        TempdirMixin.setUpClass()
+        cls.settings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        TempdirMixin.tearDownClass()
+
+    def _write_payload(self, path, files):
+        for name, content in files.iteritems():
+            filepath = os.path.join(path, name)
+            if not os.path.isdir(os.path.dirname(filepath)):
+                os.makedirs(os.path.dirname(filepath))
+            with open(filepath, 'w') as f:
+                f.write(content)
+
+    def _inode(self, *path):
+        return os.stat(os.path.join(*path)).st_ino
+
+    def test_1(self):
+        """test deduplicating payloads, and garbage collection."""
+        store = PayloadStore(os.path.join(self.root, "store"))
+        path_1 = os.path.join(self.root, "foo", "1.0.0")
+        path_2 = os.path.join(self.root, "foo", "1.0.1")
+
+        self._write_payload(path_1, {"bin/foo": "foo-1.0.0",
+                                     "lib/foo.so": "x" * 1000,
+                                     "empty": ""})
+        self._write_payload(path_2, {"bin/foo": "foo-1.0.1",
+                                     "lib/foo.so": "x" * 1000,
+                                     "empty": ""})
+
+        stats = store.add_tree(path_1)
+        self.assertEqual((stats["num_files"], stats["num_added"],
+                          stats["num_linked"]), (2, 2, 0))
+
+        stats = store.add_tree(path_2)
+        self.assertEqual((stats["num_files"], stats["num_added"],
+                          stats["num_linked"]), (2, 1, 1))
+        self.assertEqual(stats["bytes_linked"], 1000)
+        self.assertEqual(self._inode(path_1, "lib", "foo.so"),
+                         self._inode(path_2, "lib", "foo.so"))
+        self.assertNotEqual(self._inode(path_1, "bin", "foo"),
+                            self._inode(path_2, "bin", "foo"))
+        with open(os.path.join(path_2, "lib", "foo.so")) as f:
+            self.assertEqual(f.read(), "x" * 1000)
+
+        # adding a payload again changes nothing
+        stats = store.add_tree(path_1)
+        self.assertEqual((stats["num_added"], stats["num_linked"]), (0, 0))
+
+        report = store.report()
+        self.assertEqual(report["num_blobs"], 3)
+        self.assertEqual(report["num_links"], 4)
+        self.assertEqual(report["bytes_saved"], 1000)
+
+        # only files that no payload uses are collected
+        shutil.rmtree(path_1)
+        self.assertEqual(store.gc(dry_run=True), (1, len("foo-1.0.0")))
+        self.assertEqual(store.report()["num_blobs"], 3)
+        self.assertEqual(store.gc(), (1, len("foo-1.0.0")))
+        self.assertEqual(store.report()["num_unused_blobs"], 0)
+
+    def test_2(self):
+        """test payloads that cannot be linked are skipped."""
+        store = PayloadStore(os.path.join(self.root, "store_2"))
+        src = os.path.join(self.root, "src_2")
+        self._write_payload(src, {"a": "aaa", "sub/b": "bbb"})
+        self.assertTrue(store.can_link(src))
+
+        # eg python 2 on windows
+        link = os.link
+        del os.link
+        try:
+            self.assertFalse(store.can_link(src))
+
+            stats = store.add_tree(src)
+            self.assertEqual((stats["num_files"], stats["num_failed"]), (0, 0))
+        finally:
+            os.link = link
+
+        self.assertEqual(store.report()["num_blobs"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
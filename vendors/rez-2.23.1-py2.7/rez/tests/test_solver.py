@@ -2,7 +2,8 @@
 test dependency resolving algorithm
 """
 from rez.vendor.version.requirement import Requirement
-from rez.solver import Solver, Cycle, SolverStatus
+from rez.solver import Solver, Cycle, SolverStatus, SharedPackageCache
+from rez.resolver import resolve_batch
 from rez.config import config
 import rez.vendor.unittest2 as unittest
 from rez.tests.util import TestBase
@@ -218,6 +219,94 @@ class TestSolver(TestBase):
                      "test_variant_split_mid2-2.0[0]",
                      "test_variant_split_start-1.0[1]"])
 
+    def test_12_memo_stats(self):
+        """Test that intersection and reduction memos are reported."""
+        s = self._solve(["test_variant_split_start"],
+                        ["test_variant_split_end-1.0[1]",
+                         "test_variant_split_mid2-2.0[0]",
+                         "test_variant_split_start-1.0[1]"])
+
+        stats = s.solve_stats
+        intersections = stats["intersections"]
+        reductions = stats["reductions"]
+
+        self.assertEqual(intersections["num_intersection_memo_misses"],
+                         intersections["num_intersection_tests"])
+        self.assertEqual(reductions["num_reduction_memo_misses"],
+                         reductions["num_reduction_tests"])
+        self.assertGreater(intersections["num_variant_slice_memo_misses"], 0)
+
+        # this request intersects and reduces the same slices more than once
+        request = ["bahish", "nopy", "pyodd"]
+        resolve = ["bahish-1[]", "nopy-2.1[]", "python-2.6.8[]",
+                   "pyfoo-3.1.0[]", "pyodd-1[]"]
+        s = self._solve(request, resolve)
+
+        stats = s.solve_stats
+        self.assertGreater(
+            stats["intersections"]["num_intersection_memo_hits"], 0)
+        self.assertGreater(stats["reductions"]["num_reduction_memo_hits"], 0)
+
+        # the result is the same when nothing is memoized
+        class _NoMemo(dict):
+            def __setitem__(self, key, value):
+                pass
+
+        s = Solver([Requirement(x) for x in request], self.packages_path)
+        s.intersection_memo = _NoMemo()
+        s.reduction_memo = _NoMemo()
+        s.solve()
+
+        stats = s.solve_stats
+        self.assertEqual(
+            stats["intersections"]["num_intersection_memo_hits"], 0)
+        self.assertEqual(stats["reductions"]["num_reduction_memo_hits"], 0)
+        self.assertEqual([str(x) for x in s.resolved_packages], resolve)
+
+    def test_13_shared_package_cache(self):
+        """Test solvers sharing their package variants."""
+        requests = [["pyfoo"], ["pybah"], ["pyvariants", "python-2"]]
+        expected = []
+        for request in requests:
+            s = Solver([Requirement(x) for x in request], self.packages_path)
+            s.solve()
+            expected.append([str(x) for x in s.resolved_packages])
+
+        with SharedPackageCache() as cache:
+            for request, resolve in zip(requests, expected):
+                s = Solver([Requirement(x) for x in request],
+                           self.packages_path)
+                s.solve()
+                self.assertEqual([str(x) for x in s.resolved_packages],
+                                 resolve)
+
+        # every solver used the same variant lists
+        self.assertEqual(len(cache.variant_lists), 1)
+        variant_lists = cache.variant_lists.values()[0]
+        self.assertIn("python", variant_lists)
+
+    def test_14_resolve_batch(self):
+        """Test resolving a batch of requests."""
+        requests = [["pyfoo"], ["pybah"], ["pyfoo"], ["pyodd"]]
+        expected = [["python-2.6.8", "pyfoo-3.1.0"],
+                    ["python-2.5.2", "pybah-5"],
+                    ["python-2.6.8", "pyfoo-3.1.0"],
+                    ["python-2.5.2", "pybah-5", "pyodd-2"]]
+
+        for processes in (None, 2):
+            contexts = resolve_batch(requests, processes=processes,
+                                     caching=False)
+            self.assertEqual(len(contexts), len(requests))
+            self.assertIs(contexts[0], contexts[2])
+
+            for context, resolve in zip(contexts, expected):
+                self.assertEqual(
+                    [x.qualified_package_name for x in context.resolved_packages],
+                    resolve)
+
+        with self.assertRaises(ValueError):
+            resolve_batch(requests, processes=2, callback=lambda x: None)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -167,7 +167,7 @@ def copytree(src, dst, symlinks=False, ignore=None, hardlinks=False):
                 linkto = os.readlink(srcname)
                 os.symlink(linkto, dstname)
             elif os.path.isdir(srcname):
-                copytree(srcname, dstname, symlinks, ignore)
+                copytree(srcname, dstname, symlinks, ignore, hardlinks)
             else:
                 copy(srcname, dstname)
         # XXX What about devices, sockets etc.?
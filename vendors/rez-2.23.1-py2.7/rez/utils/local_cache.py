@@ -0,0 +1,611 @@
+"""
+File-backed and in-process caches, for use when no memcached server is
+available.
+"""
+from rez.utils.memcached import cache_interface_version, DoNotCache
+from rez.utils.filesystem import safe_makedirs
+from rez.utils.logging_ import print_warning
+from collections import OrderedDict
+from functools import update_wrapper
+from threading import local, Lock
+from hashlib import md5
+import cPickle as pickle
+import sqlite3
+import tempfile
+import struct
+import time
+import zlib
+import os.path
+import os
+
+
+class LocalCache(object):
+    """A cache that stores entries as files in a local directory.
+
+    This mirrors the get/set/delete interface of `rez.utils.memcached.Client`,
+    so it can be used in its place. Entries are pickled, one file per key,
+    and are written atomically so that concurrent processes on the same
+    machine never see a partially written entry.
+    """
+    class _Miss(object):
+        def __nonzero__(self): return False
+    miss = _Miss()
+
+    def __init__(self, path):
+        """Create a local cache.
+
+        Args:
+            path (str): Directory to store cache entries in. It is created on
+                first write, if it does not already exist.
+        """
+        self.path = path
+
+    def __nonzero__(self):
+        return bool(self.path)
+
+    def set(self, key, val, time=0, min_compress_len=0):
+        """Store a value.
+
+        Note that `time` and `min_compress_len` are accepted for compatibility
+        with `rez.utils.memcached.Client`, and are ignored. Failing to write
+        the entry (eg, to a full or read-only disk) is logged, and is not an
+        error.
+        """
+        key = self._qualified_key(key)
+        filepath = self._filepath(key)
+
+        try:
+            safe_makedirs(self.path)
+            fd, tmp_filepath = tempfile.mkstemp(dir=self.path, prefix=".tmp-")
+        except (IOError, OSError) as e:
+            print_warning("Could not write to cache %s: %s" % (self.path, e))
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((key, val), f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_filepath, filepath)
+        except (IOError, OSError) as e:
+            print_warning("Could not write to cache %s: %s" % (self.path, e))
+            self._remove(tmp_filepath)
+        except:
+            self._remove(tmp_filepath)
+            raise
+
+    def get(self, key):
+        """Retrieve a value.
+
+        Returns:
+            object: A value if cached, else `self.miss`.
+        """
+        key = self._qualified_key(key)
+        filepath = self._filepath(key)
+
+        try:
+            with open(filepath, "rb") as f:
+                entry = pickle.load(f)
+        except IOError:
+            return self.miss
+        except Exception:
+            # a corrupt or incompatible entry is treated as a miss
+            return self.miss
+
+        if isinstance(entry, tuple) and len(entry) == 2:
+            key_, result = entry
+            if key_ == key:
+                return result
+
+        return self.miss
+
+    def delete(self, key):
+        """Delete a value, if it exists."""
+        key = self._qualified_key(key)
+        filepath = self._filepath(key)
+
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+    def flush(self, hard=False):
+        """Delete all entries from the cache.
+
+        Args:
+            hard (bool): Unused, kept for compatibility with
+                `rez.utils.memcached.Client`.
+        """
+        if not os.path.isdir(self.path):
+            return
+
+        for name in os.listdir(self.path):
+            if name.endswith(".pickle"):
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass
+
+    def disconnect(self):
+        pass
+
+    def _qualified_key(self, key):
+        return "%s:%s" % (cache_interface_version, key)
+
+    @classmethod
+    def _remove(cls, filepath):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+    def _filepath(self, key):
+        filename = md5(key).hexdigest() + ".pickle"
+        return os.path.join(self.path, filename)
+
+
+class SqliteCache(object):
+    """A cache that stores entries in a single sqlite database file.
+
+    This is better suited than `LocalCache` to many small entries (such as
+    directory listings), since it needs one file rather than one per entry.
+    It has the same interface as `LocalCache`.
+    """
+    miss = LocalCache.miss
+
+    def __init__(self, path):
+        """Create a sqlite cache.
+
+        Args:
+            path (str): Path to the database file. It is created on first use,
+                if it does not already exist.
+        """
+        self.path = path
+        self._local = local()
+
+    def __nonzero__(self):
+        return bool(self.path)
+
+    @property
+    def connection(self):
+        # sqlite connections cannot be shared between threads
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            safe_makedirs(os.path.dirname(self.path))
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("CREATE TABLE IF NOT EXISTS entries "
+                         "(key TEXT PRIMARY KEY, value BLOB)")
+            self._local.connection = conn
+        return conn
+
+    def set(self, key, val, time=0, min_compress_len=0):
+        """Store a value.
+
+        Note that `time` and `min_compress_len` are accepted for compatibility
+        with `rez.utils.memcached.Client`, and are ignored.
+        """
+        key = self._qualified_key(key)
+        blob = sqlite3.Binary(pickle.dumps(val, pickle.HIGHEST_PROTOCOL))
+
+        try:
+            with self.connection as conn:
+                conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?)",
+                             (key, blob))
+        except (sqlite3.Error, OSError):
+            pass  # failing to cache (eg, a locked database) is not an error
+
+    def get(self, key):
+        """Retrieve a value.
+
+        Returns:
+            object: A value if cached, else `self.miss`.
+        """
+        key = self._qualified_key(key)
+
+        try:
+            row = self.connection.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return self.miss
+            return pickle.loads(str(row[0]))
+        except Exception:
+            return self.miss
+
+    def delete(self, key):
+        """Delete a value, if it exists."""
+        key = self._qualified_key(key)
+
+        try:
+            with self.connection as conn:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        except (sqlite3.Error, OSError):
+            pass
+
+    def flush(self, hard=False):
+        """Delete all entries from the cache."""
+        try:
+            with self.connection as conn:
+                conn.execute("DELETE FROM entries")
+        except (sqlite3.Error, OSError):
+            pass
+
+    def disconnect(self):
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            conn.close()
+            self._local.connection = None
+
+    def _qualified_key(self, key):
+        return "%s:%s" % (cache_interface_version, key)
+
+
+class LocalStoreClient(object):
+    """A pure python stand-in for `memcache.Client`, storing entries on disk.
+
+    This lets `rez.utils.memcached.Client` target a directory rather than a
+    memcached server, by giving a "file://" uri in 'memcached_uri' - for
+    example "file:///var/tmp/rez_cache". Every process on the machine (or on
+    every machine, if the directory is shared) then shares the cache, without
+    a memcached server being deployed.
+
+    Entries are stored one file per key, written atomically. Reading an entry
+    updates its modification time, and when the store grows beyond its size
+    limit the least recently used entries are evicted. Entry expiry times are
+    supported, as in memcached.
+    """
+    uri_prefix = "file://"
+
+    # check the store size every this many sets
+    eviction_interval = 100
+
+    # evict entries until the store is this proportion of its size limit
+    eviction_ratio = 0.8
+
+    # don't update an entry's mtime on read more often than this (in seconds)
+    touch_interval = 60
+
+    _header = struct.Struct(">Bd")  # (flags, expiry time)
+    _compressed = 1
+
+    def __init__(self, uri, max_size=0):
+        """Create a local store client.
+
+        Args:
+            uri (str): Store uri, eg "file:///var/tmp/rez_cache".
+            max_size (int): Maximum store size in bytes, zero for unlimited.
+        """
+        self.uri = uri
+        self.path = os.path.expanduser(uri[len(self.uri_prefix):])
+        self.max_size = max_size
+        self.num_sets = 0
+        self.reset_stats()
+
+    @classmethod
+    def is_local_uri(cls, uri):
+        """Returns True if `uri` refers to a local store."""
+        return uri.startswith(cls.uri_prefix)
+
+    def set(self, key, val, time=0, min_compress_len=0):
+        """See `memcache.Client.set`."""
+        data = pickle.dumps(val, pickle.HIGHEST_PROTOCOL)
+        flags = 0
+
+        if min_compress_len and len(data) >= min_compress_len:
+            compressed_data = zlib.compress(data)
+            if len(compressed_data) < len(data):
+                data = compressed_data
+                flags |= self._compressed
+
+        filepath = self._filepath(key)
+        dirpath = os.path.dirname(filepath)
+        header = self._header.pack(flags, self._expiry_time(time))
+
+        try:
+            safe_makedirs(dirpath)
+            fd, tmp_filepath = tempfile.mkstemp(dir=dirpath, prefix=".tmp-")
+        except (IOError, OSError):
+            return False
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(data)
+            os.rename(tmp_filepath, filepath)
+        except (IOError, OSError):
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
+            return False
+
+        self.stats["cmd_set"] += 1
+        self.num_sets += 1
+        if self.max_size and self.num_sets % self.eviction_interval == 1:
+            self.evict()
+        return True
+
+    def get(self, key):
+        """See `memcache.Client.get`.
+
+        Returns:
+            object: The value, or None on a cache miss.
+        """
+        self.stats["cmd_get"] += 1
+        filepath = self._filepath(key)
+
+        try:
+            with open(filepath, "rb") as f:
+                content = f.read()
+                mtime = os.fstat(f.fileno()).st_mtime
+        except (IOError, OSError):
+            self.stats["get_misses"] += 1
+            return None
+
+        now = time.time()
+
+        try:
+            flags, expiry = self._header.unpack_from(content)
+            if expiry and expiry < now:
+                self.delete(key)
+                self.stats["get_misses"] += 1
+                return None
+
+            data = content[self._header.size:]
+            if flags & self._compressed:
+                data = zlib.decompress(data)
+            value = pickle.loads(data)
+        except Exception:
+            # a corrupt or incompatible entry is treated as a miss
+            self.stats["get_misses"] += 1
+            return None
+
+        if now - mtime > self.touch_interval:
+            try:
+                os.utime(filepath, None)
+            except OSError:
+                pass
+
+        self.stats["get_hits"] += 1
+        return value
+
+    def delete(self, key):
+        """See `memcache.Client.delete`."""
+        try:
+            os.remove(self._filepath(key))
+        except OSError:
+            pass
+        return True
+
+    def flush_all(self):
+        """Delete all entries."""
+        for filepath, _ in self._iter_entries():
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+
+    def evict(self):
+        """Evict least recently used entries, if the store is too large.
+
+        Returns:
+            int: Number of entries evicted.
+        """
+        entries = []
+        total_size = 0
+        now = time.time()
+
+        for filepath, st in self._iter_entries(include_tmp=True):
+            if os.path.basename(filepath).startswith(".tmp-"):
+                # left behind by a process that died mid-write
+                if now - st.st_mtime > 3600:
+                    self._remove(filepath)
+                continue
+
+            entries.append((st.st_mtime, st.st_size, filepath))
+            total_size += st.st_size
+
+        if total_size <= self.max_size:
+            return 0
+
+        target_size = self.max_size * self.eviction_ratio
+        num_evicted = 0
+
+        for _, size, filepath in sorted(entries):
+            if total_size <= target_size:
+                break
+            if self._remove(filepath):
+                total_size -= size
+                num_evicted += 1
+
+        self.stats["evictions"] += num_evicted
+        return num_evicted
+
+    def get_stats(self, stat_args=None):
+        """See `memcache.Client.get_stats`.
+
+        Hit, miss, get and set counts are those of the current process.
+        """
+        if stat_args == "reset":
+            self.reset_stats()
+            return []
+
+        num_items = 0
+        num_bytes = 0
+        for _, st in self._iter_entries():
+            num_items += 1
+            num_bytes += st.st_size
+
+        try:
+            uptime = time.time() - os.stat(self.path).st_ctime
+        except OSError:
+            uptime = 0
+
+        stats = dict((k, str(v)) for k, v in self.stats.iteritems())
+        stats.update(
+            curr_items=str(num_items),
+            bytes=str(num_bytes),
+            limit_maxbytes=str(self.max_size),
+            uptime=str(int(uptime)),
+            curr_connections="1")
+
+        return [("%s (local store)" % self.uri, stats)]
+
+    def reset_stats(self):
+        self.stats = dict(cmd_get=0, cmd_set=0, get_hits=0, get_misses=0,
+                          evictions=0)
+
+    def disconnect_all(self):
+        pass
+
+    def _filepath(self, key):
+        h = md5(key).hexdigest()
+        return os.path.join(self.path, h[:2], h + ".entry")
+
+    def _iter_entries(self, include_tmp=False):
+        try:
+            dirnames = os.listdir(self.path)
+        except OSError:
+            return
+
+        for dirname in dirnames:
+            dirpath = os.path.join(self.path, dirname)
+            try:
+                names = os.listdir(dirpath)
+            except OSError:
+                continue
+
+            for name in names:
+                if not (name.endswith(".entry")
+                        or (include_tmp and name.startswith(".tmp-"))):
+                    continue
+
+                filepath = os.path.join(dirpath, name)
+                try:
+                    yield filepath, os.stat(filepath)
+                except OSError:
+                    pass
+
+    @classmethod
+    def _expiry_time(cls, time_):
+        # as in memcached, times up to 30 days are relative to now
+        if not time_:
+            return 0
+        if time_ <= 60 * 60 * 24 * 30:
+            return time.time() + time_
+        return time_
+
+    @classmethod
+    def _remove(cls, filepath):
+        try:
+            os.remove(filepath)
+            return True
+        except OSError:
+            return False
+
+
+_sqlite_caches = {}
+_sqlite_caches_lock = Lock()
+
+
+def get_sqlite_cache(path):
+    """Get a shared `SqliteCache` instance for the given database file."""
+    with _sqlite_caches_lock:
+        cache = _sqlite_caches.get(path)
+        if cache is None:
+            cache = SqliteCache(path)
+            _sqlite_caches[path] = cache
+        return cache
+
+
+def local_cached(key, enabled=None, path=None, maxsize=10000):
+    """In-process, and optionally on-disk, memoization function decorator.
+
+    This is the local counterpart to `rez.utils.memcached.memcached`, and
+    can be stacked on top of it. Results are kept in a bounded in-process LRU
+    cache and, if `path` gives a database file, in a `SqliteCache` that is
+    shared by every process on the machine. As with memcached, the key
+    function is expected to change whenever the cached value would (eg, by
+    including a directory's inode and mtime).
+
+    Args:
+        key (callable): Function that, given the target function's args,
+            returns the string key to cache the result under.
+        enabled (callable, optional): Function returning True if caching is
+            enabled. It is called on every invocation, so that configuration
+            changes are respected.
+        path (callable, optional): Function returning the path of a sqlite
+            database to also cache results in, or None.
+        maxsize (int): Maximum number of entries in the in-process cache.
+    """
+    def decorator(func):
+        entries = OrderedDict()
+        lock = Lock()
+
+        def wrapper(*nargs, **kwargs):
+            if enabled is not None and not enabled():
+                result = func(*nargs, **kwargs)
+                if isinstance(result, DoNotCache):
+                    return result.result
+                return result
+
+            cache_key = key(*nargs, **kwargs)
+
+            with lock:
+                try:
+                    result = entries.pop(cache_key)
+                    entries[cache_key] = result
+                    return result
+                except KeyError:
+                    pass
+
+            db_path = path() if path else None
+            disk_cache = get_sqlite_cache(db_path) if db_path else None
+
+            if disk_cache:
+                result = disk_cache.get(cache_key)
+                if result is disk_cache.miss:
+                    result = func(*nargs, **kwargs)
+                    if isinstance(result, DoNotCache):
+                        return result.result
+                    disk_cache.set(cache_key, result)
+            else:
+                result = func(*nargs, **kwargs)
+                if isinstance(result, DoNotCache):
+                    return result.result
+
+            with lock:
+                entries[cache_key] = result
+                while len(entries) > maxsize:
+                    entries.popitem(last=False)
+
+            return result
+
+        def forget():
+            """Forget the in-process entries of this function.
+
+            Entries in the on-disk cache are keyed such that they become
+            invalid by themselves, so they are left in place.
+            """
+            with lock:
+                entries.clear()
+
+            inner_forget = getattr(func, "forget", None)
+            if inner_forget:
+                inner_forget()
+
+        wrapper.forget = forget
+        wrapper.__wrapped__ = func
+        return update_wrapper(wrapper, func)
+    return decorator
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
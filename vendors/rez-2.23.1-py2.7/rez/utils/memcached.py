@@ -31,6 +31,8 @@ class Client(object):
 
         Args:
             servers (str or list of str): Server URI(s), eg '127.0.0.1:11211'.
+                A "file://" URI (eg 'file:///var/tmp/rez_cache') selects a
+                local on-disk store instead, see `LocalStoreClient`.
             debug (bool): If True, quasi human readable keys are used. This helps
                 debugging - run 'memcached -vv' in the foreground to see the keys
                 being get/set/stored.
@@ -52,7 +54,7 @@ class Client(object):
             `memcache.Client` instance.
         """
         if self._client is None:
-            self._client = Client_(self.servers)
+            self._client = _create_client(self.servers)
         return self._client
 
     def test_servers(self):
@@ -63,7 +65,7 @@ class Client(object):
         """
         responders = set()
         for server in self.servers:
-            client = Client_([server])
+            client = _create_client([server])
             key = uuid4().hex
             client.set(key, 1)
             if client.get(key) == 1:
@@ -174,6 +176,19 @@ class Client(object):
         return value
 
 
+def _create_client(servers):
+    # a local store replaces memcached altogether, so it can't be mixed with
+    # memcached servers - the first local store uri wins
+    from rez.utils.local_cache import LocalStoreClient
+
+    for server in servers:
+        if LocalStoreClient.is_local_uri(server):
+            max_size = config.memcached_local_store_max_size * 1024 * 1024
+            return LocalStoreClient(server, max_size=max_size)
+
+    return Client_(servers)
+
+
 class _ScopedInstanceManager(local):
     def __init__(self):
         self.clients = {}
@@ -0,0 +1,319 @@
+"""
+Lightweight instrumentation of resolves and context interpretation.
+
+Code on hot paths marks timed spans with `span` (or the `instrumented`
+decorator), and counts events with `count`. These do next to nothing unless a
+`Profiler` is active in the current thread - see `profiled`. While one is,
+every span and counter in that thread is recorded into it, so concurrent
+resolves in different threads are profiled separately. The profiler can then be written out as
+a JSON trace, or in the Chrome trace event format, which can be loaded into
+chrome://tracing or https://ui.perfetto.dev.
+
+Example:
+
+    >>> with profiled() as profiler:
+    >>>     context = ResolvedContext(["maya"])
+    >>> profiler.write("/tmp/maya.trace.json", format_="chrome")
+"""
+from rez.utils import json
+from contextlib import contextmanager
+from collections import defaultdict
+from functools import update_wrapper
+from threading import Lock, local
+import threading
+import time
+import os
+
+
+# bump this if the format of json traces changes
+trace_format_version = 1
+
+trace_formats = ("json", "chrome")
+
+# the active profiler of each thread
+_active = local()
+
+
+class Profiler(object):
+    """Records timed spans and counters."""
+    def __init__(self, name=None):
+        """Create a profiler.
+
+        Args:
+            name (str): Name of what is being profiled, eg a resolve request.
+        """
+        self.name = name
+        self.start_time = time.time()
+        self.end_time = None
+        self.events = []  # (name, category, start, duration, thread, args)
+        self.counters = defaultdict(int)
+        self.lock = Lock()
+
+    @property
+    def total_time(self):
+        end_time = self.end_time or time.time()
+        return end_time - self.start_time
+
+    def add_span(self, name, category, start, duration, args=None):
+        """Record a timed span."""
+        entry = (name, category, start, duration,
+                 threading.current_thread().name, args)
+        with self.lock:
+            self.events.append(entry)
+
+    def increment(self, name, n=1):
+        """Increment a counter."""
+        with self.lock:
+            self.counters[name] += n
+
+    def summary(self):
+        """Summarise the recorded spans.
+
+        Returns:
+            dict: For each span name, a dict containing "category", "count",
+            "total_time" and "max_time" values.
+        """
+        summary = {}
+
+        for name, category, _, duration, _, _ in self.events:
+            entry = summary.get(name)
+            if entry is None:
+                entry = dict(category=category, count=0, total_time=0.0,
+                             max_time=0.0)
+                summary[name] = entry
+
+            entry["count"] += 1
+            entry["total_time"] += duration
+            entry["max_time"] = max(entry["max_time"], duration)
+
+        return summary
+
+    def to_dict(self):
+        """Get the trace as a dict.
+
+        Span start times are relative to the start of the profiler.
+
+        Returns:
+            dict: The trace, containing "spans" (see `summary`), "counters",
+            and the individual "events".
+        """
+        events = []
+        for name, category, start, duration, thread, args in self.events:
+            event = dict(name=name,
+                         category=category,
+                         start=start - self.start_time,
+                         duration=duration,
+                         thread=thread)
+            if args:
+                event["args"] = args
+            events.append(event)
+
+        return {
+            "format_version": trace_format_version,
+            "name": self.name,
+            "pid": os.getpid(),
+            "start_time": self.start_time,
+            "total_time": self.total_time,
+            "spans": self.summary(),
+            "counters": dict(self.counters),
+            "events": events
+        }
+
+    def to_chrome_trace(self):
+        """Get the trace in the Chrome trace event format.
+
+        Returns:
+            dict: The trace. Counters are given in "otherData", since they
+            are totals rather than values over time.
+        """
+        pid = os.getpid()
+        thread_ids = {}
+        trace_events = []
+
+        for name, category, start, duration, thread, args in self.events:
+            tid = thread_ids.setdefault(thread, len(thread_ids))
+            trace_events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": int((start - self.start_time) * 1e6),
+                "dur": int(duration * 1e6),
+                "pid": pid,
+                "tid": tid,
+                "args": args or {}
+            })
+
+        for thread, tid in thread_ids.iteritems():
+            trace_events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread}
+            })
+
+        return {
+            "traceEvents": trace_events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "name": self.name,
+                "total_time": self.total_time,
+                "counters": dict(self.counters)
+            }
+        }
+
+    def write(self, filepath, format_="json"):
+        """Write the trace to file.
+
+        Args:
+            filepath (str): File to write to.
+            format_ (str): One of `trace_formats`.
+        """
+        if format_ == "chrome":
+            data = self.to_chrome_trace()
+        elif format_ == "json":
+            data = self.to_dict()
+        else:
+            raise ValueError("Unknown trace format: %r" % format_)
+
+        with open(filepath, 'w') as f:
+            f.write(json.dumps(data))
+
+
+def write_trace(profiler, path=None, format_=None, prefix="resolve"):
+    """Write a profiler's trace to a new file in a directory.
+
+    Args:
+        profiler (`Profiler`): Profiler to write.
+        path (str): Directory to write to, defaults to
+            `config.resolve_profile_path`.
+        format_ (str): Trace format, defaults to
+            `config.resolve_profile_format`.
+        prefix (str): Prefix of the trace filename.
+
+    Returns:
+        str: Path of the written trace file.
+    """
+    from rez.config import config
+    from rez.utils.filesystem import safe_makedirs
+    import tempfile
+
+    path = os.path.expanduser(path or config.resolve_profile_path)
+    format_ = format_ or config.resolve_profile_format
+    suffix = ".trace.json" if format_ == "chrome" else ".json"
+    prefix = "%s-%s-" % (prefix, time.strftime("%Y%m%d-%H%M%S"))
+
+    safe_makedirs(path)
+    fd, filepath = tempfile.mkstemp(prefix=prefix, suffix=suffix, dir=path)
+    os.close(fd)
+
+    profiler.write(filepath, format_=format_)
+    return filepath
+
+
+def get_active_profiler():
+    """Get the active profiler of the current thread.
+
+    Returns:
+        `Profiler`, or None if profiling is not active.
+    """
+    return getattr(_active, "profiler", None)
+
+
+@contextmanager
+def profiled(name=None):
+    """Context manager that activates a profiler in the current thread.
+
+    If a profiler is already active, it is reused. This means a caller can
+    profile a larger operation (such as a build and resolve) that includes
+    code which profiles itself.
+
+    Args:
+        name (str): Name to give the profiler.
+
+    Yields:
+        `Profiler`: The active profiler.
+    """
+    profiler = get_active_profiler()
+    owner = (profiler is None)
+    if owner:
+        profiler = Profiler(name=name)
+        _active.profiler = profiler
+
+    try:
+        yield profiler
+    finally:
+        if owner:
+            profiler.end_time = time.time()
+            _active.profiler = None
+
+
+@contextmanager
+def span(name, category="rez", **args):
+    """Context manager that records a timed span, if profiling is active.
+
+    Args:
+        name (str): Span name, eg "load_file".
+        category (str): Span category, eg "packages".
+        args: Extra information to store with the span. These must be
+            json-serializable.
+    """
+    profiler = get_active_profiler()
+    if profiler is None:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        profiler.add_span(name, category, start, time.time() - start, args)
+
+
+def count(name, n=1):
+    """Increment a counter, if profiling is active."""
+    profiler = get_active_profiler()
+    if profiler is not None:
+        profiler.increment(name, n)
+
+
+def instrumented(name=None, category="rez"):
+    """Function decorator that records each call as a span.
+
+    Args:
+        name (str): Span name, defaults to the function's name.
+        category (str): Span category.
+    """
+    def decorator(func):
+        name_ = name or func.__name__
+
+        def wrapper(*nargs, **kwargs):
+            profiler = get_active_profiler()
+            if profiler is None:
+                return func(*nargs, **kwargs)
+
+            start = time.time()
+            try:
+                return func(*nargs, **kwargs)
+            finally:
+                profiler.add_span(name_, category, start,
+                                  time.time() - start)
+
+        return update_wrapper(wrapper, func)
+    return decorator
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -0,0 +1,161 @@
+"""
+Compact, binary context (rxt) file format.
+
+A compact rxt file consists of:
+
+- the `compact_rxt_magic` bytes;
+- the length of the header, as a 4 byte big-endian unsigned int;
+- the header, a json dict mapping chunk names to (offset, size) pairs, where
+  offsets are relative to the end of the header;
+- the chunks, each being a zlib-compressed json document.
+
+Fields listed in `separate_fields` are each stored in their own chunk, and all
+remaining fields share the "context" chunk. A field can therefore be read
+without decompressing or parsing the rest of the file - in particular, the
+resolve graph, which is usually the bulk of a context.
+"""
+from rez.utils import json
+import struct
+import zlib
+
+
+compact_rxt_magic = "\x89RXT\x01\n"
+
+# context fields that are stored in their own chunk
+separate_fields = ("graph", "resolved_packages")
+
+_header_size = struct.Struct(">I")
+_main_chunk = "context"
+
+
+def is_compact_rxt(content):
+    """Returns True if `content` is the content of a compact rxt file."""
+    return content.startswith(compact_rxt_magic)
+
+
+def write_compact_rxt(doc, buf):
+    """Write a context dict to a buffer, in the compact format.
+
+    Args:
+        doc (dict): Context dict, as returned by `ResolvedContext.to_dict`.
+        buf (file-like object): Buffer to write to. Must be opened in binary
+            mode.
+    """
+    chunks = []
+    main_doc = dict((k, v) for k, v in doc.iteritems()
+                    if k not in separate_fields)
+    chunks.append((_main_chunk, main_doc))
+
+    for key in separate_fields:
+        if key in doc:
+            chunks.append((key, doc[key]))
+
+    header = {}
+    data = []
+    offset = 0
+
+    for name, value in chunks:
+        chunk = zlib.compress(json.dumps(value, separators=(",", ":")))
+        header[name] = (offset, len(chunk))
+        data.append(chunk)
+        offset += len(chunk)
+
+    header_str = json.dumps(header, separators=(",", ":"))
+
+    buf.write(compact_rxt_magic)
+    buf.write(_header_size.pack(len(header_str)))
+    buf.write(header_str)
+    for chunk in data:
+        buf.write(chunk)
+
+
+class CompactRxtReader(object):
+    """Reads fields from the content of a compact rxt file, on demand."""
+    def __init__(self, content):
+        """Create a reader.
+
+        Args:
+            content (str): Content of a compact rxt file.
+        """
+        if not is_compact_rxt(content):
+            raise ValueError("Not a compact rxt file")
+
+        pos = len(compact_rxt_magic)
+        size, = _header_size.unpack_from(content, pos)
+        pos += _header_size.size
+
+        self.content = content
+        self.header = json.loads(content[pos:pos + size])
+        self.data_offset = pos + size
+        self._main_doc = None
+
+    @property
+    def fields(self):
+        """Get the names of the fields in the file."""
+        names = set(self._get_main_doc().iterkeys())
+        names.update(x for x in self.header if x != _main_chunk)
+        return names
+
+    def has_field(self, name):
+        return (name in self.header) or (name in self._get_main_doc())
+
+    def read_field(self, name):
+        """Read a single field.
+
+        Raises:
+            KeyError: If the field does not exist.
+        """
+        if name in separate_fields:
+            if name not in self.header:
+                raise KeyError(name)
+            return self._read_chunk(name)
+
+        return self._get_main_doc()[name]
+
+    def read_fields(self, names=None, exclude=None):
+        """Read several fields.
+
+        Args:
+            names (list of str): Fields to read, defaults to all fields.
+                Fields that don't exist are skipped.
+            exclude (list of str): Fields not to read.
+
+        Returns:
+            dict: The field values.
+        """
+        names = self.fields if names is None else names
+        exclude = set(exclude or [])
+        doc = {}
+
+        for name in names:
+            if name not in exclude and self.has_field(name):
+                doc[name] = self.read_field(name)
+
+        return doc
+
+    def _get_main_doc(self):
+        if self._main_doc is None:
+            self._main_doc = self._read_chunk(_main_chunk)
+        return self._main_doc
+
+    def _read_chunk(self, name):
+        offset, size = self.header[name]
+        start = self.data_offset + offset
+        chunk = self.content[start:start + size]
+        return json.loads(zlib.decompress(chunk))
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.
@@ -1,7 +1,7 @@
 """
 Filesystem-based package repository
 """
-from rez.package_repository import PackageRepository
+from rez.package_repository import PackageRepository, package_repo_stats
 from rez.package_resources_ import PackageFamilyResource, PackageResource, \
     VariantResourceHelper, PackageResourceHelper, package_pod_schema, \
     package_release_keys, package_build_only_keys
@@ -11,13 +11,24 @@ from rez.exceptions import PackageMetadataError, ResourceError, RezSystemError,
     ConfigurationError, PackageRepositoryError
 from rez.utils.formatting import is_valid_package_name, PackageRequest
 from rez.utils.resources import cached_property
-from rez.utils.logging_ import print_warning
+from rez.utils.logging_ import print_warning, print_debug
+from rez.utils.filesystem import safe_makedirs
 from rez.serialise import load_from_file, FileFormat
 from rez.config import config
 from rez.utils.memcached import memcached, pool_memcached_connections
+from rez.utils.local_cache import local_cached
+from rez.utils.profiling import instrumented
 from rez.backport.lru_cache import lru_cache
 from rez.vendor.schema.schema import Schema, Optional, And, Use, Or
 from rez.vendor.version.version import Version, VersionRange
+from rez.utils import json
+from multiprocessing.pool import ThreadPool
+from threading import Lock, Thread, Event
+import tempfile
+import socket
+import errno
+import atexit
+import weakref
 import time
 import os.path
 import os
@@ -63,6 +74,321 @@ class PackageDefinitionFileMissing(PackageMetadataError):
     pass
 
 
+#------------------------------------------------------------------------------
+# package index
+#
+# 1:
+# Initial format.
+#------------------------------------------------------------------------------
+package_index_version = 1
+
+# the package attributes that are stored in the index. These are the attributes
+# the solver needs, so a resolve can avoid loading package definition files
+package_index_keys = (
+    "name",
+    "version",
+    "requires",
+    "build_requires",
+    "private_build_requires",
+    "variants",
+    "timestamp",
+    "tools",
+    "uuid"
+)
+
+
+def _is_indexable(value):
+    # late bound attributes (and anything else that isn't plain data) are not
+    # indexed, they're loaded from the package definition file instead
+    if value is None or isinstance(value, (basestring, int, long, float, bool)):
+        return True
+    if isinstance(value, (list, tuple)):
+        return all(_is_indexable(x) for x in value)
+    return False
+
+
+def _prefetch_file(filepath):
+    # runs in a prefetch thread. Only reads the file, so that it is cached by
+    # the OS when it is loaded. Errors are ignored, since they are raised again
+    # when the package is loaded
+    try:
+        with open(filepath, "rb") as f:
+            while f.read(65536):
+                pass
+    except (IOError, OSError):
+        pass
+
+
+class _IndexedPackageData(object):
+    """Package data, read from a repository's package index.
+
+    Only the attributes listed in `package_index_keys` are available without
+    loading the package definition file. Accessing any other attribute loads
+    the file, and from then on all data comes from it.
+    """
+    def __init__(self, data, keys, loader):
+        self._indexed = data
+        self._keys = keys
+        self._loader = loader
+        self._full = None
+
+    @property
+    def _full_data(self):
+        if self._full is None:
+            self._full = self._loader()
+        return self._full
+
+    def __contains__(self, key):
+        if self._full is not None:
+            return key in self._full
+        if key in self._indexed:
+            return True
+        if key not in self._keys:
+            return False
+        return key in self._full_data
+
+    def __getitem__(self, key):
+        if self._full is None and key in self._indexed:
+            return self._indexed[key]
+        return self._full_data[key]
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+    def __iter__(self):
+        return iter(self._full_data)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __nonzero__(self):
+        return bool(self._keys)
+
+    def __getattr__(self, attr):
+        # any other dict method (keys, items, copy etc) works on the full data
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        return getattr(self._full_data, attr)
+
+
+class PackageIndex(object):
+    """An index of the package definitions in a filesystem repository.
+
+    The index is a single json file at the root of the repository. Each entry
+    holds the attributes in `package_index_keys` for one package, and the
+    modification time of its definition file. An entry is only used if the
+    definition file has not been modified since; otherwise the file is loaded
+    as normal and the entry is updated. Updates are written back periodically,
+    and at process exit. Writes are merged with the index on disk, so that
+    processes indexing different packages do not drop each other's entries.
+    """
+    filename = ".package_index.json"
+    write_interval = 5  # seconds
+
+    instances_lock = Lock()
+    instances = []
+
+    def __init__(self, location):
+        self.location = location
+        self.filepath = os.path.join(location, self.filename)
+        self.entries = None
+        self.updated = {}
+        self.dirty = False
+        self.last_write_time = 0
+        self.lock = Lock()
+
+        with PackageIndex.instances_lock:
+            PackageIndex._prune_instances()
+            PackageIndex.instances.append(weakref.ref(self))
+
+    def get(self, key, filepath, mtime):
+        """Get the indexed data of a package.
+
+        Args:
+            key (str): Family and version of the package, eg 'foo/1.0.0'.
+            filepath (str): Path of the package definition file.
+            mtime (float): Current modification time of `filepath`.
+
+        Returns:
+            tuple: (dict, list of str) - the indexed attributes and the names
+            of all attributes in the package definition, or None if the
+            package is not indexed or its entry is out of date.
+        """
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key)
+
+        if entry is None:
+            return None
+        if entry["filename"] != os.path.basename(filepath) \
+                or entry["mtime"] != mtime:
+            return None
+
+        return entry["data"], entry["keys"]
+
+    def set(self, key, filepath, mtime, data):
+        """Index a package, given its full (unvalidated) data."""
+        indexed = {}
+        for key_ in package_index_keys:
+            if key_ in data and _is_indexable(data[key_]):
+                indexed[key_] = data[key_]
+
+        entry = {
+            "filename": os.path.basename(filepath),
+            "mtime": mtime,
+            "keys": sorted(data.keys()),
+            "data": indexed
+        }
+
+        with self.lock:
+            self._load()
+            self.entries[key] = entry
+            self.updated[key] = entry
+            self.dirty = True
+
+            if (time.time() - self.last_write_time) > self.write_interval:
+                self._write()
+
+    def flush(self):
+        """Write any changes to disk."""
+        with self.lock:
+            if self.dirty:
+                self._write()
+
+    def clear(self):
+        """Forget the in-memory index, so it is re-read on next use."""
+        self.flush()
+        with self.lock:
+            self.entries = None
+
+        with PackageIndex.instances_lock:
+            PackageIndex._prune_instances()
+
+    @classmethod
+    def flush_all(cls):
+        with PackageIndex.instances_lock:
+            instances = cls.instances[:]
+
+        for ref in instances:
+            instance = ref()
+            if instance is not None:
+                instance.flush()
+
+    @classmethod
+    def _prune_instances(cls):
+        # forget indexes that have been garbage collected, eg those of
+        # repositories dropped by `PackageRepositoryManager.clear_caches`.
+        # Must be called with `instances_lock` held
+        cls.instances[:] = [x for x in cls.instances if x() is not None]
+
+    def _load(self):
+        if self.entries is None:
+            self.entries = self._read()
+
+    def _read(self):
+        try:
+            with open(self.filepath) as f:
+                content = json.loads(f.read())
+        except (IOError, OSError, ValueError):
+            return {}
+
+        if content.get("package_index_version") != package_index_version:
+            return {}
+        return content.get("packages", {})
+
+    def _write(self):
+        # merge with the index on disk, which another process may have
+        # written since it was loaded. Entries updated by this process win
+        self.entries = self._read()
+        self.entries.update(self.updated)
+        self.updated = {}
+
+        content = {
+            "package_index_version": package_index_version,
+            "packages": self.entries
+        }
+
+        self.dirty = False
+        self.last_write_time = time.time()
+
+        # failing to write the index (eg, a read-only repository) is not an
+        # error, the index is just an optimisation
+        try:
+            fd, tmp_filepath = tempfile.mkstemp(dir=self.location,
+                                                prefix=self.filename + ".")
+        except (IOError, OSError):
+            return
+
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(content, separators=(',', ':')))
+            os.chmod(tmp_filepath, 0o664)
+            os.rename(tmp_filepath, self.filepath)
+        except (IOError, OSError):
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
+
+
+atexit.register(PackageIndex.flush_all)
+
+
+class _BuildTagfileHeartbeat(Thread):
+    """Touches an install's claim file periodically, to show that the install
+    is still in progress. See `FileSystemPackageRepository.install_package`."""
+    def __init__(self, filepath, interval):
+        super(_BuildTagfileHeartbeat, self).__init__()
+        self.daemon = True
+        self.filepath = filepath
+        self.interval = interval
+        self.stopped = Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                os.utime(self.filepath, None)
+            except OSError:
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def _is_process_running(pid):
+    if os.name == "nt":
+        return _is_windows_process_running(pid)
+
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        return (e.errno == errno.EPERM)
+    return True
+
+
+def _is_windows_process_running(pid):
+    # os.kill can't probe a process on windows - signal 0 is CTRL_C_EVENT
+    import ctypes
+
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    ERROR_ACCESS_DENIED = 5
+    STILL_ACTIVE = 259
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+    if not handle:
+        return (kernel32.GetLastError() == ERROR_ACCESS_DENIED)
+
+    try:
+        exit_code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+            return True
+        return (exit_code.value == STILL_ACTIVE)
+    finally:
+        kernel32.CloseHandle(handle)
+
+
 #------------------------------------------------------------------------------
 # resources
 #------------------------------------------------------------------------------
@@ -162,7 +488,25 @@ class FileSystemPackageResource(PackageResourceHelper):
     def _filepath_and_format(self):
         return self._repository._get_file(self.path)
 
+    @property
+    def _index_key(self):
+        return "%s/%s" % (self.name, self.get("version", ""))
+
     def _load(self):
+        index = self._repository.package_index
+        if index is None or self.filepath is None:
+            return self._load_file()
+
+        entry = index.get(self._index_key, self.filepath, self.state_handle)
+        if entry:
+            data, keys = entry
+            return _IndexedPackageData(data, keys, self._load_file)
+
+        data = self._load_file()
+        index.set(self._index_key, self.filepath, self.state_handle, data)
+        return data
+
+    def _load_file(self):
         if self.filepath is None:
             raise PackageDefinitionFileMissing(
                 "Missing package definition file: %r" % self)
@@ -429,10 +773,24 @@ class FileSystemPackageRepository(PackageRepository):
     """
     schema_dict = {"file_lock_timeout": int,
                    "file_lock_dir": Or(None, str),
-                   "package_filenames": [basestring]}
+                   "package_filenames": [basestring],
+                   "package_index": bool,
+                   "prefetch_threads": int,
+                   "building_tagfile_timeout": int}
 
     building_prefix = ".building"
 
+    # prefix of the file that claims an install, see `install_package`
+    installing_prefix = ".installing"
+
+    # seconds between checks on another process's install, see
+    # `install_package`
+    install_poll_interval = 1.0
+
+    # seconds after which a 'building' tagfile that is not touched while its
+    # package builds (ie, one not created by `install_package`) is stale
+    untracked_building_tagfile_timeout = 3600
+
     @classmethod
     def name(cls):
         return "filesystem"
@@ -469,6 +827,12 @@ class FileSystemPackageRepository(PackageRepository):
             t.append(st.st_ino)
         return tuple(t)
 
+    @cached_property
+    def package_index(self):
+        if not _settings.package_index:
+            return None
+        return PackageIndex(self.location)
+
     def get_package_family(self, name):
         return self.get_family(name)
 
@@ -486,6 +850,47 @@ class FileSystemPackageRepository(PackageRepository):
         for variant in self.get_variants(package_resource):
             yield variant
 
+    def prefetch_packages(self, package_resources):
+        # Package definition files are read concurrently, but loaded one at a
+        # time in this thread - loading runs package code (and changes global
+        # state such as sys.path), which is not thread-safe.
+        resources = [x for x in package_resources
+                     if isinstance(x, FileSystemPackageResource)
+                     and "_data" not in x.__dict__]
+
+        # packages in the index are loaded without reading their files
+        index = self.package_index
+        if index is not None:
+            resources = [x for x in resources if x.filepath is None
+                         or not index.get(x._index_key, x.filepath,
+                                          x.state_handle)]
+
+        if len(resources) < 2 or _settings.prefetch_threads < 2:
+            return
+
+        filepaths = set(x.filepath for x in resources)
+        filepaths.discard(None)
+
+        if config.debug("resources"):
+            print_debug("Prefetching %d packages in %s"
+                        % (len(resources), self.location))
+
+        with package_repo_stats.package_loading():
+            if len(filepaths) > 1:
+                pool = ThreadPool(min(_settings.prefetch_threads,
+                                      len(filepaths)))
+                try:
+                    pool.map(_prefetch_file, filepaths)
+                finally:
+                    pool.close()
+                    pool.join()
+
+            for resource in resources:
+                try:
+                    resource._data
+                except Exception:
+                    pass  # raised again when the package is used
+
     def get_parent_package_family(self, package_resource):
         return package_resource.parent
 
@@ -533,7 +938,9 @@ class FileSystemPackageRepository(PackageRepository):
         filename = self.building_prefix + str(variant_resource.version)
         filepath = os.path.join(family_path, filename)
 
-        with open(filepath, 'w'):  # create empty file
+        # create empty file. If it exists it may belong to `install_package`,
+        # so it is left unchanged
+        with open(filepath, 'a'):
             pass
 
     def install_variant(self, variant_resource, dry_run=False, overrides=None):
@@ -567,6 +974,123 @@ class FileSystemPackageRepository(PackageRepository):
 
         return variant
 
+    def install_package(self, name, version, install_func, timeout=None):
+        """Install a package, unless it is installed already, or another
+        process is installing it.
+
+        Use this when many processes (on one or more hosts) may need the same
+        package to be built at once - only the first process installs it, and
+        the others wait for that install to complete.
+
+        The first process claims the install by creating the version's
+        'installing' file. It records the owner's host and pid, and is touched
+        periodically while `install_func` runs. Unlike the 'building' tagfile
+        (see `pre_variant_install`), it is only removed once `install_func` has
+        installed every variant. Other processes wait for it to be removed. If
+        the install fails, the error is written into the file, and is raised
+        in the waiting processes; later requests try the install again.
+
+        A claim is stale if its file has not been touched for
+        'building_tagfile_timeout' seconds, or if its owner is a process on this
+        host that is no longer running. Stale claims are replaced, so an
+        install is not held up by a process that has crashed. Processes also
+        wait for a 'building' tagfile that was created without a claim (for
+        example by rez-build). Those are not touched while building, so they
+        are only stale after `untracked_building_tagfile_timeout` seconds.
+
+        Args:
+            name (str): Package name.
+            version (str or `Version`): Package version.
+            install_func (callable): Function, taking no arguments, that
+                installs the package into this repository.
+            timeout (float): Seconds to wait for another process's install to
+                complete. If None, wait indefinitely.
+
+        Returns:
+            bool: True if this process installed the package, False if it was
+            already installed, or was installed by another process.
+        """
+        family_path = os.path.join(self.location, name)
+        ver_str = str(version)
+        pkg_path = os.path.join(family_path, ver_str)
+        tagfile = os.path.join(family_path, self.building_prefix + ver_str)
+        filepath = os.path.join(family_path, self.installing_prefix + ver_str)
+
+        safe_makedirs(family_path)
+        start_time = time.time()
+        waiting = False
+        retrying = False  # a partial install may be a valid package already
+
+        while True:
+            status_filepath = filepath
+            status = self._read_build_tagfile(filepath)
+
+            if status is None:
+                if not retrying and self._is_valid_package_directory(pkg_path):
+                    return False
+
+                # an install that was not claimed, eg by rez-build
+                status_filepath = tagfile
+                status = self._read_build_tagfile(tagfile)
+
+                if status is None:
+                    ino = self._claim_build_tagfile(filepath)
+                    if ino is None:
+                        continue  # claimed by another process just now
+
+                    # another process may have installed it just before
+                    if not retrying and self._is_valid_package_directory(pkg_path):
+                        self._remove_build_tagfile(filepath, ino)
+                        return False
+                    break
+
+            if status.get("state") == "failed":
+                if waiting:
+                    raise PackageRepositoryError(
+                        "Install of %s-%s failed on %s (pid %s): %s"
+                        % (name, ver_str, status.get("host"),
+                           status.get("pid"), status.get("error")))
+
+                # a previous install failed, so try again
+                self._remove_build_tagfile(status_filepath, status["ino"])
+                retrying = True
+                continue
+
+            if self._is_stale_build_tagfile(status_filepath, status):
+                self._remove_build_tagfile(status_filepath, status["ino"])
+                continue
+
+            if timeout is not None and (time.time() - start_time) > timeout:
+                raise PackageRepositoryError(
+                    "Timed out waiting for %s (pid %s) to install %s-%s"
+                    % (status.get("host"), status.get("pid"), name, ver_str))
+
+            waiting = True
+            retrying = False
+            time.sleep(self.install_poll_interval)
+
+        heartbeat = _BuildTagfileHeartbeat(
+            filepath, _settings.building_tagfile_timeout / 10.0)
+        heartbeat.start()
+
+        try:
+            install_func()
+        except Exception as e:
+            # a variant that failed to install may leave its tagfile behind,
+            # which would hold up the next attempt
+            status = self._read_build_tagfile(tagfile)
+            if status is not None:
+                self._remove_build_tagfile(tagfile, status["ino"])
+
+            self._write_build_tagfile(filepath, state="failed", error=str(e))
+            raise
+        finally:
+            heartbeat.stop()
+
+        self._remove_build_tagfile(filepath, ino)
+        self.clear_caches()
+        return True
+
     def clear_caches(self):
         super(FileSystemPackageRepository, self).clear_caches()
         self.get_families.cache_clear()
@@ -576,6 +1100,8 @@ class FileSystemPackageRepository(PackageRepository):
         self.get_file.cache_clear()
         self._get_family_dirs.forget()
         self._get_version_dirs.forget()
+        if self.package_index is not None:
+            self.package_index.clear()
         # unfortunately we need to clear file cache across the board
         clear_file_caches()
 
@@ -588,10 +1114,14 @@ class FileSystemPackageRepository(PackageRepository):
         else:
             return str(("listdir", self.location))
 
+    @local_cached(key=_get_family_dirs__key,
+                  enabled=lambda: config.cache_listdir,
+                  path=lambda: config.listdir_cache_path)
     @memcached(servers=config.memcached_uri if config.cache_listdir else None,
                min_compress_len=config.memcached_listdir_min_compress_len,
                key=_get_family_dirs__key,
                debug=config.debug_memcache)
+    @instrumented("listdir_families", "filesystem")
     def _get_family_dirs(self):
         dirs = []
         if not os.path.isdir(self.location):
@@ -613,10 +1143,14 @@ class FileSystemPackageRepository(PackageRepository):
         st = os.stat(root)
         return str(("listdir", root, st.st_ino, st.st_mtime))
 
+    @local_cached(key=_get_version_dirs__key,
+                  enabled=lambda: config.cache_listdir,
+                  path=lambda: config.listdir_cache_path)
     @memcached(servers=config.memcached_uri if config.cache_listdir else None,
                min_compress_len=config.memcached_listdir_min_compress_len,
                key=_get_version_dirs__key,
                debug=config.debug_memcache)
+    @instrumented("listdir_versions", "filesystem")
     def _get_version_dirs(self, root):
 
         # simpler case if this test is on
@@ -942,8 +1476,6 @@ class FileSystemPackageRepository(PackageRepository):
         return new_variant
 
     def _delete_stale_build_tagfiles(self, family_path):
-        now = time.time()
-
         for name in os.listdir(family_path):
             if not name.startswith(self.building_prefix):
                 continue
@@ -958,14 +1490,98 @@ class FileSystemPackageRepository(PackageRepository):
                     os.remove(tagfilepath)
                     continue
             else:
-                # remove tagfile if pkg is gone. Delete only tagfiles over a certain
-                # age, otherwise might delete a tagfile another process has created
+                # remove tagfile if pkg is gone. Delete only stale tagfiles,
+                # otherwise might delete a tagfile another process has created
                 # just before it created the package directory.
-                st = os.stat(tagfilepath)
-                age = now - st.st_mtime
+                status = self._read_build_tagfile(tagfilepath)
+                if status and self._is_stale_build_tagfile(tagfilepath, status):
+                    self._remove_build_tagfile(tagfilepath, status["ino"])
 
-                if age > 3600:
-                    os.remove(tagfilepath)
+    def _claim_build_tagfile(self, filepath):
+        # create the tagfile, but only if it doesn't exist. Returns its inode,
+        # or None if it already existed
+        try:
+            fd = os.open(filepath, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o664)
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                return None
+            raise
+
+        os.close(fd)
+        self._write_build_tagfile(filepath, state="building")
+        return os.stat(filepath).st_ino
+
+    def _write_build_tagfile(self, filepath, **status):
+        # written in place, so the tagfile's inode is unchanged
+        status.update(host=socket.gethostname(), pid=os.getpid())
+        with open(filepath, 'w') as f:
+            f.write(json.dumps(status))
+
+    def _read_build_tagfile(self, filepath):
+        # Returns the status recorded in the tagfile, along with its inode and
+        # mtime, or None if it doesn't exist. Tagfiles created by
+        # `pre_variant_install` are empty.
+        try:
+            st = os.stat(filepath)
+            with open(filepath) as f:
+                content = f.read()
+        except (IOError, OSError) as e:
+            if e.errno == errno.ENOENT:
+                return None
+            raise
+
+        try:
+            status = json.loads(content) if content else {}
+        except ValueError:
+            status = {}  # being written
+
+        status.update(ino=st.st_ino, mtime=st.st_mtime)
+        return status
+
+    def _is_stale_build_tagfile(self, filepath, status):
+        pid = status.get("pid")
+
+        # only `install_package` records its pid and touches the tagfile
+        if pid:
+            timeout = _settings.building_tagfile_timeout
+        else:
+            timeout = self.untracked_building_tagfile_timeout
+
+        age = time.time() - status["mtime"]
+        if age > timeout:
+            return True
+
+        if pid and status.get("host") == socket.gethostname():
+            return not _is_process_running(pid)
+        return False
+
+    def _remove_build_tagfile(self, filepath, ino):
+        # remove the tagfile, but only if it is still the same file (with inode
+        # `ino`) - another process may have replaced it with a new claim
+        path, filename = os.path.split(filepath)
+        tmp_filepath = os.path.join(path, ".removing.%s.%s.%d" % (
+            filename, socket.gethostname(), os.getpid()))
+
+        try:
+            os.rename(filepath, tmp_filepath)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return
+            raise
+
+        if os.stat(tmp_filepath).st_ino != ino:
+            # put it back, unless yet another claim has been made since. Where
+            # there are no hardlinks (windows), rename fails if the file exists
+            try:
+                if hasattr(os, "link"):
+                    os.link(tmp_filepath, filepath)
+                else:
+                    os.rename(tmp_filepath, filepath)
+                    return
+            except OSError:
+                pass
+
+        os.remove(tmp_filepath)
 
 
 def register_plugin():
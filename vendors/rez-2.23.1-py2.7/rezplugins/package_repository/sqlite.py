@@ -0,0 +1,674 @@
+"""
+Sqlite-based package repository
+"""
+from rez.package_repository import PackageRepository, \
+    package_repository_manager
+from rez.package_resources_ import PackageFamilyResource, \
+    VariantResourceHelper, PackageResourceHelper, package_pod_schema, \
+    package_release_keys, package_build_only_keys
+from rez.package_serialise import dump_package_data
+from rez.exceptions import PackageMetadataError, ResourceError, \
+    RezSystemError, PackageRepositoryError
+from rez.utils.formatting import is_valid_package_name
+from rez.utils.resources import cached_property
+from rez.utils.logging_ import print_warning
+from rez.utils.profiling import span
+from rez.utils.filesystem import safe_makedirs
+from rez.serialise import load_py, FileFormat
+from rez.config import config
+from rez.backport.lru_cache import lru_cache
+from rez.vendor.schema.schema import Or
+from rez.vendor.version.requirement import VersionedObject
+from rez.utils import json
+from contextlib import contextmanager
+from StringIO import StringIO
+import threading
+import linecache
+import fnmatch
+import sqlite3
+import time
+import os.path
+import os
+
+
+# this is set when the package repository is instantiated, otherwise an
+# infinite loop is caused to to config loading this plugin, loading config ad
+# infinitum
+_settings = None
+
+
+#------------------------------------------------------------------------------
+# resources
+#------------------------------------------------------------------------------
+
+class SqlitePackageFamilyResource(PackageFamilyResource):
+    key = "sqlite.family"
+    repository_type = "sqlite"
+
+    def _uri(self):
+        return "%s:%s" % (self.location, self.name)
+
+    def get_last_release_time(self):
+        return self._repository._get_last_release_time(self.name)
+
+    def iter_packages(self):
+        for version_str in self._repository.get_versions(self.name):
+            if version_str:
+                package = self._repository.get_resource(
+                    SqlitePackageResource.key,
+                    location=self.location,
+                    name=self.name,
+                    version=version_str)
+            else:
+                package = self._repository.get_resource(
+                    SqlitePackageResource.key,
+                    location=self.location,
+                    name=self.name)
+            yield package
+
+
+class SqlitePackageResource(PackageResourceHelper):
+    key = "sqlite.package"
+    variant_key = "sqlite.variant"
+    repository_type = "sqlite"
+    schema = package_pod_schema
+
+    def _uri(self):
+        obj = VersionedObject.construct(self.name, self.version)
+        return "%s:%s" % (self.location, str(obj))
+
+    @cached_property
+    def parent(self):
+        family = self._repository.get_resource(
+            SqlitePackageFamilyResource.key,
+            location=self.location,
+            name=self.name)
+        return family
+
+    @cached_property
+    def state_handle(self):
+        return self._row[2] if self._row else None
+
+    @property
+    def base(self):
+        return self._row[1] if self._row else None
+
+    @cached_property
+    def _row(self):
+        # (definition, base, state)
+        return self._repository._get_package_row(self.name,
+                                                 self.get("version", ""))
+
+    def iter_variants(self):
+        # variants are listed in their own table, so that the package
+        # definition does not need to be loaded to find them
+        indexes = self._repository.get_variant_indexes(
+            self.name, self.get("version", ""))
+
+        for index in indexes:
+            variant = self._repository.get_resource(
+                self.variant_key,
+                location=self.location,
+                name=self.name,
+                version=self.get("version"),
+                index=index)
+            yield variant
+
+    def _load(self):
+        if self._row is None:
+            raise PackageMetadataError(
+                "Package %r is not in the repository" % self)
+
+        # functions in the definition are converted to `SourceCode`, which
+        # needs to find their source, so the definition is made available to
+        # `inspect` via linecache while it is loaded
+        definition = self._row[0]
+        filepath = self.uri
+        linecache.cache[filepath] = (len(definition), None,
+                                     definition.splitlines(True), filepath)
+
+        try:
+            with span("load_package", "packages", uri=filepath):
+                code = compile(definition, filepath, "exec")
+                data = load_py(code, filepath=filepath)
+        finally:
+            linecache.cache.pop(filepath, None)
+
+        data.pop("format_version", None)
+        return data
+
+
+class SqliteVariantResource(VariantResourceHelper):
+    key = "sqlite.variant"
+    repository_type = "sqlite"
+
+    @cached_property
+    def parent(self):
+        package = self._repository.get_resource(
+            SqlitePackageResource.key,
+            location=self.location,
+            name=self.name,
+            version=self.get("version"))
+        return package
+
+
+#------------------------------------------------------------------------------
+# repository
+#------------------------------------------------------------------------------
+
+class SqlitePackageRepository(PackageRepository):
+    """A package repository stored in a single sqlite database file.
+
+    The repository location is the path of the database file, for example
+    'sqlite@/local/packages.db'. The database contains these tables:
+
+        families: name, last_release_time
+        packages: name, version, definition, base, timestamp, state
+        variants: name, version, idx, requires
+
+    A package's definition is stored as the content of a package.py file. Its
+    variants are also listed in the 'variants' table, so iterating over
+    families, packages and variants are all indexed lookups, instead of the
+    directory listings and file stats that a filesystem repository needs.
+
+    Package payloads are not stored in the database. Each package instead
+    stores its 'base' - for a package synced from a filesystem repository (see
+    `sync`), this is the package's directory in that repository. A sqlite
+    repository can therefore act as a local mirror of a repository on slow
+    (eg NFS) storage, with payloads still being read from that storage.
+    Installing a variant requires the 'payload_path' setting, which is where
+    the payloads of installed packages are expected to be.
+    """
+    schema_dict = {"payload_path": Or(None, str),
+                   "lock_timeout": int}
+
+    schema_version = 1
+
+    @classmethod
+    def name(cls):
+        return "sqlite"
+
+    def __init__(self, location, resource_pool):
+        """Create a sqlite package repository.
+
+        Args:
+            location (str): Path of the database file.
+        """
+        super(SqlitePackageRepository, self).__init__(location, resource_pool)
+
+        global _settings
+        _settings = config.plugins.package_repository.sqlite
+
+        self.filepath = os.path.abspath(os.path.expanduser(location))
+        self._local = threading.local()
+
+        self.register_resource(SqlitePackageFamilyResource)
+        self.register_resource(SqlitePackageResource)
+        self.register_resource(SqliteVariantResource)
+
+        self.get_family_names = lru_cache(maxsize=None)(self._get_family_names)
+        self.get_versions = lru_cache(maxsize=None)(self._get_versions)
+        self.get_variant_indexes = lru_cache(maxsize=None)(
+            self._get_variant_indexes)
+
+    def _uid(self):
+        t = ["sqlite", self.filepath]
+        if os.path.exists(self.filepath):
+            st = os.stat(self.filepath)
+            t.append(st.st_ino)
+        return tuple(t)
+
+    def get_package_family(self, name):
+        is_valid_package_name(name, raise_error=True)
+        if name in self.get_family_names():
+            family = self.get_resource(
+                SqlitePackageFamilyResource.key,
+                location=self.location,
+                name=name)
+            return family
+        return None
+
+    def iter_package_families(self):
+        for name in self.get_family_names():
+            family = self.get_package_family(name)
+            yield family
+
+    def iter_packages(self, package_family_resource):
+        for package in package_family_resource.iter_packages():
+            yield package
+
+    def iter_variants(self, package_resource):
+        for variant in package_resource.iter_variants():
+            yield variant
+
+    def get_parent_package_family(self, package_resource):
+        return package_resource.parent
+
+    def get_parent_package(self, variant_resource):
+        return variant_resource.parent
+
+    def get_variant_state_handle(self, variant_resource):
+        package_resource = variant_resource.parent
+        return package_resource.state_handle
+
+    def get_last_release_time(self, package_family_resource):
+        return package_family_resource.get_last_release_time()
+
+    def install_variant(self, variant_resource, dry_run=False, overrides=None):
+        if variant_resource._repository is self:
+            return variant_resource
+
+        if dry_run:
+            return self._create_variant(None, variant_resource, dry_run=True)
+
+        if not _settings.payload_path:
+            raise PackageRepositoryError(
+                "Cannot install %s into sqlite package repository %s: the "
+                "'payload_path' setting is not set"
+                % (variant_resource.name, self.filepath))
+
+        # the write lock on the database serialises concurrent installs
+        with self._transaction() as conn:
+            index = self._create_variant(conn, variant_resource,
+                                         overrides=overrides)
+
+        # load new variant
+        new_variant = None
+        family = self.get_package_family(variant_resource.name)
+        if family:
+            for package in self.iter_packages(family):
+                if package.version == variant_resource.version:
+                    for variant_ in self.iter_variants(package):
+                        if variant_.index == index:
+                            new_variant = variant_
+                            break
+                    break
+
+        if not new_variant:
+            raise RezSystemError("Internal failure - expected installed variant")
+        return new_variant
+
+    def sync(self, source_path, name_pattern='*', delete=False):
+        """Mirror the packages of another repository into this one.
+
+        A family is only copied if its last release time in the source
+        repository differs from when it was last synced, so repeated syncs are
+        cheap. Each family is replaced as a whole, in its own transaction -
+        resolves against this repository see either the old or the new family.
+
+        Args:
+            source_path (str): Repository to sync from, eg a filesystem
+                package repository path.
+            name_pattern (str): Only sync the families matching this
+                glob-style pattern.
+            delete (bool): If True, remove families matching `name_pattern`
+                that are not in the source repository.
+
+        Returns:
+            int: Number of families that were copied or removed.
+        """
+        source = package_repository_manager.get_repository(source_path)
+        families = dict((x.name, x) for x in source.iter_package_families()
+                        if fnmatch.fnmatch(x.name, name_pattern))
+
+        release_times = {}
+        if os.path.exists(self.filepath):
+            release_times = dict(self._query(
+                "SELECT name, last_release_time FROM families"))
+
+        num_synced = 0
+
+        if delete:
+            for name in release_times:
+                if name not in families and fnmatch.fnmatch(name, name_pattern):
+                    with self._transaction() as conn:
+                        self._delete_family(conn, name)
+                    num_synced += 1
+
+        for name, family in sorted(families.iteritems()):
+            release_time = source.get_last_release_time(family)
+
+            # a zero release time means it cannot be determined, so the family
+            # is always copied again
+            if release_time and release_times.get(name) == release_time:
+                continue
+
+            packages = list(source.iter_packages(family))
+            source.prefetch_packages(packages)
+            rows = []
+
+            for package in packages:
+                try:
+                    data = package.validated_data()
+                except ResourceError as e:
+                    print_warning("Skipping %s: %s" % (package.uri, str(e)))
+                    continue
+
+                data.pop("base", None)
+                rows.append((data, package.base,
+                             getattr(package, "state_handle", None)))
+
+            with self._transaction() as conn:
+                self._delete_family(conn, name)
+                for data, base, state in rows:
+                    self._write_package(conn, data, base, state)
+                self._set_last_release_time(conn, name, release_time)
+
+            num_synced += 1
+
+        return num_synced
+
+    def clear_caches(self):
+        super(SqlitePackageRepository, self).clear_caches()
+        self.get_family_names.cache_clear()
+        self.get_versions.cache_clear()
+        self.get_variant_indexes.cache_clear()
+
+    def _get_family_names(self):
+        return set(x[0] for x in self._query("SELECT name FROM families"))
+
+    def _get_versions(self, name):
+        rows = self._query("SELECT version FROM packages WHERE name = ?",
+                           (name,))
+        return [x[0] for x in rows]
+
+    def _get_variant_indexes(self, name, version_str):
+        rows = self._query(
+            "SELECT idx FROM variants WHERE name = ? AND version = ? "
+            "ORDER BY idx", (name, version_str))
+        return [x[0] for x in rows]
+
+    def _get_package_row(self, name, version_str):
+        rows = self._query(
+            "SELECT definition, base, state FROM packages "
+            "WHERE name = ? AND version = ?", (name, version_str))
+        return rows[0] if rows else None
+
+    def _get_last_release_time(self, name):
+        rows = self._query(
+            "SELECT last_release_time FROM families WHERE name = ?", (name,))
+        return (rows[0][0] or 0) if rows else 0
+
+    def _create_variant(self, conn, variant, dry_run=False, overrides=None):
+        # find the package if it already exists
+        existing_package = None
+
+        family = self.get_package_family(variant.name)
+        if family:
+            for package in self.iter_packages(family):
+                if package.version == variant.version:
+                    uuids = set([variant.uuid, package.uuid])
+                    if len(uuids) > 1 and None not in uuids:
+                        raise ResourceError(
+                            "Cannot install variant %r into package %r - the "
+                            "packages are not the same (UUID mismatch)"
+                            % (variant, package))
+
+                    existing_package = package
+
+                    if variant.index is None:
+                        if package.variants:
+                            raise ResourceError(
+                                "Attempting to install a package without "
+                                "variants (%r) into an existing package with "
+                                "variants (%r)" % (variant, package))
+                    elif not package.variants:
+                        raise ResourceError(
+                            "Attempting to install a variant (%r) into an "
+                            "existing package without variants (%r)"
+                            % (variant, package))
+                    break
+
+        installed_variant_index = None
+        existing_package_data = None
+        release_data = {}
+
+        new_package_data = variant.parent.validated_data()
+        new_package_data.pop("variants", None)
+        package_changed = False
+
+        def remove_build_keys(obj):
+            for key in package_build_only_keys:
+                obj.pop(key, None)
+
+        remove_build_keys(new_package_data)
+
+        if existing_package:
+            existing_package_data = existing_package.validated_data()
+            remove_build_keys(existing_package_data)
+
+            # detect case where new variant introduces package changes outside
+            # of variant
+            data_1 = existing_package_data.copy()
+            data_2 = new_package_data.copy()
+
+            for key in package_release_keys:
+                data_2.pop(key, None)
+                value = data_1.pop(key, None)
+                if value is not None:
+                    release_data[key] = value
+
+            for key in ("format_version", "base", "variants"):
+                data_1.pop(key, None)
+                data_2.pop(key, None)
+
+            package_changed = (data_1 != data_2)
+
+        # special case - installing a no-variant pkg into a no-variant pkg
+        if existing_package and variant.index is None:
+            if dry_run and not package_changed:
+                return self.iter_variants(existing_package).next()
+            else:
+                # just replace the package
+                existing_package = None
+
+        if existing_package:
+            # see if variant already exists in package
+            variant_requires = variant.variant_requires
+
+            for variant_ in self.iter_variants(existing_package):
+                variant_requires_ = existing_package.variants[variant_.index]
+                if variant_requires_ == variant_requires:
+                    installed_variant_index = variant_.index
+                    if dry_run and not package_changed:
+                        return variant_
+                    break
+
+            parent_package = existing_package
+            base = existing_package.base
+
+            if package_changed:
+                # graft together new package data, with existing package
+                # variants, and other data that needs to stay unchanged (eg
+                # timestamp)
+                package_data = new_package_data
+                package_data["variants"] = existing_package_data.get("variants", [])
+            else:
+                package_data = existing_package_data
+        else:
+            parent_package = variant.parent
+            package_data = new_package_data
+            base = self._get_install_base(variant)
+
+        if dry_run:
+            return None
+
+        # merge existing release data (if any) into the package
+        package_data.update(release_data)
+
+        # merge the new variant into the package
+        if installed_variant_index is None and variant.index is not None:
+            variant_requires = variant.variant_requires
+            if not package_data.get("variants"):
+                package_data["variants"] = []
+            package_data["variants"].append(variant_requires)
+            installed_variant_index = len(package_data["variants"]) - 1
+
+        # a little data massaging is needed
+        package_data["config"] = parent_package._data.get("config")
+        package_data.pop("base", None)
+
+        # add the timestamp
+        now = time.time()
+        overrides = dict(overrides or {})
+        overrides["timestamp"] = int(now)
+
+        # apply attribute overrides
+        for key, value in overrides.iteritems():
+            if package_data.get(key) is None:
+                package_data[key] = value
+
+        self._write_package(conn, package_data, base, now)
+        self._set_last_release_time(conn, variant.name, now)
+        return installed_variant_index
+
+    def _get_install_base(self, variant):
+        path = _settings.payload_path
+        if not path:
+            return None  # dry run, see `install_variant`
+
+        path = os.path.join(os.path.expanduser(path), variant.name)
+        if variant.version:
+            path = os.path.join(path, str(variant.version))
+        return path
+
+    @classmethod
+    def _write_package(cls, conn, data, base, state):
+        name = data["name"]
+        version_str = str(data.get("version") or "")
+        variants = data.get("variants")
+
+        buf = StringIO()
+        dump_package_data(data, buf=buf, format_=FileFormat.py)
+
+        conn.execute(
+            "INSERT OR REPLACE INTO packages VALUES (?, ?, ?, ?, ?, ?)",
+            (name, version_str, buf.getvalue(), base,
+             data.get("timestamp") or 0, state))
+
+        conn.execute("DELETE FROM variants WHERE name = ? AND version = ?",
+                     (name, version_str))
+
+        if variants:
+            for i, variant in enumerate(variants):
+                requires = json.dumps([str(x) for x in variant])
+                conn.execute("INSERT INTO variants VALUES (?, ?, ?, ?)",
+                             (name, version_str, i, requires))
+        else:
+            conn.execute("INSERT INTO variants VALUES (?, ?, NULL, '[]')",
+                         (name, version_str))
+
+    @classmethod
+    def _set_last_release_time(cls, conn, name, release_time):
+        conn.execute("INSERT OR REPLACE INTO families VALUES (?, ?)",
+                     (name, release_time))
+
+    @classmethod
+    def _delete_family(cls, conn, name):
+        for table in ("families", "packages", "variants"):
+            conn.execute("DELETE FROM %s WHERE name = ?" % table, (name,))
+
+    def _query(self, sql, args=()):
+        # a missing database is an empty repository, and is not created until
+        # something is written to it
+        conn = self._get_connection(create=False)
+        if conn is None:
+            return []
+        return conn.execute(sql, args).fetchall()
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._get_connection(create=True)
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            # another process may have written to the database since it was
+            # last read
+            self.clear_caches()
+            yield conn
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self.clear_caches()
+
+    def _get_connection(self, create=True):
+        # connections cannot be shared between threads, or across a fork
+        pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == pid:
+            return conn
+
+        if not os.path.exists(self.filepath):
+            if not create:
+                return None
+            safe_makedirs(os.path.dirname(self.filepath))
+
+        conn = sqlite3.connect(self.filepath, timeout=_settings.lock_timeout,
+                               isolation_level=None)
+        conn.text_factory = str
+        self._create_schema(conn)
+
+        self._local.conn = conn
+        self._local.pid = pid
+        return conn
+
+    def _create_schema(self, conn):
+        row = conn.execute("SELECT name FROM sqlite_master WHERE "
+                           "type = 'table' AND name = 'meta'").fetchone()
+        if row:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?",
+                               ("schema_version",)).fetchone()
+            if int(row[0]) > self.schema_version:
+                raise PackageRepositoryError(
+                    "Sqlite package repository %s has a newer schema version "
+                    "(%s) than is supported (%d)"
+                    % (self.filepath, row[0], self.schema_version))
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+
+        try:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta "
+                         "(key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS families (name TEXT PRIMARY KEY, "
+                "last_release_time REAL)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS packages (name TEXT, version TEXT, "
+                "definition TEXT, base TEXT, timestamp INTEGER, state REAL, "
+                "PRIMARY KEY (name, version))")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS variants (name TEXT, "
+                "version TEXT, idx INTEGER, requires TEXT)")
+            conn.execute("CREATE INDEX IF NOT EXISTS variants_package ON "
+                         "variants (name, version)")
+            conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                         ("schema_version", str(self.schema_version)))
+        except:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+
+
+def register_plugin():
+    return SqlitePackageRepository
+
+
+# Copyright 2013-2016 Allan Johns.
+#
+# This library is free software: you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation, either
+# version 3 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library.  If not, see <http://www.gnu.org/licenses/>.